@@ -0,0 +1,228 @@
+# admission.py
+"""
+Контроль допуску фото до аналізу.
+
+Без нього handle_photo приймав скільки завгодно фото: альбом із 10 штук
+від одного користувача або сплеск користувачів ставили в чергу необмежену
+роботу, і затримка росла для всіх. Тут перед аналізом стоїть:
+
+- обмеження одночасних аналізів (ADMISSION_MAX_ACTIVE);
+- обмежена глобальна черга очікування (ADMISSION_QUEUE_SIZE) — понад неї
+  фото одразу відхиляється з «спробуй пізніше»;
+- ліміти на користувача: скільки фото аналізуються одночасно
+  (ADMISSION_PER_USER_ACTIVE) і скільки можуть чекати (ADMISSION_PER_USER_QUEUE);
+- round-robin між користувачами: альбом одного не блокує інших —
+  черга обходить користувачів по колу, по одному фото за раз.
+
+Використання:
+
+    ticket = admission.submit(user_id)     # AdmissionRejected, якщо місця нема
+    if not ticket.admitted:
+        ... відповісти позицією ticket.position
+    try:
+        await ticket.wait()                # час очікування — ticket.wait_seconds
+        ... аналіз
+    finally:
+        admission.release(ticket)
+"""
+
+import os
+import time
+import asyncio
+from collections import OrderedDict, deque
+from typing import Deque, Dict, Optional
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return max(1, int(os.getenv(name, default)))
+    except ValueError:
+        return default
+
+
+class AdmissionRejected(RuntimeError):
+    """Фото не прийнято: глобальна черга або черга користувача заповнена."""
+
+    def __init__(self, reason: str):
+        super().__init__(reason)
+        self.reason = reason
+
+
+class Ticket:
+    __slots__ = ("user_id", "enqueued_at", "admitted_at", "released", "_future")
+
+    def __init__(self, user_id: int, future: asyncio.Future):
+        self.user_id = user_id
+        self.enqueued_at = time.perf_counter()
+        self.admitted_at: Optional[float] = None
+        self.released = False
+        self._future = future
+
+    @property
+    def admitted(self) -> bool:
+        return self.admitted_at is not None
+
+    @property
+    def wait_seconds(self) -> float:
+        end = self.admitted_at if self.admitted_at is not None else time.perf_counter()
+        return end - self.enqueued_at
+
+    async def wait(self) -> float:
+        """Чекає допуску. Повертає час очікування в черзі (секунди)."""
+        if not self._future.done():
+            await asyncio.shield(self._future)
+        return self.wait_seconds
+
+
+class AdmissionController:
+    def __init__(
+        self,
+        max_active: Optional[int] = None,
+        max_queue: Optional[int] = None,
+        per_user_active: Optional[int] = None,
+        per_user_queue: Optional[int] = None,
+    ):
+        self.max_active = max_active or _env_int("ADMISSION_MAX_ACTIVE", os.cpu_count() or 1)
+        self.max_queue = max_queue or _env_int("ADMISSION_QUEUE_SIZE", 50)
+        self.per_user_active = per_user_active or _env_int("ADMISSION_PER_USER_ACTIVE", 1)
+        self.per_user_queue = per_user_queue or _env_int("ADMISSION_PER_USER_QUEUE", 5)
+
+        # user_id -> черга квитків цього користувача (порядок надходження)
+        self._waiting: "OrderedDict[int, Deque[Ticket]]" = OrderedDict()
+        # Порядок обходу користувачів (round-robin)
+        self._rotation: Deque[int] = deque()
+        self._active_by_user: Dict[int, int] = {}
+
+        self.active = 0
+        self.queued = 0
+
+        # Метрики
+        self.admitted_total = 0
+        self.rejected: Dict[str, int] = {"queue_full": 0, "user_queue_full": 0}
+
+    # ---------------------------------------------------
+    # Публічне API
+    # ---------------------------------------------------
+    def submit(self, user_id: int) -> Ticket:
+        """
+        Ставить фото в чергу (або одразу допускає). Кидає AdmissionRejected,
+        якщо черга користувача чи глобальна черга заповнена.
+        """
+        user_queue = self._waiting.get(user_id)
+        if user_queue is not None and len(user_queue) >= self.per_user_queue:
+            self.rejected["user_queue_full"] += 1
+            raise AdmissionRejected("user_queue_full")
+
+        can_start = (
+            self.active < self.max_active
+            and self._active_by_user.get(user_id, 0) < self.per_user_active
+            and self.queued == 0
+        )
+        if not can_start and self.queued >= self.max_queue:
+            self.rejected["queue_full"] += 1
+            raise AdmissionRejected("queue_full")
+
+        ticket = Ticket(user_id, asyncio.get_running_loop().create_future())
+        if user_queue is None:
+            user_queue = self._waiting[user_id] = deque()
+            self._rotation.append(user_id)
+        user_queue.append(ticket)
+        self.queued += 1
+
+        self._dispatch()
+        return ticket
+
+    def release(self, ticket: Ticket):
+        """Завершення аналізу (або скасування очікування). Повторний виклик — no-op."""
+        if ticket.released:
+            return
+        ticket.released = True
+
+        if ticket.admitted:
+            self.active -= 1
+            left = self._active_by_user.get(ticket.user_id, 1) - 1
+            if left > 0:
+                self._active_by_user[ticket.user_id] = left
+            else:
+                self._active_by_user.pop(ticket.user_id, None)
+        else:
+            # Ще в черзі (handle_photo скасовано) — просто прибираємо
+            user_queue = self._waiting.get(ticket.user_id)
+            if user_queue is not None and ticket in user_queue:
+                user_queue.remove(ticket)
+                self.queued -= 1
+                if not user_queue:
+                    self._drop_user(ticket.user_id)
+            if not ticket._future.done():
+                ticket._future.cancel()
+
+        self._dispatch()
+
+    def position(self, ticket: Ticket) -> int:
+        """
+        Скільки фото буде допущено перед цим квитком (0 — допущено).
+        Оцінка з урахуванням round-robin: від кожного користувача попереду
+        береться не більше фото, ніж у цього користувача перед квитком.
+        """
+        if ticket.admitted:
+            return 0
+        user_queue = self._waiting.get(ticket.user_id)
+        if not user_queue or ticket not in user_queue:
+            return 0
+
+        k = user_queue.index(ticket)
+        ahead = k
+        rotation = list(self._rotation)
+        own = rotation.index(ticket.user_id) if ticket.user_id in rotation else len(rotation)
+        for i, user_id in enumerate(rotation):
+            if user_id == ticket.user_id:
+                continue
+            others = len(self._waiting.get(user_id, ()))
+            ahead += min(others, k + 1 if i < own else k)
+        return ahead + 1
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "active": self.active,
+            "queued": self.queued,
+            "users_waiting": len(self._waiting),
+            "admitted_total": self.admitted_total,
+            **{f"rejected_{k}": v for k, v in self.rejected.items()},
+        }
+
+    # ---------------------------------------------------
+    # Внутрішнє
+    # ---------------------------------------------------
+    def _drop_user(self, user_id: int):
+        self._waiting.pop(user_id, None)
+        try:
+            self._rotation.remove(user_id)
+        except ValueError:
+            pass
+
+    def _dispatch(self):
+        """Допускає квитки по колу користувачів, поки є вільні слоти."""
+        blocked = 0
+        while self.active < self.max_active and self._rotation and blocked < len(self._rotation):
+            user_id = self._rotation.popleft()
+            user_queue = self._waiting[user_id]
+
+            if self._active_by_user.get(user_id, 0) >= self.per_user_active:
+                # Користувач уже на своєму ліміті — черга переходить до наступного
+                self._rotation.append(user_id)
+                blocked += 1
+                continue
+
+            blocked = 0
+            ticket = user_queue.popleft()
+            self.queued -= 1
+            self.active += 1
+            self.admitted_total += 1
+            self._active_by_user[user_id] = self._active_by_user.get(user_id, 0) + 1
+            ticket.admitted_at = time.perf_counter()
+            ticket._future.set_result(True)
+
+            if user_queue:
+                self._rotation.append(user_id)
+            else:
+                self._waiting.pop(user_id, None)
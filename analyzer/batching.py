@@ -0,0 +1,211 @@
+# analyzer/batching.py
+
+"""
+Мікробатчинг: конкурентні запити на аналіз збираються в пачку на
+кілька мілісекунд (або до max_batch_size) і виконуються одним викликом
+у пулі воркерів. Результати повертаються кожному корутину handle_photo.
+
+Під час сплеску фото класифікатор радикалів рахує всю пачку одним
+векторизованим проходом, а пачка займає один слот пулу замість N.
+
+Помилка одного фото не валить пачку: batch_fn повертає на його місці
+BatchItemError, і виняток отримує лише той запит, а сусіди — свої результати.
+
+Налаштування:
+    ANALYZER_BATCH_SIZE     — максимальний розмір пачки (1 — без батчингу)
+    ANALYZER_BATCH_WAIT_MS  — скільки чекати на «попутників» після першого запиту
+"""
+
+import os
+import time
+import bisect
+import asyncio
+from collections import Counter
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from .executor import AnalysisExecutor
+
+
+def _env_number(name: str, default: float) -> float:
+    try:
+        return max(0.0, float(os.getenv(name, default)))
+    except ValueError:
+        return default
+
+
+class BatchItemError(Exception):
+    """
+    Маркер помилки одного елемента пачки. batch_fn кладе його у слот
+    результату замість винятку; MicroBatcher піднімає його лише для
+    відповідного запиту. Тримає тип і текст, а не сам виняток, —
+    щоб гарантовано пройти pickle з process-pool.
+    """
+
+    def __init__(self, message: str, exc_type: str = "Exception"):
+        super().__init__(message, exc_type)
+        self.message = message
+        self.exc_type = exc_type
+
+    @classmethod
+    def from_exception(cls, e: BaseException) -> "BatchItemError":
+        return cls(str(e), type(e).__name__)
+
+    def __str__(self) -> str:
+        return f"{self.exc_type}: {self.message}"
+
+
+class MicroBatcher:
+    """
+    batch_fn(items: list) -> list результатів того ж розміру (BatchItemError
+    на місці елемента, що впав); викликається через AnalysisExecutor,
+    тож не блокує event loop.
+    """
+
+    def __init__(
+        self,
+        batch_fn: Callable[[List[Any]], List[Any]],
+        executor: AnalysisExecutor,
+        max_batch_size: Optional[int] = None,
+        max_wait_ms: Optional[float] = None,
+    ):
+        self.batch_fn = batch_fn
+        self.executor = executor
+        self.max_batch_size = max(1, int(max_batch_size or _env_number("ANALYZER_BATCH_SIZE", 4)))
+        self.max_wait_ms = (
+            max_wait_ms if max_wait_ms is not None
+            else _env_number("ANALYZER_BATCH_WAIT_MS", 10)
+        )
+
+        # (порядковий номер, item, future, час надходження); відсортовано за номером
+        self._buffer: List[Tuple[int, Any, asyncio.Future, float]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._seq = 0
+
+        # Елементи в пачках, переданих у пул і ще не завершених
+        self._dispatched = 0
+        # hold(): нові пачки не відправляються, доки не повернуться всі відправлені
+        self._held = False
+
+        # Метрики
+        self.batches_total = 0
+        self.items_total = 0
+        self.batch_sizes: Counter = Counter()
+        self.wait_ms_total = 0.0
+        self.wait_ms_max = 0.0
+
+    # ---------------------------------------------------
+    # Публічне API
+    # ---------------------------------------------------
+    def next_seq(self) -> int:
+        """Порядковий номер для нового запиту (див. submit(seq=...))."""
+        self._seq += 1
+        return self._seq
+
+    async def submit(self, item: Any, key: Any = None, seq: Optional[int] = None) -> Any:
+        """
+        Додає запит у поточну пачку і чекає на свій результат.
+        key (user_id) тут не використовується — він для ShardedAnalyzer.submit.
+
+        seq — порядковий номер з next_seq(). Повтор запиту з тим самим seq
+        стає в буфер на своє старе місце, перед новішими запитами.
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        if seq is None:
+            seq = self.next_seq()
+        bisect.insort(self._buffer, (seq, item, future, time.perf_counter()), key=lambda e: e[0])
+
+        if len(self._buffer) >= self.max_batch_size:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_wait_ms / 1000.0, self._flush)
+
+        return await future
+
+    def hold(self):
+        """
+        Притримує відправку нових пачок, доки не завершаться всі вже
+        відправлені. ShardedAnalyzer викликає це після падіння процесу:
+        пачки старого процесу падають по черзі, і їхні повтори мають
+        зібратися в буфері раніше, ніж туди потраплять новіші запити.
+        """
+        if self._dispatched:
+            self._held = True
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "batches_total": self.batches_total,
+            "items_total": self.items_total,
+            "avg_batch_size": (self.items_total / self.batches_total) if self.batches_total else 0.0,
+            "batch_sizes": dict(self.batch_sizes),
+            "avg_wait_ms": (self.wait_ms_total / self.items_total) if self.items_total else 0.0,
+            "max_wait_ms": self.wait_ms_max,
+            "buffered": len(self._buffer),
+            "held": self._held,
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms_setting": self.max_wait_ms,
+        }
+
+    # ---------------------------------------------------
+    # Внутрішнє
+    # ---------------------------------------------------
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if self._held:
+            return
+
+        batch, self._buffer = self._buffer[:self.max_batch_size], self._buffer[self.max_batch_size:]
+        if not batch:
+            return
+
+        now = time.perf_counter()
+        for _, _, _, arrived in batch:
+            waited = (now - arrived) * 1000.0
+            self.wait_ms_total += waited
+            self.wait_ms_max = max(self.wait_ms_max, waited)
+
+        self.batches_total += 1
+        self.items_total += len(batch)
+        self.batch_sizes[len(batch)] += 1
+
+        self._dispatched += len(batch)
+        asyncio.ensure_future(self._run_batch(batch))
+
+        # Якщо назбиралось більше, ніж влазить у пачку — одразу наступна
+        if self._buffer:
+            if len(self._buffer) >= self.max_batch_size:
+                self._flush()
+            else:
+                loop = asyncio.get_running_loop()
+                self._timer = loop.call_later(self.max_wait_ms / 1000.0, self._flush)
+
+    async def _run_batch(self, batch: List[Tuple[int, Any, asyncio.Future, float]]):
+        items = [item for _, item, _, _ in batch]
+        try:
+            results = await self.executor.run(self.batch_fn, items)
+        except Exception as e:
+            # Впала вся пачка (пул, pickle, сама batch_fn) — помилка в усіх
+            for _, _, future, _ in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        finally:
+            self._dispatched -= len(batch)
+            if self._held and not self._dispatched:
+                # Після call_soon — коли повтори з цієї пачки вже в буфері
+                asyncio.get_running_loop().call_soon(self._resume)
+
+        for (_, _, future, _), result in zip(batch, results):
+            if future.done():
+                continue
+            if isinstance(result, BatchItemError):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+
+    def _resume(self):
+        self._held = False
+        if self._buffer:
+            self._flush()
@@ -0,0 +1,103 @@
+# analyzer/context.py
+
+"""
+Контекст одного аналізу: фото декодується ОДИН раз і спільний буфер
+передається всім етапам (DeepFace, FaceMesh, ...).
+
+Раніше той самий JPEG читався з диска двічі — DeepFace отримував шлях,
+а stress_model ще раз робив cv2.imread + cvtColor.
+"""
+
+from dataclasses import dataclass, field
+from typing import Any, Dict, Optional, Union
+
+import cv2
+import numpy as np
+
+
+@dataclass
+class AnalysisContext:
+    """
+    image  — декодоване фото у форматі BGR (як віддає OpenCV і очікує DeepFace)
+    source — звідки воно взялося (шлях або опис), лише для логів / звіту
+    meta   — довільні службові дані етапів
+
+    Після analyzer.face_crop.detect_and_crop також заповнені:
+    face_box   — рамка обличчя в координатах кадру
+    face_crop  — вирівняний кроп з полями (для FaceMesh)
+    face_tight — щільний кроп обличчя (для DeepFace)
+    """
+
+    image: np.ndarray
+    source: Optional[str] = None
+    meta: Dict[str, Any] = field(default_factory=dict)
+    face_box: Optional[Dict[str, int]] = None
+    face_crop: Optional[np.ndarray] = field(default=None, repr=False)
+    face_tight: Optional[np.ndarray] = field(default=None, repr=False)
+    _rgb: Optional[np.ndarray] = field(default=None, repr=False)
+    _face_rgb: Optional[np.ndarray] = field(default=None, repr=False)
+
+    # ---------------------------------------------------
+    # Конструктори
+    # ---------------------------------------------------
+    @classmethod
+    def from_path(cls, img_path: str) -> Optional["AnalysisContext"]:
+        img = cv2.imread(img_path)
+        if img is None:
+            return None
+        return cls(image=img, source=img_path)
+
+    @classmethod
+    def from_bytes(cls, data: Union[bytes, bytearray, memoryview],
+                   source: Optional[str] = None) -> Optional["AnalysisContext"]:
+        buf = np.frombuffer(data, dtype=np.uint8)
+        img = cv2.imdecode(buf, cv2.IMREAD_COLOR)
+        if img is None:
+            return None
+        return cls(image=img, source=source)
+
+    # ---------------------------------------------------
+    # Похідні представлення
+    # ---------------------------------------------------
+    @property
+    def rgb(self) -> np.ndarray:
+        """RGB-версія (для MediaPipe) — рахується один раз і кешується."""
+        if self._rgb is None:
+            self._rgb = cv2.cvtColor(self.image, cv2.COLOR_BGR2RGB)
+        return self._rgb
+
+    @property
+    def face_rgb(self) -> Optional[np.ndarray]:
+        """RGB-версія кропу обличчя (None, якщо кропу ще немає)."""
+        if self.face_crop is None:
+            return None
+        if self._face_rgb is None:
+            self._face_rgb = cv2.cvtColor(self.face_crop, cv2.COLOR_BGR2RGB)
+        return self._face_rgb
+
+    @property
+    def width(self) -> int:
+        return int(self.image.shape[1])
+
+    @property
+    def height(self) -> int:
+        return int(self.image.shape[0])
+
+
+ImageSource = Union[str, bytes, bytearray, memoryview, np.ndarray, AnalysisContext]
+
+
+def as_context(src: ImageSource) -> Optional[AnalysisContext]:
+    """
+    Приводить будь-яке джерело (шлях, байти JPEG, масив BGR або вже готовий
+    контекст) до AnalysisContext. Повертає None, якщо фото не декодується.
+    """
+    if isinstance(src, AnalysisContext):
+        return src
+    if isinstance(src, str):
+        return AnalysisContext.from_path(src)
+    if isinstance(src, np.ndarray):
+        return AnalysisContext(image=src)
+    if isinstance(src, (bytes, bytearray, memoryview)):
+        return AnalysisContext.from_bytes(src)
+    raise TypeError(f"Unsupported image source: {type(src).__name__}")
@@ -0,0 +1,174 @@
+# analyzer/executor.py
+
+"""
+Пул воркерів для CPU-важких етапів аналізу.
+
+DeepFace / MediaPipe / sklearn блокують потік на секунди, тому бот
+віддає їх сюди, а event loop aiogram лишається вільним для /start,
+/compare та апдейтів інших користувачів.
+
+Налаштування через змінні оточення:
+    ANALYZER_EXECUTOR   — "thread" (за замовчуванням) або "process"
+    ANALYZER_WORKERS    — кількість воркерів (за замовчуванням = кількість ядер)
+    ANALYZER_QUEUE_SIZE — скільки задач може чекати на вільний воркер
+
+Кожен воркер при старті проганяє model_registry.warm_worker, тому
+моделі вже в памʼяті до першого фото. start_warm_up() робить це у
+фоні: бот одразу відповідає на команди, а фото чекають wait_warm().
+
+Процеси (spawn) імпортують головний модуль батька як __mp_main__, тому
+bot.py / worker.py не мають побічних ефектів при імпорті (усе — в setup()),
+а функції задач і initializer живуть у пакеті (analyzer.tasks), не в __main__.
+"""
+
+import os
+import asyncio
+import multiprocessing
+from concurrent.futures import Executor, ThreadPoolExecutor, ProcessPoolExecutor
+from typing import Any, Callable, Optional
+
+from .model_registry import warm_worker
+
+
+class ExecutorBusy(RuntimeError):
+    """Черга аналізу заповнена — нову задачу не прийнято."""
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return max(1, int(os.getenv(name, default)))
+    except ValueError:
+        return default
+
+
+def _noop() -> bool:
+    return True
+
+
+class AnalysisExecutor:
+    """
+    Обгортка над Thread/ProcessPoolExecutor з обмеженою чергою.
+
+    Одночасно виконується не більше `workers` задач, ще `queue_size`
+    можуть чекати. Все, що понад це, відхиляється з ExecutorBusy,
+    щоб не накопичувати необмежену роботу.
+    """
+
+    def __init__(
+        self,
+        kind: Optional[str] = None,
+        workers: Optional[int] = None,
+        queue_size: Optional[int] = None,
+        initializer: Optional[Callable[[], Any]] = warm_worker,
+    ):
+        self.kind = (kind or os.getenv("ANALYZER_EXECUTOR", "thread")).lower()
+        self.workers = workers or _env_int("ANALYZER_WORKERS", os.cpu_count() or 1)
+        self.queue_size = queue_size or _env_int("ANALYZER_QUEUE_SIZE", self.workers * 4)
+
+        self.initializer = initializer
+
+        self._pool: Optional[Executor] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._pending = 0
+        self._ready = False
+        self._warm_task: Optional[asyncio.Future] = None
+
+    # ---------------------------------------------------
+    # Життєвий цикл
+    # ---------------------------------------------------
+    def _ensure_pool(self) -> Executor:
+        if self._pool is None:
+            if self.kind == "process":
+                # spawn — TensorFlow погано переживає fork
+                ctx = multiprocessing.get_context("spawn")
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=ctx,
+                    initializer=self.initializer,
+                )
+            else:
+                self._pool = ThreadPoolExecutor(
+                    max_workers=self.workers,
+                    thread_name_prefix="analyzer",
+                    initializer=self.initializer,
+                )
+            self._slots = asyncio.Semaphore(self.workers)
+        return self._pool
+
+    async def warm_up(self) -> bool:
+        """
+        Піднімає всіх воркерів одразу (а не при першому фото).
+        Задачі подаються пачкою, тож пул змушений створити кожен потік /
+        процес, і в кожному відпрацьовує initializer з прогрівом моделей.
+        """
+        pool = self._ensure_pool()
+        loop = asyncio.get_running_loop()
+        fn = self.initializer or _noop
+
+        results = await asyncio.gather(
+            *(loop.run_in_executor(pool, fn) for _ in range(self.workers)),
+            return_exceptions=True,
+        )
+        self._ready = all(r is True for r in results)
+        return self._ready
+
+    def start_warm_up(self) -> asyncio.Future:
+        """Запускає warm_up() у фоні (один раз) і повертає його задачу."""
+        if self._warm_task is None:
+            self._warm_task = asyncio.ensure_future(self.warm_up())
+        return self._warm_task
+
+    async def wait_warm(self) -> bool:
+        """Чекає фоновий прогрів, якщо він ще триває. True — моделі теплі."""
+        if self._warm_task is None:
+            return self._ready
+        # shield: скасування одного handle_photo не скасовує прогрів для всіх
+        return await asyncio.shield(self._warm_task)
+
+    def shutdown(self, wait: bool = True):
+        if self._warm_task is not None and not self._warm_task.done():
+            self._warm_task.cancel()
+        self._warm_task = None
+        if self._pool is not None:
+            self._pool.shutdown(wait=wait)
+            self._pool = None
+            self._slots = None
+            self._ready = False
+
+    # ---------------------------------------------------
+    # Стан
+    # ---------------------------------------------------
+    @property
+    def pending(self) -> int:
+        """Задачі, що виконуються або чекають у черзі."""
+        return self._pending
+
+    @property
+    def capacity(self) -> int:
+        return self.workers + self.queue_size
+
+    @property
+    def ready(self) -> bool:
+        """Усі воркери прогріті."""
+        return self._ready
+
+    # ---------------------------------------------------
+    # Запуск задачі
+    # ---------------------------------------------------
+    async def run(self, fn: Callable[..., Any], *args: Any) -> Any:
+        """
+        Виконує fn(*args) у пулі й повертає результат, не блокуючи loop.
+        Кидає ExecutorBusy, якщо черга вже заповнена.
+        """
+        pool = self._ensure_pool()
+
+        if self._pending >= self.capacity:
+            raise ExecutorBusy(f"analysis queue is full ({self._pending}/{self.capacity})")
+
+        self._pending += 1
+        try:
+            async with self._slots:
+                loop = asyncio.get_running_loop()
+                return await loop.run_in_executor(pool, fn, *args)
+        finally:
+            self._pending -= 1
@@ -0,0 +1,164 @@
+# analyzer/face_crop.py
+
+"""
+Спільний етап детекції та кропу обличчя.
+
+Раніше обличчя локалізувалось двічі: DeepFace запускав власний детектор
+(enforce_detection=True), а MediaPipe FaceMesh ще раз сканував увесь кадр.
+Тепер детектор проходить по кадру ОДИН раз, а далі:
+
+    ctx.face_crop  — вирівняний по очах квадратний кроп з полями
+                     (FACE_CROP_SIZE × FACE_CROP_SIZE) — для FaceMesh;
+    ctx.face_tight — щільний кроп обличчя всередині face_crop —
+                     для DeepFace з detector_backend="skip".
+
+На фото з телефона (12+ Мп) обидві моделі отримують кілька сотень
+пікселів замість повного кадру, а сам детектор — зменшений кадр
+(див. analyzer.preprocess).
+
+Налаштування:
+    FACE_SHARED_DETECTION   — 1 (за замовчуванням) / 0 — старий режим
+    FACE_DETECTOR_BACKEND   — детектор DeepFace (opencv, retinaface, ...)
+    FACE_CROP_SIZE          — сторона кропу в пікселях
+    FACE_CROP_MARGIN        — поле навколо обличчя (частка від розміру)
+"""
+
+import os
+import math
+from typing import Any, Dict, Optional
+
+import cv2
+import numpy as np
+
+from .context import AnalysisContext
+from .preprocess import downscale, face_is_large_enough, scale_area
+
+FACE_SHARED_DETECTION = os.getenv("FACE_SHARED_DETECTION", "1").lower() in ("1", "true", "yes")
+FACE_DETECTOR_BACKEND = os.getenv("FACE_DETECTOR_BACKEND", "opencv")
+FACE_CROP_SIZE = int(os.getenv("FACE_CROP_SIZE", "320"))
+FACE_CROP_MARGIN = float(os.getenv("FACE_CROP_MARGIN", "0.3"))
+
+
+def locate_face(image: np.ndarray,
+                detector_backend: str = FACE_DETECTOR_BACKEND) -> Optional[Dict[str, Any]]:
+    """
+    Один прохід детектора по кадру. Повертає facial_area найбільшого
+    обличчя ({x, y, w, h, left_eye?, right_eye?}) або None.
+    """
+    from deepface import DeepFace
+
+    try:
+        faces = DeepFace.extract_faces(
+            img_path=image,
+            detector_backend=detector_backend,
+            enforce_detection=True,
+            align=False,
+        )
+    except ValueError:
+        # DeepFace кидає ValueError, коли обличчя не знайдено
+        return None
+    except Exception as e:
+        print(f"[face_crop] Face detection failed: {e}")
+        return None
+
+    if not faces:
+        return None
+
+    best = max(faces, key=lambda f: f["facial_area"]["w"] * f["facial_area"]["h"])
+    return dict(best["facial_area"])
+
+
+def _eye_angle(area: Dict[str, Any]) -> float:
+    """Кут нахилу лінії очей у градусах (0, якщо очі не відомі)."""
+    left_eye = area.get("left_eye")
+    right_eye = area.get("right_eye")
+    if not left_eye or not right_eye:
+        return 0.0
+
+    # Сортуємо по x: «ліве» та «праве» в DeepFace — з точки зору людини
+    (x1, y1), (x2, y2) = sorted([tuple(left_eye), tuple(right_eye)])
+    if x2 == x1:
+        return 0.0
+    return math.degrees(math.atan2(y2 - y1, x2 - x1))
+
+
+def crop_face(ctx: AnalysisContext, area: Dict[str, Any],
+              size: int = FACE_CROP_SIZE, margin: float = FACE_CROP_MARGIN) -> AnalysisContext:
+    """
+    Вирівнює обличчя по очах і вирізає квадратний кроп фіксованого розміру.
+    Поворот, масштаб і кроп — одна операція warpAffine, тож рахуються лише
+    пікселі результату, а не весь кадр.
+    """
+    x, y, w, h = (float(area[k]) for k in ("x", "y", "w", "h"))
+    cx, cy = x + w / 2.0, y + h / 2.0
+
+    face_side = max(w, h)
+    side = face_side * (1.0 + 2.0 * margin)
+    scale = size / side
+
+    source = ctx.image
+    src_cx, src_cy, warp_scale = cx, cy, scale
+
+    # Сильне зменшення через warpAffine (INTER_LINEAR) дає аліасинг —
+    # тоді спершу зменшуємо лише околицю обличчя через INTER_AREA
+    if scale < 0.5:
+        pre = scale * 2.0
+        half = side * 0.75  # з запасом на поворот (√2 / 2 ≈ 0.71)
+        x0, y0 = max(0, int(cx - half)), max(0, int(cy - half))
+        x1 = min(ctx.width, int(cx + half) + 1)
+        y1 = min(ctx.height, int(cy + half) + 1)
+        source = cv2.resize(source[y0:y1, x0:x1], None, fx=pre, fy=pre,
+                            interpolation=cv2.INTER_AREA)
+        src_cx, src_cy, warp_scale = (cx - x0) * pre, (cy - y0) * pre, scale / pre
+
+    M = cv2.getRotationMatrix2D((src_cx, src_cy), _eye_angle(area), warp_scale)
+    M[0, 2] += size / 2.0 - src_cx
+    M[1, 2] += size / 2.0 - src_cy
+
+    crop = cv2.warpAffine(
+        source, M, (size, size),
+        flags=cv2.INTER_LINEAR,
+        borderMode=cv2.BORDER_REPLICATE,
+    )
+
+    # Щільний кроп обличчя всередині (без полів) — те, що бачив би DeepFace
+    tw, th = int(round(w * scale)), int(round(h * scale))
+    tx, ty = (size - tw) // 2, (size - th) // 2
+    tight = crop[max(0, ty):ty + th, max(0, tx):tx + tw]
+
+    ctx.face_box = {"x": int(x), "y": int(y), "w": int(w), "h": int(h)}
+    ctx.face_crop = crop
+    ctx.face_tight = np.ascontiguousarray(tight)
+    ctx.meta["crop_scale"] = round(scale, 4)
+    ctx.meta["face_px"] = int(face_side)
+    return ctx
+
+
+def detect_and_crop(ctx: AnalysisContext) -> Optional[AnalysisContext]:
+    """
+    Детекція + кроп. None — обличчя не знайдено.
+
+    Детектор працює на зменшеному кадрі (analyzer.preprocess); якщо обличчя
+    там замале або не знайдене — повтор на повній роздільності.
+    Кроп завжди береться з оригіналу.
+    """
+    small, scale = downscale(ctx.image)
+    fallback = False
+
+    area = locate_face(small)
+    if area is not None and scale != 1.0:
+        if face_is_large_enough(area):
+            area = scale_area(area, 1.0 / scale)
+        else:
+            area = None
+    if area is None and scale != 1.0:
+        fallback = True
+        scale = 1.0
+        area = locate_face(ctx.image)
+
+    ctx.meta["detect_scale"] = round(scale, 4)
+    ctx.meta["detect_fallback"] = fallback
+
+    if area is None:
+        return None
+    return crop_face(ctx, area)
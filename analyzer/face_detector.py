@@ -1,20 +1,50 @@
+from typing import Optional, Sequence, Union
+
 import cv2
 from deepface import DeepFace
 
+from .context import AnalysisContext, ImageSource
+# Реекспорт: профілі дій живуть у легкому analyzer.fingerprint
+from .fingerprint import FACE_ACTION_PROFILES, FACE_ACTIONS_PROFILE, resolve_actions  # noqa: F401
+
 
-def detect_face_info(img_path: str):
+def detect_face_info(img_path: ImageSource,
+                     actions: Union[str, Sequence[str], None] = None):
     """
     Повертає детальну інформацію про обличчя:
     вік, стать, емоції, расовий тип, домінантну емоцію.
     Використовує DeepFace.analyze без параметра prog_bar,
     щоб працювати з різними версіями бібліотеки.
+
+    img_path — шлях до файлу (як раніше), масив BGR або AnalysisContext;
+    для масиву / контексту повторного читання з диска немає.
+
+    actions — профіль ("fast" / "standard" / "full") або список дій.
+    Поля пропущених дій повертаються як None / порожні, а ключ
+    "actions" містить те, що реально рахувалось.
     """
+    actions = resolve_actions(actions)
+
+    # Обличчя вже знайдене спільним етапом (analyzer.face_crop) —
+    # DeepFace аналізує лише щільний кроп, без повторної детекції
+    detector_kwargs = {"enforce_detection": True}
+    if isinstance(img_path, AnalysisContext) and img_path.face_tight is not None:
+        img_path = img_path.face_tight
+        detector_kwargs = {"detector_backend": "skip", "enforce_detection": False}
+    elif isinstance(img_path, AnalysisContext):
+        img_path = img_path.image
+    elif isinstance(img_path, (bytes, bytearray, memoryview)):
+        ctx = AnalysisContext.from_bytes(img_path)
+        if ctx is None:
+            return None
+        img_path = ctx.image
+
     try:
         # ✅ Варіант 1 — стандартний виклик без prog_bar
         result = DeepFace.analyze(
             img_path=img_path,
-            actions=["emotion", "age", "gender", "race"],
-            enforce_detection=True
+            actions=actions,
+            **detector_kwargs
         )
 
     except TypeError:
@@ -22,7 +52,7 @@ def detect_face_info(img_path: str):
         try:
             result = DeepFace.analyze(
                 img_path=img_path,
-                actions=["emotion", "age", "gender", "race"]
+                actions=actions
             )
         except Exception as e:
             print(f"[face_detector] DeepFace analyze failed (fallback): {e}")
@@ -35,12 +65,14 @@ def detect_face_info(img_path: str):
     if isinstance(result, list):
         result = result[0]
 
-    try:
-        age = int(result.get("age", 0))
-    except Exception:
-        age = 0
+    age: Optional[int] = None
+    if "age" in actions:
+        try:
+            age = int(result.get("age", 0))
+        except Exception:
+            age = 0
 
-    gender = str(result.get("gender", ""))
+    gender = str(result.get("gender", "")) if "gender" in actions else None
 
     emotion = result.get("emotion", {}) or {}
     dominant_emotion = str(result.get("dominant_emotion", ""))
@@ -55,4 +87,5 @@ def detect_face_info(img_path: str):
         "dominant_emotion": dominant_emotion,
         "race": dict(race),
         "dominant_race": dominant_race,
-    }
\ No newline at end of file
+        "actions": actions,
+    }
@@ -0,0 +1,56 @@
+# analyzer/fingerprint.py
+
+"""
+Від чого залежить результат аналізу — без важких імпортів.
+
+Профіль дій DeepFace і версія класифікатора радикалів визначають, що
+саме повертає конвеєр. Бот використовує їх у ключах кешу результатів
+(result_cache) ще до того, як завантажено DeepFace / numpy, тому вони
+живуть тут, а face_detector і ml_radical_classifier їх реекспортують.
+"""
+
+import os
+from typing import List, Sequence, Union
+
+# Набори мереж DeepFace. Кожна зайва мережа — це окремий прохід по фото,
+# тож «fast» рахується приблизно вдвічі швидше за «full».
+# Емоції потрібні завжди: на них стоять emotion_model і Big Five.
+FACE_ACTION_PROFILES = {
+    "fast": ["emotion", "age"],
+    "standard": ["emotion", "age", "gender"],
+    "full": ["emotion", "age", "gender", "race"],
+}
+
+# Профіль за замовчуванням для всього деплою
+FACE_ACTIONS_PROFILE = os.getenv("FACE_ACTIONS_PROFILE", "full")
+
+# Змінюй при будь-якій зміні датасету / гіперпараметрів — старі файли
+# моделі тоді будуть відкинуті й перебудовані.
+MODEL_VERSION = "radical-rf-1"
+
+
+def resolve_actions(actions: Union[str, Sequence[str], None] = None) -> List[str]:
+    """
+    Назва профілю, явний список дій або None (профіль деплою)
+    → список дій для DeepFace.analyze.
+    """
+    if actions is None:
+        actions = FACE_ACTIONS_PROFILE
+
+    if isinstance(actions, str):
+        if actions not in FACE_ACTION_PROFILES:
+            print(f"[face_detector] Unknown actions profile '{actions}', using 'full'.")
+            actions = "full"
+        resolved = list(FACE_ACTION_PROFILES[actions])
+    else:
+        known = FACE_ACTION_PROFILES["full"]
+        resolved = [a for a in known if a in actions]
+
+    if "emotion" not in resolved:
+        resolved.insert(0, "emotion")
+    return resolved
+
+
+def analysis_fingerprint(actions: Union[str, Sequence[str], None] = None) -> str:
+    """Ідентифікатор конфігурації аналізу, напр. 'radical-rf-1/emotion,age'."""
+    return f"{MODEL_VERSION}/{','.join(resolve_actions(actions))}"
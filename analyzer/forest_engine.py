@@ -0,0 +1,145 @@
+# analyzer/forest_engine.py
+
+"""
+Скомпільований RandomForest: 250 дерев, упаковані в пласкі масиви NumPy.
+
+sklearn на кожен виклик робить валідацію входу і обхід дерев окремо для
+predict і для predict_proba. Для 12 ознак це дорожче за саму модель.
+Тут усі дерева обходяться разом, векторизовано по пачці рядків,
+а мітка та ймовірність повертаються за один прохід.
+
+Формат (усі вузли всіх дерев підряд):
+    feature[i]   — індекс ознаки вузла (0 для листа)
+    threshold[i] — поріг; лист має +inf, тож «вліво» завжди істина
+    left[i]      — глобальний індекс лівого нащадка (лист посилається сам на себе)
+    right[i]     — глобальний індекс правого нащадка
+    value[i]     — нормовані ймовірності класів у вузлі
+    roots[t]     — індекс кореня дерева t
+"""
+
+from typing import Tuple
+
+import numpy as np
+
+
+class CompiledForest:
+    def __init__(self, feature, threshold, left, right, value, roots, classes, max_depth):
+        self.feature = np.asarray(feature, dtype=np.intp)
+        self.threshold = np.asarray(threshold, dtype=np.float64)
+        self.left = np.asarray(left, dtype=np.intp)
+        self.right = np.asarray(right, dtype=np.intp)
+        self.value = np.asarray(value, dtype=np.float64)
+        self.roots = np.asarray(roots, dtype=np.intp)
+        self.classes = np.asarray(classes)
+        self.max_depth = int(max_depth)
+
+    # ---------------------------------------------------
+    # Побудова з sklearn
+    # ---------------------------------------------------
+    @classmethod
+    def from_sklearn(cls, clf) -> "CompiledForest":
+        features, thresholds, lefts, rights, values, roots = [], [], [], [], [], []
+        offset = 0
+        max_depth = 0
+
+        for est in clf.estimators_:
+            tree = est.tree_
+            n = tree.node_count
+            node_ids = np.arange(n)
+            is_leaf = tree.children_left == -1
+
+            roots.append(offset)
+            features.append(np.where(is_leaf, 0, tree.feature))
+            thresholds.append(np.where(is_leaf, np.inf, tree.threshold))
+            lefts.append(np.where(is_leaf, node_ids, tree.children_left) + offset)
+            rights.append(np.where(is_leaf, node_ids, tree.children_right) + offset)
+
+            # value: (n, 1, n_classes) → частки класів у вузлі (як predict_proba дерева)
+            v = tree.value[:, 0, :].astype(np.float64)
+            normalizer = v.sum(axis=1, keepdims=True)
+            normalizer[normalizer == 0.0] = 1.0
+            values.append(v / normalizer)
+
+            max_depth = max(max_depth, tree.max_depth)
+            offset += n
+
+        return cls(
+            feature=np.concatenate(features),
+            threshold=np.concatenate(thresholds),
+            left=np.concatenate(lefts),
+            right=np.concatenate(rights),
+            value=np.concatenate(values),
+            roots=np.array(roots),
+            classes=clf.classes_,
+            max_depth=max_depth,
+        )
+
+    # ---------------------------------------------------
+    # Серіалізація (.npz — без pickle і без sklearn на старті)
+    # ---------------------------------------------------
+    def save(self, path: str, version: str):
+        np.savez(
+            path,
+            feature=self.feature,
+            threshold=self.threshold,
+            left=self.left,
+            right=self.right,
+            value=self.value,
+            roots=self.roots,
+            classes=self.classes.astype(str),
+            max_depth=np.array(self.max_depth),
+            version=np.array(version),
+        )
+
+    @classmethod
+    def load(cls, path: str) -> Tuple["CompiledForest", str]:
+        with np.load(path, allow_pickle=False) as data:
+            forest = cls(
+                feature=data["feature"],
+                threshold=data["threshold"],
+                left=data["left"],
+                right=data["right"],
+                value=data["value"],
+                roots=data["roots"],
+                classes=data["classes"],
+                max_depth=int(data["max_depth"]),
+            )
+            version = str(data["version"])
+        return forest, version
+
+    # ---------------------------------------------------
+    # Інференс
+    # ---------------------------------------------------
+    def predict_proba(self, X) -> np.ndarray:
+        """
+        X — (n_samples, n_features). Як і sklearn, ознаки спершу
+        приводяться до float32, тож результати збігаються з clf.predict_proba.
+        """
+        X = np.asarray(X, dtype=np.float32)
+        if X.ndim == 1:
+            X = X[None, :]
+
+        n = X.shape[0]
+        rows = np.arange(n)[:, None]
+        nodes = np.broadcast_to(self.roots, (n, self.roots.size)).copy()
+
+        # Глибина дерев обмежена, листя посилається само на себе —
+        # після max_depth кроків кожен рядок у кожному дереві стоїть у листі.
+        for _ in range(self.max_depth):
+            go_left = X[rows, self.feature[nodes]] <= self.threshold[nodes]
+            nodes = np.where(go_left, self.left[nodes], self.right[nodes])
+
+        leaf_values = self.value[nodes]  # (n, n_trees, n_classes)
+
+        # Сума по деревах у тому ж порядку, що й у sklearn
+        proba = np.zeros((n, self.value.shape[1]), dtype=np.float64)
+        for t in range(leaf_values.shape[1]):
+            proba += leaf_values[:, t, :]
+        proba /= leaf_values.shape[1]
+        return proba
+
+    def predict_with_proba(self, X) -> Tuple[np.ndarray, np.ndarray]:
+        """Мітки та максимальна ймовірність — за один обхід дерев."""
+        proba = self.predict_proba(X)
+        best = proba.argmax(axis=1)
+        return self.classes[best], proba[np.arange(proba.shape[0]), best]
@@ -1,172 +1,340 @@
 # analyzer/ml_radical_classifier.py
 
+import os
+import sys
+import threading
+from typing import Dict, Any, List, Tuple
+
 import numpy as np
-from sklearn.ensemble import RandomForestClassifier
-from typing import Dict, Any
+
+from .fingerprint import MODEL_VERSION
+from .forest_engine import CompiledForest
 
 """
 ML-класифікація радикалів Пономаренка.
 Точність при нормальних даних — 85–92%.
+
+Модель більше НЕ тренується при імпорті модуля. Її один раз будує крок
+збірки (див. Dockerfile):
+
+    python -m analyzer.ml_radical_classifier
+
+і зберігає у RADICAL_MODEL_PATH з версійною міткою. На старті воркер лише
+завантажує готовий файл, тож усі процеси дають однакові передбачення.
+Якщо файлу немає або версія не збігається — модель тренується з
+фіксованим seed (детерміновано) і зберігається для наступних запусків.
+
+Для інференсу ліс додатково компілюється в пласкі масиви
+(analyzer.forest_engine, файл RADICAL_ENGINE_PATH) — sklearn на гарячому
+шляху не потрібен.
 """
 
-# --------------------------
-# 1. Навчальна модель
-# --------------------------
-# У продакшн можна замінити на реальні дані + joblib model.pkl
-clf = RandomForestClassifier(
-    n_estimators=250,
-    max_depth=12,
-    min_samples_split=3,
-    min_samples_leaf=2,
-    random_state=42
+# Версія моделі — в analyzer.fingerprint (від неї залежать ключі кешу результатів)
+TRAINING_SEED = 42
+
+MODEL_PATH = os.getenv(
+    "RADICAL_MODEL_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "models", "radical_rf.joblib"),
+)
+ENGINE_PATH = os.getenv(
+    "RADICAL_ENGINE_PATH",
+    os.path.splitext(MODEL_PATH)[0] + ".npz",
 )
 
+FEATURE_ORDER = [
+    "openness", "conscientiousness", "extraversion", "agreeableness", "neuroticism",
+    "fWHR", "symmetry", "jaw", "brow", "eyes", "valence", "stress",
+]
+
+# Якщо модель не впевнена (<0.45) — повертаємо mixed
+MIN_CONFIDENCE = 0.45
+
+
 # --------------------------
-# 2. Синтетичний датасет
+# 1. Синтетичний датасет
 # --------------------------
-# На старті — модель тренується на ~280 реалістичних векторів.
+# Модель тренується на ~280 реалістичних векторів.
 # (Ти зможеш розширити своїми даними з фото!)
-X = []
-y = []
-
-def add(sample, label):
-    X.append(sample)
-    y.append(label)
-
-# Формат sample:
-# [O, C, E, A, N, fWHR, symmetry, jaw, brow, eyes, valence, stress]
-
-# ---------- training patterns ----------
-
-# Збудливий
-for i in range(40):
-    add([
-        np.random.randint(40,65),  # O
-        np.random.randint(45,60),  # C
-        np.random.randint(65,90),  # E
-        np.random.randint(20,40),  # A
-        np.random.randint(60,90),  # N
-        np.random.uniform(1.9, 2.2),   # fWHR
-        np.random.uniform(0.80, 0.92), # symmetry
-        np.random.uniform(0.55, 0.80), # jaw
-        np.random.uniform(0.40, 0.55), # brow
-        np.random.uniform(0.30, 0.70), # eyes
-        np.random.uniform(-0.2, 0.2),  # valence
-        np.random.uniform(0.4, 0.9)    # stress
-    ], "excitable")
-
-# Ананкаст
-for i in range(40):
-    add([
-        np.random.randint(45,65),  
-        np.random.randint(70,95),
-        np.random.randint(30,55),
-        np.random.randint(55,75),
-        np.random.randint(10,40),
-        np.random.uniform(1.55, 1.85),
-        np.random.uniform(0.92, 0.98),
-        np.random.uniform(0.40, 0.60),
-        np.random.uniform(0.30, 0.45),
-        np.random.uniform(0.15, 0.50),
-        np.random.uniform(0.0, 0.4),
-        np.random.uniform(0.0, 0.4)
-    ], "anankast")
-
-# Сенситивний
-for i in range(40):
-    add([
-        np.random.randint(55,75),
-        np.random.randint(35,55),
-        np.random.randint(20,45),
-        np.random.randint(65,90),
-        np.random.randint(60,95),
-        np.random.uniform(1.45, 1.75),
-        np.random.uniform(0.75, 0.88),
-        np.random.uniform(0.30, 0.50),
-        np.random.uniform(0.40, 0.60),
-        np.random.uniform(0.30, 0.70),
-        np.random.uniform(-0.6, -0.1),
-        np.random.uniform(0.2, 0.6)
-    ], "sensetive")
-
-# Епілептоїд
-for i in range(40):
-    add([
-        np.random.randint(35,60),
-        np.random.randint(60,85),
-        np.random.randint(55,80),
-        np.random.randint(20,45),
-        np.random.randint(50,75),
-        np.random.uniform(1.80, 2.10),
-        np.random.uniform(0.85, 0.94),
-        np.random.uniform(0.60, 0.90),
-        np.random.uniform(0.25, 0.45),
-        np.random.uniform(0.20, 0.60),
-        np.random.uniform(-0.3, 0.3),
-        np.random.uniform(0.3, 0.9)
-    ], "epileptoid")
-
-# Істероїд
-for i in range(40):
-    add([
-        np.random.randint(60,90),
-        np.random.randint(35,55),
-        np.random.randint(55,85),
-        np.random.randint(45,70),
-        np.random.randint(35,60),
-        np.random.uniform(1.55, 1.85),
-        np.random.uniform(0.85, 0.95),
-        np.random.uniform(0.45, 0.70),
-        np.random.uniform(0.50, 0.80),
-        np.random.uniform(0.30, 0.80),
-        np.random.uniform(0.1, 0.8),
-        np.random.uniform(0.1, 0.6)
-    ], "hysteroid")
-
-# Гармонійний
-for i in range(40):
-    add([
-        np.random.randint(45,60),
-        np.random.randint(45,60),
-        np.random.randint(45,60),
-        np.random.randint(55,70),
-        np.random.randint(30,50),
-        np.random.uniform(1.60, 1.85),
-        np.random.uniform(0.88, 0.98),
-        np.random.uniform(0.45, 0.65),
-        np.random.uniform(0.35, 0.55),
-        np.random.uniform(0.25, 0.55),
-        np.random.uniform(-0.1, 0.4),
-        np.random.uniform(0.1, 0.4)
-    ], "harmonic")
-
-# Змішаний
-for i in range(40):
-    add([
-        np.random.randint(40,70),
-        np.random.randint(30,70),
-        np.random.randint(30,70),
-        np.random.randint(30,70),
-        np.random.randint(30,70),
-        np.random.uniform(1.55, 1.95),
-        np.random.uniform(0.80, 0.95),
-        np.random.uniform(0.40, 0.70),
-        np.random.uniform(0.25, 0.60),
-        np.random.uniform(0.20, 0.70),
-        np.random.uniform(-0.3, 0.5),
-        np.random.uniform(0.1, 0.7)
-    ], "mixed")
-
-# Навчання моделі
-clf.fit(np.array(X), np.array(y))
+def build_training_set(seed: int = TRAINING_SEED):
+    rng = np.random.RandomState(seed)
+
+    X = []
+    y = []
+
+    def add(sample, label):
+        X.append(sample)
+        y.append(label)
+
+    # Формат sample:
+    # [O, C, E, A, N, fWHR, symmetry, jaw, brow, eyes, valence, stress]
+
+    # ---------- training patterns ----------
+
+    # Збудливий
+    for i in range(40):
+        add([
+            rng.randint(40,65),  # O
+            rng.randint(45,60),  # C
+            rng.randint(65,90),  # E
+            rng.randint(20,40),  # A
+            rng.randint(60,90),  # N
+            rng.uniform(1.9, 2.2),   # fWHR
+            rng.uniform(0.80, 0.92), # symmetry
+            rng.uniform(0.55, 0.80), # jaw
+            rng.uniform(0.40, 0.55), # brow
+            rng.uniform(0.30, 0.70), # eyes
+            rng.uniform(-0.2, 0.2),  # valence
+            rng.uniform(0.4, 0.9)    # stress
+        ], "excitable")
+
+    # Ананкаст
+    for i in range(40):
+        add([
+            rng.randint(45,65),  
+            rng.randint(70,95),
+            rng.randint(30,55),
+            rng.randint(55,75),
+            rng.randint(10,40),
+            rng.uniform(1.55, 1.85),
+            rng.uniform(0.92, 0.98),
+            rng.uniform(0.40, 0.60),
+            rng.uniform(0.30, 0.45),
+            rng.uniform(0.15, 0.50),
+            rng.uniform(0.0, 0.4),
+            rng.uniform(0.0, 0.4)
+        ], "anankast")
+
+    # Сенситивний
+    for i in range(40):
+        add([
+            rng.randint(55,75),
+            rng.randint(35,55),
+            rng.randint(20,45),
+            rng.randint(65,90),
+            rng.randint(60,95),
+            rng.uniform(1.45, 1.75),
+            rng.uniform(0.75, 0.88),
+            rng.uniform(0.30, 0.50),
+            rng.uniform(0.40, 0.60),
+            rng.uniform(0.30, 0.70),
+            rng.uniform(-0.6, -0.1),
+            rng.uniform(0.2, 0.6)
+        ], "sensetive")
+
+    # Епілептоїд
+    for i in range(40):
+        add([
+            rng.randint(35,60),
+            rng.randint(60,85),
+            rng.randint(55,80),
+            rng.randint(20,45),
+            rng.randint(50,75),
+            rng.uniform(1.80, 2.10),
+            rng.uniform(0.85, 0.94),
+            rng.uniform(0.60, 0.90),
+            rng.uniform(0.25, 0.45),
+            rng.uniform(0.20, 0.60),
+            rng.uniform(-0.3, 0.3),
+            rng.uniform(0.3, 0.9)
+        ], "epileptoid")
+
+    # Істероїд
+    for i in range(40):
+        add([
+            rng.randint(60,90),
+            rng.randint(35,55),
+            rng.randint(55,85),
+            rng.randint(45,70),
+            rng.randint(35,60),
+            rng.uniform(1.55, 1.85),
+            rng.uniform(0.85, 0.95),
+            rng.uniform(0.45, 0.70),
+            rng.uniform(0.50, 0.80),
+            rng.uniform(0.30, 0.80),
+            rng.uniform(0.1, 0.8),
+            rng.uniform(0.1, 0.6)
+        ], "hysteroid")
+
+    # Гармонійний
+    for i in range(40):
+        add([
+            rng.randint(45,60),
+            rng.randint(45,60),
+            rng.randint(45,60),
+            rng.randint(55,70),
+            rng.randint(30,50),
+            rng.uniform(1.60, 1.85),
+            rng.uniform(0.88, 0.98),
+            rng.uniform(0.45, 0.65),
+            rng.uniform(0.35, 0.55),
+            rng.uniform(0.25, 0.55),
+            rng.uniform(-0.1, 0.4),
+            rng.uniform(0.1, 0.4)
+        ], "harmonic")
+
+    # Змішаний
+    for i in range(40):
+        add([
+            rng.randint(40,70),
+            rng.randint(30,70),
+            rng.randint(30,70),
+            rng.randint(30,70),
+            rng.randint(30,70),
+            rng.uniform(1.55, 1.95),
+            rng.uniform(0.80, 0.95),
+            rng.uniform(0.40, 0.70),
+            rng.uniform(0.25, 0.60),
+            rng.uniform(0.20, 0.70),
+            rng.uniform(-0.3, 0.5),
+            rng.uniform(0.1, 0.7)
+        ], "mixed")
+
+    return np.array(X), np.array(y)
+
+
+# --------------------------
+# 2. Навчання / збереження / завантаження
+# --------------------------
+def train_classifier(seed: int = TRAINING_SEED):
+    from sklearn.ensemble import RandomForestClassifier
+
+    # У продакшн можна замінити на реальні дані
+    clf = RandomForestClassifier(
+        n_estimators=250,
+        max_depth=12,
+        min_samples_split=3,
+        min_samples_leaf=2,
+        random_state=seed
+    )
+    X, y = build_training_set(seed)
+    clf.fit(X, y)
+    return clf
+
+
+def save_model(clf, path: str = MODEL_PATH):
+    import joblib
+    import sklearn
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = path + ".tmp"
+    joblib.dump(
+        {
+            "version": MODEL_VERSION,
+            "sklearn_version": sklearn.__version__,
+            "model": clf,
+        },
+        tmp_path,
+    )
+    os.replace(tmp_path, path)
+
+
+def load_model(path: str = MODEL_PATH):
+    """Повертає збережену модель або None, якщо файлу немає чи версія інша."""
+    if not os.path.exists(path):
+        return None
+
+    import joblib
+    import sklearn
+
+    try:
+        # mmap: масиви дерев не копіюються в кожен процес окремо
+        bundle = joblib.load(path, mmap_mode="r")
+    except Exception as e:
+        print(f"[ml_radical_classifier] Failed to load {path}: {e}")
+        return None
+
+    if bundle.get("version") != MODEL_VERSION:
+        print(f"[ml_radical_classifier] Model version mismatch in {path}, rebuilding.")
+        return None
+    if bundle.get("sklearn_version") != sklearn.__version__:
+        print(f"[ml_radical_classifier] Model built with sklearn "
+              f"{bundle.get('sklearn_version')}, rebuilding.")
+        return None
+
+    return bundle["model"]
+
+
+_clf = None
+_clf_lock = threading.Lock()
+
+
+def get_classifier():
+    """Модель процесу: завантажена з диска або (резервно) натренована."""
+    global _clf
+    if _clf is None:
+        with _clf_lock:
+            if _clf is None:
+                clf = load_model()
+                if clf is None:
+                    clf = train_classifier()
+                    try:
+                        save_model(clf)
+                    except OSError as e:
+                        print(f"[ml_radical_classifier] Could not save model: {e}")
+                _clf = clf
+    return _clf
+
+
+def compile_engine(clf, path: str = ENGINE_PATH, verify: bool = True) -> CompiledForest:
+    """Компілює ліс у пласкі масиви, звіряє з sklearn і зберігає в .npz."""
+    engine = CompiledForest.from_sklearn(clf)
+
+    if verify:
+        X, _ = build_training_set()
+        probe = np.random.RandomState(TRAINING_SEED + 1)
+        X = np.vstack([X, X + probe.normal(0, 5, X.shape)])
+
+        ref_proba = clf.predict_proba(X)
+        proba = engine.predict_proba(X)
+        if not np.allclose(proba, ref_proba, rtol=0, atol=1e-12):
+            raise RuntimeError("Compiled forest diverges from sklearn predict_proba")
+        if not np.array_equal(engine.classes[proba.argmax(axis=1)], clf.predict(X)):
+            raise RuntimeError("Compiled forest diverges from sklearn predict")
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = path + ".tmp.npz"
+    engine.save(tmp_path, MODEL_VERSION)
+    os.replace(tmp_path, path)
+    return engine
+
+
+_engine = None
+
+
+def get_engine() -> CompiledForest:
+    """Скомпільований ліс процесу; sklearn імпортується лише якщо треба перебудувати."""
+    global _engine
+    if _engine is None:
+        with _clf_lock:
+            if _engine is None:
+                engine = None
+                if os.path.exists(ENGINE_PATH):
+                    try:
+                        engine, version = CompiledForest.load(ENGINE_PATH)
+                        if version != MODEL_VERSION:
+                            engine = None
+                    except Exception as e:
+                        print(f"[ml_radical_classifier] Failed to load {ENGINE_PATH}: {e}")
+                        engine = None
+                if engine is None:
+                    clf = load_model()
+                    if clf is None:
+                        clf = train_classifier()
+                    try:
+                        save_model(clf)
+                        engine = compile_engine(clf)
+                    except OSError as e:
+                        print(f"[ml_radical_classifier] Could not save model: {e}")
+                        engine = CompiledForest.from_sklearn(clf)
+                _engine = engine
+    return _engine
 
 
 # --------------------------
 # 3. Основна функція
 # --------------------------
-def predict_radical(features: Dict[str, Any]) -> str:
-    """Повертає радикал на основі ML."""
-    vector = np.array([[
+def features_to_vector(features: Dict[str, Any]) -> List[float]:
+    return [
         features["openness"],
         features["conscientiousness"],
         features["extraversion"],
@@ -179,13 +347,35 @@ def predict_radical(features: Dict[str, Any]) -> str:
         features.get("eyes", 0.5),
         features.get("valence", 0.0),
         features.get("stress", 0.0),
-    ]])
+    ]
 
-    pred = clf.predict(vector)[0]
-    prob = max(clf.predict_proba(vector)[0])
 
-    # Якщо модель не впевнена (<0.45) — повернути mixed
-    if prob < 0.45:
-        return "mixed"
+def predict_radical_batch(features_list: List[Dict[str, Any]]) -> List[Tuple[str, float]]:
+    """
+    Радикали для пачки векторів ознак за один векторизований прохід.
+    Повертає [(radical_key, probability), ...].
+    """
+    if not features_list:
+        return []
+
+    X = np.array([features_to_vector(f) for f in features_list], dtype=np.float64)
+    labels, probs = get_engine().predict_with_proba(X)
+
+    return [
+        (str(label) if prob >= MIN_CONFIDENCE else "mixed", float(prob))
+        for label, prob in zip(labels, probs)
+    ]
+
+
+def predict_radical(features: Dict[str, Any]) -> str:
+    """Повертає радикал на основі ML."""
+    return predict_radical_batch([features])[0][0]
+
 
-    return pred
\ No newline at end of file
+if __name__ == "__main__":
+    path = sys.argv[1] if len(sys.argv) > 1 else MODEL_PATH
+    clf = train_classifier()
+    save_model(clf, path)
+    engine_path = os.path.splitext(path)[0] + ".npz"
+    compile_engine(clf, engine_path)
+    print(f"[ml_radical_classifier] Saved {MODEL_VERSION} to {path} and {engine_path}")
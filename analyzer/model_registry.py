@@ -0,0 +1,126 @@
+# analyzer/model_registry.py
+
+"""
+Реєстр «теплих» моделей.
+
+DeepFace за замовчуванням вантажить мережі emotion/age/gender/race
+(у межах профілю FACE_ACTIONS_PROFILE) ліниво — при першому фото після деплою. MediaPipe FaceMesh раніше
+створювався заново для кожного зображення. Тут усе піднімається
+один раз на старті процесу:
+
+- warm_up()       — завантажує мережі DeepFace, класифікатор радикалів
+                    і проганяє пробний аналіз (детектор, граф TensorFlow),
+                    один раз на процес;
+- warm_worker()   — warm_up() + FaceMesh для поточного потоку;
+                    використовується як initializer пулу воркерів;
+- get_face_mesh() — FaceMesh, що живе в потоці й перевикористовується;
+- is_ready()      — прапорець готовності моделей у цьому процесі.
+"""
+
+import threading
+from typing import Any
+
+
+# Назви моделей атрибутів у DeepFace.build_model
+_DEEPFACE_MODELS = {
+    "emotion": "Emotion",
+    "age": "Age",
+    "gender": "Gender",
+    "race": "Race",
+}
+
+_lock = threading.Lock()
+_ready = threading.Event()
+_local = threading.local()
+
+
+def _build_deepface_model(name: str) -> Any:
+    from deepface import DeepFace
+
+    try:
+        # Нові версії DeepFace розрізняють задачі моделей
+        return DeepFace.build_model(model_name=name, task="facial_attribute")
+    except TypeError:
+        return DeepFace.build_model(name)
+
+
+def warm_up() -> bool:
+    """
+    Завантажує всі моделі в память процесу. Повторні виклики — no-op.
+    Повертає True, якщо прогрів пройшов успішно.
+    """
+    if _ready.is_set():
+        return True
+
+    with _lock:
+        if _ready.is_set():
+            return True
+
+        try:
+            import numpy as np
+            from . import pipeline  # noqa: F401
+            from .ml_radical_classifier import get_engine
+            from .face_detector import resolve_actions
+            from deepface import DeepFace
+
+            # Лише мережі профілю деплою (FACE_ACTIONS_PROFILE)
+            actions = resolve_actions()
+
+            # Скомпільований класифікатор радикалів — з диска, без тренування
+            get_engine()
+
+            for action in actions:
+                _build_deepface_model(_DEEPFACE_MODELS[action])
+
+            # Пробний прохід: ініціалізує детектор обличчя та граф TF
+            probe = np.full((224, 224, 3), 128, dtype=np.uint8)
+            DeepFace.analyze(
+                img_path=probe,
+                actions=actions,
+                enforce_detection=False,
+            )
+
+            # Спільний детектор (analyzer.face_crop) теж має бути теплим
+            from .face_crop import FACE_DETECTOR_BACKEND
+            DeepFace.extract_faces(
+                img_path=probe,
+                detector_backend=FACE_DETECTOR_BACKEND,
+                enforce_detection=False,
+            )
+        except Exception as e:
+            print(f"[model_registry] Warm-up failed, models will load lazily: {e}")
+            return False
+
+        _ready.set()
+        print("[model_registry] Models are warm.")
+        return True
+
+
+def get_face_mesh():
+    """
+    FaceMesh для поточного потоку. Обʼєкт MediaPipe не потокобезпечний,
+    тому кожен воркер має власний екземпляр, який живе весь час роботи.
+    """
+    face_mesh = getattr(_local, "face_mesh", None)
+    if face_mesh is None:
+        import mediapipe as mp
+
+        face_mesh = mp.solutions.face_mesh.FaceMesh(
+            static_image_mode=True,
+            refine_landmarks=False,
+            max_num_faces=1,
+            min_detection_confidence=0.5,
+        )
+        _local.face_mesh = face_mesh
+    return face_mesh
+
+
+def warm_worker() -> bool:
+    """Initializer воркера: моделі процесу + FaceMesh цього потоку."""
+    ok = warm_up()
+    get_face_mesh()
+    return ok
+
+
+def is_ready() -> bool:
+    return _ready.is_set()
@@ -1,8 +1,8 @@
 # analyzer/personality_model.py
 
-from typing import Dict, Any, Optional
+from typing import Dict, Any, List, Optional, Tuple
 from .radicals import RADICALS
-from .ml_radical_classifier import predict_radical          # ← МАШИННЕ НАВЧАННЯ
+from .ml_radical_classifier import predict_radical, predict_radical_batch   # ← МАШИННЕ НАВЧАННЯ
 from .xai_explainer import explain_radical_choice          # ← XAI ПОЯСНЕННЯ
 
 
@@ -146,15 +146,15 @@ def _adjust_big_five_with_physio(big_five: Dict[str, int],
 
 
 # -----------------------------------------------------------
-# 4. ОСНОВНА ФУНКЦІЯ — ФОРМУЄ ПРОФІЛЬ
+# 4. ОЗНАКИ ДЛЯ ML + ЗБІРКА ПРОФІЛЮ
 # -----------------------------------------------------------
 
-def build_personality_profile(
-    face_info: Dict[str, Any],
+def build_personality_features(
     emotion_data: Dict[str, Any],
     stress_data: Dict[str, Any],
     physio: Optional[Dict[str, Any]] = None,
-) -> Dict[str, Any]:
+) -> Tuple[Dict[str, int], Dict[str, Any]]:
+    """Big Five з корекціями + вектор ознак для класифікатора радикалів."""
 
     # 1) базовий Big Five
     big_five = _base_big_five_from_emotions(emotion_data)
@@ -182,10 +182,17 @@ def build_personality_profile(
         "dominant_emotion": emotion_data.get("dominant_emotion", ""),
     }
 
-    # ---------------------------------------------------
-    # 4) МАШИННЕ НАВЧАННЯ ВИБИРАЄ РАДИКАЛ
-    # ---------------------------------------------------
-    radical_key = predict_radical(features)
+    return big_five, features
+
+
+def assemble_personality_profile(
+    big_five: Dict[str, int],
+    features: Dict[str, Any],
+    radical_key: str,
+    stress_data: Dict[str, Any],
+    physio: Optional[Dict[str, Any]] = None,
+) -> Dict[str, Any]:
+    """Формує профіль, коли радикал уже обрано (поодинці чи пачкою)."""
     radical_info = RADICALS.get(radical_key, RADICALS["mixed"])
 
     # ---------------------------------------------------
@@ -209,4 +216,43 @@ def build_personality_profile(
         "explanation": explanation,             # ← 🔥 ДОДАНО
         "physio_used": bool(physio),
         "notes": notes,
-    }
\ No newline at end of file
+    }
+
+
+# -----------------------------------------------------------
+# 5. ОСНОВНА ФУНКЦІЯ — ФОРМУЄ ПРОФІЛЬ
+# -----------------------------------------------------------
+
+def build_personality_profile(
+    face_info: Dict[str, Any],
+    emotion_data: Dict[str, Any],
+    stress_data: Dict[str, Any],
+    physio: Optional[Dict[str, Any]] = None,
+) -> Dict[str, Any]:
+
+    big_five, features = build_personality_features(emotion_data, stress_data, physio)
+
+    # ---------------------------------------------------
+    # 4) МАШИННЕ НАВЧАННЯ ВИБИРАЄ РАДИКАЛ
+    # ---------------------------------------------------
+    radical_key = predict_radical(features)
+
+    return assemble_personality_profile(big_five, features, radical_key, stress_data, physio)
+
+
+def build_personality_profiles_batch(
+    items: List[Tuple[Dict[str, Any], Dict[str, Any], Optional[Dict[str, Any]]]],
+) -> List[Dict[str, Any]]:
+    """
+    Те саме, що build_personality_profile, але для пачки
+    (emotion_data, stress_data, physio): радикали для всіх рахуються
+    одним викликом класифікатора.
+    """
+    prepared = [build_personality_features(emo, stress, physio) for emo, stress, physio in items]
+    radicals = predict_radical_batch([features for _, features in prepared])
+
+    return [
+        assemble_personality_profile(big_five, features, radical_key, stress, physio)
+        for (big_five, features), (radical_key, _), (_, stress, physio)
+        in zip(prepared, radicals, items)
+    ]
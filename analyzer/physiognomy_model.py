@@ -29,16 +29,28 @@ def build_physiognomy_profile(face_info: Dict[str, Any]) -> Dict[str, Any]:
         "race": {...},
         "dominant_race": str,
     }
+
+    Якщо вік або стать не рахувались (профіль дій "fast" / "standard"),
+    у face_info там None — відповідні блоки описуються нейтрально.
     """
 
+    age_known = face_info.get("age") is not None
+    gender_known = face_info.get("gender") is not None
+
     age = face_info.get("age", 0) or 0
-    gender_raw = str(face_info.get("gender", "")).lower()
+    gender_raw = str(face_info.get("gender") or "").lower()
     dominant_emotion = str(face_info.get("dominant_emotion", "")).lower()
 
     # -------------------------------------------------
     # 1. Умовна "вікова морфологія" (дуже загальні речі)
     # -------------------------------------------------
-    if age < 20:
+    if not age_known:
+        age_desc = (
+            "Вік у цьому аналізі не оцінювався, тому вікові особливості "
+            "міміки не враховуються."
+        )
+        maturity = "вік не оцінювався"
+    elif age < 20:
         age_desc = (
             "Мʼякі, ще не до кінця сформовані риси. Зазвичай у цьому віці "
             "міміка більш активна, а вирази обличчя мінливі."
@@ -66,7 +78,12 @@ def build_physiognomy_profile(face_info: Dict[str, Any]) -> Dict[str, Any]:
     # -------------------------------------------------
     # 2. Гендерно-морфологічні нотатки (дуже обережно)
     # -------------------------------------------------
-    if "female" in gender_raw or "woman" in gender_raw:
+    if not gender_known:
+        gender_desc = (
+            "Стать у цьому аналізі не оцінювалась, тому інтерпретація "
+            "спирається на емоційний фон та загальну міміку."
+        )
+    elif "female" in gender_raw or "woman" in gender_raw:
         gender_desc = (
             "Обличчя сприймається з більш мʼякими, округлими рисами, "
             "що типово для жіночого морфотипу, однак конкретна міміка "
@@ -145,8 +162,12 @@ def build_physiognomy_profile(face_info: Dict[str, Any]) -> Dict[str, Any]:
     # -------------------------------------------------
     # 6. Коротке резюме (для швидкого блоку в боті)
     # -------------------------------------------------
-    short_summary = (
+    age_part = (
         f"Вік (умовно): {age} років, морфологічно — {maturity}. "
+        if age_known else "Вік не оцінювався. "
+    )
+    short_summary = (
+        age_part +
         f"Міміка демонструє емоційний фон, близький до «{dominant_emotion or 'невизначеного'}». "
         "Опис рис обличчя є попереднім і не претендує на точну фізіогномічну діагностику."
     )
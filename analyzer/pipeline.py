@@ -0,0 +1,211 @@
+# analyzer/pipeline.py
+
+"""
+Повний ланцюжок аналізу фото в одному синхронному виклику.
+
+Функція run_analysis — CPU-важка (DeepFace, MediaPipe, RandomForest),
+тому бот запускає її не в event loop, а через analyzer.executor.
+Вона має бути picklable (модульна функція), щоб працювати і в process-pool.
+
+run_analysis_batch — те саме для пачки фото (див. analyzer.batching):
+радикали для всієї пачки рахуються одним векторизованим викликом.
+Помилки ізольовані по фото: на місці фото, що впало, — BatchItemError.
+
+actions — профіль дій DeepFace ("fast" / "standard" / "full") або список;
+None означає профіль деплою (FACE_ACTIONS_PROFILE).
+
+Результат містить result["timings"] — тривалість кожного етапу в секундах.
+Таймінги їдуть разом з результатом, тож бот бачить їх і тоді, коли
+аналіз виконувався в іншому процесі (див. metrics.observe_pipeline_timings).
+"""
+
+import time
+from contextlib import contextmanager
+from typing import Dict, Any, Iterator, List, Optional, Sequence, Union
+
+from .batching import BatchItemError
+from .context import ImageSource, as_context
+from .face_crop import FACE_SHARED_DETECTION, detect_and_crop
+from .face_detector import detect_face_info
+from .emotion_model import interpret_emotions
+from .stress_model import detect_microstress
+from .personality_model import build_personality_profile, build_personality_profiles_batch
+from .professional_profile import build_professional_profile
+from .report_builder import build_full_report
+from .physiognomy_model import build_physiognomy_profile
+
+
+Actions = Union[str, Sequence[str], None]
+
+
+@contextmanager
+def _stage(timings: Dict[str, float], name: str) -> Iterator[None]:
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings[name] = timings.get(name, 0.0) + (time.perf_counter() - start)
+
+
+def _analyze_face(img_path: ImageSource, actions: Actions = None) -> Optional[Dict[str, Any]]:
+    """Етапи 1–4: все, що передує вибору радикала."""
+    timings: Dict[str, float] = {}
+
+    with _stage(timings, "decode"):
+        ctx = as_context(img_path)
+    if ctx is None:
+        return None
+
+    # --- 0. DETECT + CROP (один детектор для DeepFace і FaceMesh) ---
+    if FACE_SHARED_DETECTION and ctx.face_crop is None:
+        with _stage(timings, "detect"):
+            found = detect_and_crop(ctx)
+        if found is None:
+            return None
+
+    # --- 1. FACE ---
+    with _stage(timings, "face"):
+        face_info = detect_face_info(ctx, actions)
+    if face_info is None:
+        return None
+
+    # Масштаби препроцесингу — для бенчмарку точність / затримка
+    face_info["preprocess"] = {
+        "frame": [ctx.width, ctx.height],
+        **ctx.meta,
+    }
+
+    # --- 2. EMOTION ---
+    with _stage(timings, "emotion"):
+        emotion_data = interpret_emotions(face_info.get("emotion", {}))
+
+    # --- 3. STRESS ---
+    with _stage(timings, "stress"):
+        stress_data = detect_microstress(ctx)
+
+    # --- 4. PHYSIOGNOMY (must be BEFORE personality) ---
+    with _stage(timings, "physiognomy"):
+        physiognomy = build_physiognomy_profile(face_info)
+
+    return {
+        "face_info": face_info,
+        "emotion_data": emotion_data,
+        "stress_data": stress_data,
+        "physiognomy": physiognomy,
+        "timings": timings,
+    }
+
+
+def _finish(partial: Dict[str, Any], personality: Dict[str, Any]) -> Dict[str, Any]:
+    """Етапи 6–7: професійний профіль і текст звіту."""
+    timings = partial["timings"]
+
+    # --- 6. PROFESSIONAL PROFILE ---
+    with _stage(timings, "professional"):
+        professional = build_professional_profile(personality)
+
+    # --- 7. FULL REPORT ---
+    with _stage(timings, "report"):
+        full_report = build_full_report(
+            partial["face_info"],
+            partial["emotion_data"],
+            partial["stress_data"],
+            personality,
+            professional,
+            partial["physiognomy"],
+        )
+
+    return {
+        **partial,
+        "personality": personality,
+        "professional": professional,
+        "full_report": full_report,
+    }
+
+
+def run_analysis(img_path: ImageSource, actions: Actions = None) -> Optional[Dict[str, Any]]:
+    """
+    Проганяє фото через усі етапи аналізу.
+    Повертає None, якщо обличчя не знайдено, інакше словник з результатами
+    кожного етапу та готовим текстом звіту.
+
+    img_path — шлях, байти JPEG, масив BGR або AnalysisContext.
+    Фото декодується один раз, далі всі етапи працюють з одним буфером.
+    """
+    partial = _analyze_face(img_path, actions)
+    if partial is None:
+        return None
+
+    # --- 5. PERSONALITY (Big Five + ML Radicals) ---
+    with _stage(partial["timings"], "personality"):
+        personality = build_personality_profile(
+            partial["face_info"],
+            partial["emotion_data"],
+            partial["stress_data"],
+            partial["physiognomy"],
+        )
+
+    return _finish(partial, personality)
+
+
+def _personalities(found: List[Dict[str, Any]]) -> List[Any]:
+    """
+    Етап 5 для пачки: один виклик класифікатора. Якщо він падає —
+    по одному фото, щоб помилка дісталась лише своєму.
+    """
+    inputs = [(p["emotion_data"], p["stress_data"], p["physiognomy"]) for p in found]
+    try:
+        return build_personality_profiles_batch(inputs)
+    except Exception:
+        pass
+
+    out: List[Any] = []
+    for item in inputs:
+        try:
+            out.extend(build_personality_profiles_batch([item]))
+        except Exception as e:
+            out.append(BatchItemError.from_exception(e))
+    return out
+
+
+def run_analysis_batch(sources: List[Any]) -> List[Union[Dict[str, Any], BatchItemError, None]]:
+    """
+    Аналіз пачки фото. Результати — у тому ж порядку, None там,
+    де обличчя не знайдено, BatchItemError там, де аналіз фото впав.
+
+    Елемент пачки — джерело фото або пара (джерело, actions), якщо
+    для конкретного запиту потрібен свій профіль дій.
+    """
+    partials: List[Any] = []
+    for item in sources:
+        try:
+            if isinstance(item, tuple):
+                partials.append(_analyze_face(*item))
+            else:
+                partials.append(_analyze_face(item))
+        except Exception as e:
+            partials.append(BatchItemError.from_exception(e))
+    found = [p for p in partials if isinstance(p, dict)]
+
+    # --- 5. PERSONALITY: один виклик класифікатора на всю пачку ---
+    start = time.perf_counter()
+    personalities = iter(_personalities(found))
+    # Частка пачки на кожне фото
+    share = (time.perf_counter() - start) / max(1, len(found))
+    for p in found:
+        p["timings"]["personality"] = share
+
+    results: List[Any] = []
+    for p in partials:
+        if not isinstance(p, dict):
+            results.append(p)
+            continue
+        personality = next(personalities)
+        if isinstance(personality, BatchItemError):
+            results.append(personality)
+            continue
+        try:
+            results.append(_finish(p, personality))
+        except Exception as e:
+            results.append(BatchItemError.from_exception(e))
+    return results
@@ -0,0 +1,61 @@
+# analyzer/preprocess.py
+
+"""
+Адаптивне зменшення кадру перед інференсом.
+
+message.photo[-1] — найбільша версія фото, і раніше повний кадр ішов
+прямо в детектор. Тепер детектор бачить кадр, зменшений до
+ANALYZER_DETECT_MAX_SIDE, а моделі атрибутів і FaceMesh отримують
+кроп фіксованого розміру (FACE_CROP_SIZE), вирізаний з ОРИГІНАЛУ.
+
+Захист якості: якщо у зменшеному кадрі обличчя вийшло меншим за
+ANALYZER_MIN_FACE_PX (або не знайшлось зовсім), детекція повторюється
+на повній роздільності.
+
+Обраний масштаб пишеться в ctx.meta і далі у face_info["preprocess"],
+щоб можна було порівнювати точність і затримку.
+"""
+
+import os
+from typing import Any, Dict, Tuple
+
+import cv2
+import numpy as np
+
+ANALYZER_DETECT_MAX_SIDE = int(os.getenv("ANALYZER_DETECT_MAX_SIDE", "1024"))
+ANALYZER_MIN_FACE_PX = int(os.getenv("ANALYZER_MIN_FACE_PX", "80"))
+
+
+def downscale(image: np.ndarray, max_side: int = ANALYZER_DETECT_MAX_SIDE) -> Tuple[np.ndarray, float]:
+    """Зменшує кадр так, щоб довша сторона ≤ max_side. Повертає (кадр, масштаб)."""
+    h, w = image.shape[:2]
+    longest = max(h, w)
+    if max_side <= 0 or longest <= max_side:
+        return image, 1.0
+
+    scale = max_side / float(longest)
+    small = cv2.resize(
+        image,
+        (max(1, int(round(w * scale))), max(1, int(round(h * scale)))),
+        interpolation=cv2.INTER_AREA,
+    )
+    return small, scale
+
+
+def scale_area(area: Dict[str, Any], factor: float) -> Dict[str, Any]:
+    """Переводить facial_area (рамку й очі) з одного масштабу в інший."""
+    if factor == 1.0:
+        return dict(area)
+
+    scaled = dict(area)
+    for key in ("x", "y", "w", "h"):
+        scaled[key] = int(round(area[key] * factor))
+    for key in ("left_eye", "right_eye"):
+        point = area.get(key)
+        if point:
+            scaled[key] = (int(round(point[0] * factor)), int(round(point[1] * factor)))
+    return scaled
+
+
+def face_is_large_enough(area: Dict[str, Any], min_face_px: int = ANALYZER_MIN_FACE_PX) -> bool:
+    return min(area["w"], area["h"]) >= min_face_px
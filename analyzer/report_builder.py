@@ -20,9 +20,11 @@ def confidence_score(face_info: Dict[str, Any], emotion: Dict[str, Any]) -> int:
     score = 90
 
     # Якщо модель сумнівається у віці / статі — мінус
-    if face_info.get("age", 0) in (0, None):
+    # (лише для тих полів, які взагалі рахувались у цьому профілі)
+    actions = face_info.get("actions") or ["age", "gender"]
+    if "age" in actions and face_info.get("age", 0) in (0, None):
         score -= 15
-    if not face_info.get("gender"):
+    if "gender" in actions and not face_info.get("gender"):
         score -= 10
 
     # Якщо емоція "neutral" — інтерпретація менш точна
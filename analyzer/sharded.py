@@ -0,0 +1,222 @@
+# analyzer/sharded.py
+
+"""
+Шардований аналіз: N окремих процесів-аналізаторів з прив'язкою користувачів.
+
+У звичайному режимі всі фото йдуть у спільний AnalysisExecutor, і будь-який
+воркер бере будь-яке фото. Тут кожен шард — власний процес (spawn) з
+прогрітими моделями, а фото користувача завжди потрапляють у шард
+crc32(user_id) % N:
+
+- фото одного користувача обробляються по черзі в одному процесі
+  (порядок збережено: шард виконує пачки послідовно);
+- стан, що накопичується в процесі (моделі, FaceMesh, кеші), працює на
+  «своїх» користувачів, а не розмазується по всіх воркерах;
+- важкий інференс різних шардів не ділить один GIL.
+
+Супервізор (ShardedAnalyzer) перезапускає процес, що впав
+(BrokenProcessPool), і повторно ставить у чергу пачки, які в ньому
+виконувались; простоюючі шарди періодично пінгуються (monitor), щоб
+падіння помітити до наступного фото.
+
+Налаштування:
+    ANALYZER_SHARDS            — кількість процесів (за замовчуванням = кількість ядер)
+    ANALYZER_SHARD_QUEUE_SIZE  — пачок, що можуть чекати в одному шарді
+    ANALYZER_SHARD_RETRIES     — скільки разів повторювати пачку після падіння процесу
+    ANALYZER_BATCH_SIZE / ANALYZER_BATCH_WAIT_MS — мікробатчинг у межах шарда
+"""
+
+import os
+import zlib
+import asyncio
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Dict, List, Optional
+
+from .batching import MicroBatcher
+from .executor import AnalysisExecutor, _env_int, _noop
+from .model_registry import warm_worker
+
+
+def shard_for(key: Any, shards: int) -> int:
+    """Стабільний номер шарда (однаковий між перезапусками, на відміну від hash(str))."""
+    return zlib.crc32(str(key).encode("utf-8")) % shards
+
+
+class Shard:
+    """Один процес-аналізатор: AnalysisExecutor(process, 1 воркер) + власний MicroBatcher."""
+
+    def __init__(self, index: int, batch_fn: Callable[[List[Any]], List[Any]],
+                 queue_size: int, initializer: Optional[Callable[[], Any]]):
+        self.index = index
+        self.executor = AnalysisExecutor(
+            kind="process", workers=1, queue_size=queue_size, initializer=initializer,
+        )
+        self.batcher = MicroBatcher(batch_fn, self.executor)
+
+        # Збільшується при кожному перезапуску — щоб одне падіння
+        # не перезапускало процес стільки разів, скільки пачок у ньому було
+        self.generation = 0
+        self.restarts = 0
+        # Фото в шарді зараз: у буфері пачки, у черзі пулу або в обробці
+        self.in_flight = 0
+        self.items_total = 0
+        self.failed_total = 0
+
+    def restart(self, generation: int):
+        if generation != self.generation:
+            return
+        self.generation += 1
+        self.restarts += 1
+        print(f"[sharded] Shard {self.index} crashed, restarting (restart #{self.restarts})")
+        # Пачки старого процесу ще падають по черзі — нові не відправляємо,
+        # доки їхні повтори не стануть у буфер на свої місця
+        self.batcher.hold()
+        self.executor.shutdown(wait=False)
+        self.executor.start_warm_up()
+
+
+class ShardedAnalyzer:
+    """
+    Той самий інтерфейс, що й AnalysisExecutor + MicroBatcher у bot.py
+    (pending / capacity / ready / start_warm_up / wait_warm / shutdown / stats),
+    але submit(item, key) маршрутизує фото в шард за ключем (user_id).
+    """
+
+    def __init__(
+        self,
+        batch_fn: Callable[[List[Any]], List[Any]],
+        shards: Optional[int] = None,
+        queue_size: Optional[int] = None,
+        retries: Optional[int] = None,
+        initializer: Optional[Callable[[], Any]] = warm_worker,
+    ):
+        self.workers = shards or _env_int("ANALYZER_SHARDS", os.cpu_count() or 1)
+        queue_size = queue_size or _env_int("ANALYZER_SHARD_QUEUE_SIZE", 4)
+        self.retries = retries if retries is not None else _env_int("ANALYZER_SHARD_RETRIES", 1)
+
+        self.shards = [Shard(i, batch_fn, queue_size, initializer) for i in range(self.workers)]
+        self.max_batch_size = self.shards[0].batcher.max_batch_size
+
+    # ---------------------------------------------------
+    # Життєвий цикл
+    # ---------------------------------------------------
+    async def warm_up(self) -> bool:
+        results = await asyncio.gather(
+            *(shard.executor.warm_up() for shard in self.shards),
+            return_exceptions=True,
+        )
+        return all(r is True for r in results)
+
+    def start_warm_up(self) -> asyncio.Future:
+        for shard in self.shards:
+            shard.executor.start_warm_up()
+        return asyncio.ensure_future(self.wait_warm())
+
+    async def wait_warm(self) -> bool:
+        """
+        Чекає прогрів кожного шарда. Задача прогріву — своя в кожного
+        AnalysisExecutor і створюється заново при перезапуску шарда, тож
+        після падіння чекаємо вже новий процес, а не старий прогрів.
+        """
+        results = await asyncio.gather(
+            *(shard.executor.wait_warm() for shard in self.shards),
+            return_exceptions=True,
+        )
+        return all(r is True for r in results)
+
+    def shutdown(self, wait: bool = True):
+        for shard in self.shards:
+            shard.executor.shutdown(wait=wait)
+
+    async def monitor(self, interval: float = 10.0):
+        """
+        Фонова перевірка простоюючих шардів: пінг через пул процесу.
+        Впалий процес перезапускається (і прогрівається) до наступного фото.
+        """
+        while True:
+            await asyncio.sleep(interval)
+            for shard in self.shards:
+                if shard.executor.pending or not shard.executor.ready:
+                    continue
+                generation = shard.generation
+                try:
+                    await shard.executor.run(_noop)
+                except BrokenProcessPool:
+                    shard.restart(generation)
+                except Exception as e:
+                    print(f"[sharded] Shard {shard.index} health check failed: {e}")
+
+    # ---------------------------------------------------
+    # Стан
+    # ---------------------------------------------------
+    @property
+    def pending(self) -> int:
+        return sum(shard.executor.pending for shard in self.shards)
+
+    @property
+    def capacity(self) -> int:
+        return sum(shard.executor.capacity for shard in self.shards)
+
+    @property
+    def ready(self) -> bool:
+        return all(shard.executor.ready for shard in self.shards)
+
+    @property
+    def batches_total(self) -> int:
+        return sum(shard.batcher.batches_total for shard in self.shards)
+
+    def stats(self) -> Dict[str, Any]:
+        """Зведення в форматі MicroBatcher.stats() + навантаження по шардах."""
+        batches = self.batches_total
+        items = sum(shard.batcher.items_total for shard in self.shards)
+        wait_ms = sum(shard.batcher.wait_ms_total for shard in self.shards)
+        return {
+            "batches_total": batches,
+            "items_total": items,
+            "avg_batch_size": (items / batches) if batches else 0.0,
+            "avg_wait_ms": (wait_ms / items) if items else 0.0,
+            "max_batch_size": self.max_batch_size,
+            "shards": [self.shard_stats(shard) for shard in self.shards],
+        }
+
+    @staticmethod
+    def shard_stats(shard: Shard) -> Dict[str, Any]:
+        return {
+            "shard": shard.index,
+            "in_flight": shard.in_flight,
+            "ready": shard.executor.ready,
+            "items_total": shard.items_total,
+            "failed_total": shard.failed_total,
+            "restarts": shard.restarts,
+        }
+
+    # ---------------------------------------------------
+    # Запуск задачі
+    # ---------------------------------------------------
+    async def submit(self, item: Any, key: Any = None) -> Any:
+        """
+        Аналіз item у шарді користувача key. Якщо процес шарда впав,
+        він перезапускається, а пачка повторюється (до retries разів) —
+        на початку черги шарда, щоб фото користувача не обігнали новіші.
+        """
+        shard = self.shards[shard_for(key, self.workers)]
+        shard.in_flight += 1
+        # Повтор іде з тим самим номером — на своє місце в черзі шарда
+        seq = shard.batcher.next_seq()
+        try:
+            attempt = 0
+            while True:
+                generation = shard.generation
+                try:
+                    result = await shard.batcher.submit(item, seq=seq)
+                except BrokenProcessPool:
+                    shard.restart(generation)
+                    attempt += 1
+                    if attempt > self.retries:
+                        shard.failed_total += 1
+                        raise
+                    continue
+                shard.items_total += 1
+                return result
+        finally:
+            shard.in_flight -= 1
@@ -1,30 +1,30 @@
-import cv2
 import numpy as np
-import mediapipe as mp
 
-
-mp_face_mesh = mp.solutions.face_mesh
+from .context import ImageSource, as_context
+from .model_registry import get_face_mesh
 
 
 def _distance(p1, p2):
     return float(np.linalg.norm(np.array(p1) - np.array(p2)))
 
 
-def _load_landmarks(img_path: str):
-    img = cv2.imread(img_path)
-    if img is None:
+def _load_landmarks(img_path: ImageSource):
+    """
+    Лендмарки FaceMesh. Приймає шлях (старий режим) або вже декодоване
+    фото — тоді RGB-буфер береться з контексту без повторного декодування.
+    """
+    ctx = as_context(img_path)
+    if ctx is None:
         return None, None, None
 
-    h, w = img.shape[:2]
+    # Якщо є спільний кроп обличчя (analyzer.face_crop) — FaceMesh працює
+    # лише по ньому; метрики нормуються на висоту обличчя, тож масштаб кропу
+    # на результат не впливає
+    rgb = ctx.face_rgb if ctx.face_crop is not None else ctx.rgb
+    h, w = rgb.shape[:2]
 
-    with mp_face_mesh.FaceMesh(
-        static_image_mode=True,
-        refine_landmarks=False,
-        max_num_faces=1,
-        min_detection_confidence=0.5,
-    ) as face_mesh:
-        rgb = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
-        res = face_mesh.process(rgb)
+    # FaceMesh живе в потоці воркера (model_registry), а не створюється на кожне фото
+    res = get_face_mesh().process(rgb)
 
     if not res.multi_face_landmarks:
         return None, w, h
@@ -34,7 +34,7 @@ def _load_landmarks(img_path: str):
     return landmarks, w, h
 
 
-def detect_microstress(img_path: str, face_info: dict | None = None):
+def detect_microstress(img_path: ImageSource, face_info: dict | None = None):
     """
     Евристичний аналіз мікростресу:
     - очі (розкритість повік)
@@ -0,0 +1,19 @@
+# analyzer/tasks.py
+
+"""
+Точки входу для пулу воркерів, які не тягнуть важкі модулі при імпорті.
+
+bot.py передає ці функції в AnalysisExecutor / MicroBatcher. Сам імпорт
+analyzer.tasks нічого не вантажить: DeepFace, TensorFlow, MediaPipe, cv2
+імпортуються в момент першого виклику — у воркері, а не в event loop
+під час старту бота. Функції модульні, тож picklable і для process-pool.
+"""
+
+from typing import Any, Dict, List, Optional
+
+
+def analyze_batch(sources: List[Any]) -> List[Optional[Dict[str, Any]]]:
+    """Лінива обгортка над analyzer.pipeline.run_analysis_batch."""
+    from .pipeline import run_analysis_batch
+
+    return run_analysis_batch(sources)
@@ -0,0 +1,392 @@
+# batch_analyze.py
+"""
+Офлайн-аналіз архівів фото без Telegram.
+
+Той самий конвеєр, що й у боті (analyzer.pipeline), але над каталогом
+або списком файлів, у кількох процесах. Результати йдуть потоком у JSONL
+і/або в базу звітів (database.save_report).
+
+Приклади:
+    python batch_analyze.py photos/ -o results.jsonl --workers 4
+    python batch_analyze.py manifest.txt --db --user-id 0
+    python batch_analyze.py manifest.jsonl --db -o results.jsonl --actions fast
+
+Маніфест:
+    *.txt / інше — шлях до фото на рядок (# — коментар);
+    *.jsonl      — {"path": ..., "user_id": ...} на рядок.
+Відносні шляхи в маніфесті — відносно каталогу маніфесту.
+
+Продовження після зупинки: оброблені шляхи дописуються у файл прогресу
+(--progress, за замовчуванням <output>.progress або batch_analyze.progress),
+і при повторному запуску пропускаються. --restart — почати з нуля.
+Перед записом результату шлях позначається як «розпочатий»; якщо процес
+упав між записом у JSONL / базу і позначкою «готово», при продовженні
+такий шлях перевіряється у виході й у базі, і дубль не пишеться.
+
+Якщо процес пулу падає (напр. OOM), фото його пачок записуються як
+error, а пул створюється заново — решта архіву обробляється далі.
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import multiprocessing
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Dict, Iterator, List, Optional, Set, Tuple
+
+IMAGE_EXTENSIONS = {".jpg", ".jpeg", ".png", ".bmp", ".webp"}
+
+# (шлях, user_id або None)
+Item = Tuple[str, Optional[int]]
+
+
+# ======================================================
+#                  ДЖЕРЕЛА ФОТО
+# ======================================================
+def _scan_dir(root: str, recursive: bool) -> Iterator[str]:
+    if recursive:
+        for dirpath, dirnames, filenames in os.walk(root):
+            dirnames.sort()
+            for name in sorted(filenames):
+                if os.path.splitext(name)[1].lower() in IMAGE_EXTENSIONS:
+                    yield os.path.join(dirpath, name)
+    else:
+        for name in sorted(os.listdir(root)):
+            path = os.path.join(root, name)
+            if os.path.isfile(path) and os.path.splitext(name)[1].lower() in IMAGE_EXTENSIONS:
+                yield path
+
+
+def _read_manifest(path: str) -> Iterator[Item]:
+    base = os.path.dirname(os.path.abspath(path))
+    is_jsonl = path.endswith(".jsonl")
+
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+
+            user_id = None
+            if is_jsonl:
+                entry = json.loads(line)
+                line = entry["path"]
+                user_id = entry.get("user_id")
+
+            yield os.path.join(base, line), user_id
+
+
+def iter_items(inputs: List[str], recursive: bool = False) -> Iterator[Item]:
+    """Усі фото з каталогів / маніфестів / окремих файлів, у стабільному порядку."""
+    for src in inputs:
+        if os.path.isdir(src):
+            for path in _scan_dir(src, recursive):
+                yield path, None
+        elif os.path.splitext(src)[1].lower() in IMAGE_EXTENSIONS:
+            yield src, None
+        else:
+            yield from _read_manifest(src)
+
+
+# ======================================================
+#                  ПРОГРЕС
+# ======================================================
+class Progress:
+    """
+    Файл оброблених шляхів: по одному на рядок, дописується одразу.
+    Рядок "~<TAB>шлях" — запис результату розпочато (begin), звичайний
+    рядок — завершено (mark). Розпочаті, але не завершені — in_doubt.
+    """
+
+    BEGIN = "~\t"
+
+    def __init__(self, path: str, restart: bool = False):
+        self.path = path
+        self.done: Set[str] = set()
+        self.in_doubt: Set[str] = set()
+
+        if restart and os.path.exists(path):
+            os.remove(path)
+        if os.path.exists(path):
+            begun: Set[str] = set()
+            with open(path, encoding="utf-8") as f:
+                for line in f:
+                    line = line.rstrip("\n")
+                    if not line:
+                        continue
+                    if line.startswith(self.BEGIN):
+                        begun.add(line[len(self.BEGIN):])
+                    else:
+                        self.done.add(line)
+            self.in_doubt = begun - self.done
+
+        self._file = open(path, "a", encoding="utf-8")
+
+    def __contains__(self, key: str) -> bool:
+        return key in self.done
+
+    def begin(self, key: str):
+        self._file.write(self.BEGIN + key + "\n")
+        self._file.flush()
+
+    def mark(self, key: str):
+        self.done.add(key)
+        self.in_doubt.discard(key)
+        self._file.write(key + "\n")
+        self._file.flush()
+
+    def close(self):
+        self._file.close()
+
+
+def _written_paths(output: str, paths: Set[str]) -> Set[str]:
+    """Які з paths уже є у JSONL-виході (перевірка розпочатих при продовженні)."""
+    found: Set[str] = set()
+    if not paths or not os.path.exists(output):
+        return found
+    with open(output, encoding="utf-8") as f:
+        for line in f:
+            try:
+                path = json.loads(line).get("path")
+            except ValueError:
+                continue  # обірваний останній рядок
+            if path in paths:
+                found.add(path)
+    return found
+
+
+def _saved_paths(paths: Set[str]) -> Set[str]:
+    """Які з paths уже записані в reports (image_path)."""
+    from database import get_storage
+
+    storage = get_storage()
+    return {
+        path for path in paths
+        if storage.query_one("SELECT 1 FROM reports WHERE image_path = ? LIMIT 1", (path,))
+    }
+
+
+# ======================================================
+#                  ВОРКЕР (окремий процес)
+# ======================================================
+def _worker_init():
+    # Виняток в initializer ламає весь пул — тоді краще ліниве завантаження
+    try:
+        from analyzer.model_registry import warm_worker
+
+        warm_worker()
+    except Exception as e:
+        print(f"[batch_analyze] Worker warm-up failed: {e}", file=sys.stderr)
+
+
+def _analyze_chunk(paths: List[str], actions: Optional[str]) -> List[Tuple[str, Optional[Dict[str, Any]], str]]:
+    """
+    Пачка фото одним викликом run_analysis_batch (радикали — векторизовано).
+    Помилки ізольовані по фото (BatchItemError у слоті), сусіди не страждають.
+    Повертає [(path, result | None, error)].
+    """
+    from analyzer.batching import BatchItemError
+    from analyzer.pipeline import run_analysis_batch
+
+    items: List[Any] = []
+    for path in paths:
+        try:
+            with open(path, "rb") as f:
+                items.append((f.read(), actions))
+        except OSError as e:
+            items.append(BatchItemError.from_exception(e))
+
+    # Непрочитані файли в конвеєр не йдуть, але зберігають своє місце
+    readable = [item for item in items if not isinstance(item, BatchItemError)]
+    results = iter(run_analysis_batch(readable))
+
+    out = []
+    for path, item in zip(paths, items):
+        result = item if isinstance(item, BatchItemError) else next(results)
+        if isinstance(result, BatchItemError):
+            out.append((path, None, str(result)))
+        else:
+            out.append((path, result, ""))
+    return out
+
+
+def _chunks(items: Iterator[Item], size: int) -> Iterator[List[Item]]:
+    chunk: List[Item] = []
+    for item in items:
+        chunk.append(item)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+# ======================================================
+#                     ЗАПУСК
+# ======================================================
+def run(args: argparse.Namespace) -> Dict[str, int]:
+    from serialization import dumps
+
+    if args.db:
+        from database import init_db, save_report
+        init_db()
+
+    progress_path = args.progress or (
+        f"{args.output}.progress" if args.output and args.output != "-" else "batch_analyze.progress"
+    )
+    progress = Progress(progress_path, restart=args.restart)
+
+    if args.output == "-":
+        out = sys.stdout
+    elif args.output:
+        out = open(args.output, "w" if args.restart else "a", encoding="utf-8")
+    else:
+        out = None
+
+    stats = {"ok": 0, "no_face": 0, "error": 0, "skipped": 0}
+    user_ids: Dict[str, Optional[int]] = {}
+
+    # Упали між записом і позначкою «готово»: повторно не пишемо те, що вже є
+    written_out: Set[str] = set()
+    saved_db: Set[str] = set()
+    if progress.in_doubt:
+        if out is not None and out is not sys.stdout:
+            written_out = _written_paths(args.output, progress.in_doubt)
+        if args.db:
+            saved_db = _saved_paths(progress.in_doubt)
+
+    def pending_items() -> Iterator[Item]:
+        for path, user_id in iter_items(args.inputs, args.recursive):
+            if path in progress:
+                stats["skipped"] += 1
+                continue
+            user_ids[path] = user_id
+            yield path, user_id
+
+    def handle(path: str, result: Optional[Dict[str, Any]], error: str):
+        status = "error" if error else ("no_face" if result is None else "ok")
+        stats[status] += 1
+        progress.begin(path)
+
+        if out is not None and path not in written_out:
+            record: Dict[str, Any] = {"path": path, "status": status}
+            if error:
+                record["error"] = error
+            if result is not None:
+                record["result"] = result
+            out.write(dumps(record) + "\n")
+            out.flush()
+
+        if args.db and result is not None and path not in saved_db:
+            user_id = user_ids.get(path)
+            save_report(
+                args.user_id if user_id is None else user_id,
+                path,
+                result["face_info"],
+                result["emotion_data"],
+                result["stress_data"],
+                result["personality"],
+                result["professional"],
+                result["full_report"],
+            )
+
+        user_ids.pop(path, None)
+        progress.mark(path)
+
+    started = time.perf_counter()
+    ctx = multiprocessing.get_context("spawn")  # TensorFlow погано переживає fork
+
+    def new_pool() -> ProcessPoolExecutor:
+        return ProcessPoolExecutor(max_workers=args.workers, mp_context=ctx,
+                                   initializer=_worker_init)
+
+    def collect(future: Future, paths: List[str]) -> bool:
+        """Обробляє результат пачки. True — процес пулу впав."""
+        try:
+            chunk_results = future.result()
+        except BrokenProcessPool as e:
+            # Процес пулу вбито (OOM тощо) — пачка втрачена, решта архіву — ні
+            for path in paths:
+                handle(path, None, f"BrokenProcessPool: {e}")
+            return True
+        for path, result, error in chunk_results:
+            handle(path, result, error)
+        return False
+
+    pool = new_pool()
+    try:
+        chunks = _chunks(pending_items(), args.chunk_size)
+        in_flight: Dict[Future, List[str]] = {}
+        exhausted = False
+
+        # Обмежене вікно задач: архів на тисячі фото не тягнеться в памʼять
+        while True:
+            while not exhausted and len(in_flight) < args.workers * 2:
+                chunk = next(chunks, None)
+                if chunk is None:
+                    exhausted = True
+                    break
+                paths = [p for p, _ in chunk]
+                in_flight[pool.submit(_analyze_chunk, paths, args.actions)] = paths
+
+            if not in_flight:
+                break
+
+            done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            broken = False
+            for future in done:
+                broken |= collect(future, in_flight.pop(future))
+
+            if broken:
+                # Решта пачок зламаного пулу теж завершується помилкою (або
+                # встигла завершитись) — збираємо їх до перезапуску
+                print("[batch_analyze] Worker process died, restarting the pool", file=sys.stderr)
+                wait(in_flight)
+                for future, paths in in_flight.items():
+                    collect(future, paths)
+                in_flight.clear()
+                pool.shutdown(wait=False)
+                pool = new_pool()
+
+            processed = stats["ok"] + stats["no_face"] + stats["error"]
+            rate = processed / max(1e-9, time.perf_counter() - started)
+            print(f"[batch_analyze] {processed} done ({rate:.2f}/s), {stats}", file=sys.stderr)
+    finally:
+        pool.shutdown()
+        progress.close()
+        if out is not None and out is not sys.stdout:
+            out.close()
+
+    return stats
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Offline batch analysis of photos.")
+    parser.add_argument("inputs", nargs="+", help="каталоги, маніфести (.txt / .jsonl) або файли фото")
+    parser.add_argument("-o", "--output", help="JSONL з результатами ('-' — stdout)")
+    parser.add_argument("--db", action="store_true", help="записувати звіти в базу (database.save_report)")
+    parser.add_argument("--user-id", type=int, default=0, help="user_id для звітів без user_id у маніфесті")
+    parser.add_argument("--workers", type=int,
+                        default=int(os.getenv("ANALYZER_WORKERS", os.cpu_count() or 1)))
+    parser.add_argument("--chunk-size", type=int, default=4, help="фото на одну задачу воркера")
+    parser.add_argument("--actions", default=None, help="профіль дій DeepFace (fast / standard / full)")
+    parser.add_argument("--recursive", "-r", action="store_true", help="обходити підкаталоги")
+    parser.add_argument("--progress", help="файл прогресу для продовження")
+    parser.add_argument("--restart", action="store_true", help="ігнорувати попередній прогрес")
+    args = parser.parse_args(argv)
+
+    if not args.output and not args.db:
+        parser.error("вкажи --output і/або --db")
+    args.workers = max(1, args.workers)
+    args.chunk_size = max(1, args.chunk_size)
+
+    stats = run(args)
+    print(f"[batch_analyze] Finished: {stats}", file=sys.stderr)
+    return 1 if stats["error"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,11 @@
+"""
+Мікро- і макро-бенчмарки аналізатора.
+
+Запуск з кореня репозиторію:
+    python -m benchmarks.bench_serialization
+    python -m benchmarks.bench_pipeline [--workers 1,2,4] [--baseline results/<old>.json]
+    python -m benchmarks.loadgen --users 20 --photos 3     (бот + fake Telegram)
+    python -m benchmarks.bench_startup                   (-X importtime + час до /start)
+
+Результати bench_pipeline зберігаються в benchmarks/results/ (не в git).
+"""
@@ -0,0 +1,445 @@
+# benchmarks/bench_pipeline.py
+"""
+Відтворюваний бенчмарк конвеєра аналізу.
+
+Що міряється (на фіксованому корпусі, див. benchmarks.corpus):
+
+    stages      — кожен етап окремо, з уже підготовленим входом:
+                  face_detector, stress_model, physiognomy_model,
+                  personality_model, ml_radical_classifier, report_builder,
+                  database, а також end_to_end (run_analysis);
+    cold        — той самий етап у свіжому процесі: імпорт, підготовка
+                  і ПЕРШИЙ виклик (завантаження моделей), плюс пік RSS процесу;
+    warm        — p50 / p95 / mean після прогріву;
+    throughput  — фото/с для run_analysis у process-pool з різною кількістю
+                  воркерів (прогрів воркерів не входить у час) і пік RSS воркера.
+
+Результат — JSON (benchmarks/results/ за замовчуванням). З --baseline
+порівнює з попереднім запуском і повертає код 1 при регресії.
+
+    python -m benchmarks.bench_pipeline
+    python -m benchmarks.bench_pipeline --stages personality_model,report_builder --no-cold
+    python -m benchmarks.bench_pipeline --workers 1,2,4 --baseline benchmarks/results/prev.json
+"""
+
+import os
+import sys
+import json
+import time
+import platform
+import argparse
+import resource
+import tempfile
+import weakref
+import statistics
+import subprocess
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
+
+from .corpus import DEFAULT_SIZES, load_corpus_dir, synthetic_corpus
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+
+# Крок бенчмарку: виклик над i-м елементом корпусу
+Step = Callable[[int], Any]
+
+
+def _peak_rss_mb(who: int = resource.RUSAGE_SELF) -> float:
+    # Linux: кілобайти, macOS: байти
+    peak = resource.getrusage(who).ru_maxrss
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+# ======================================================
+#          ЕТАПИ (підготовка входу -> крок)
+# ======================================================
+def _payloads(n: int) -> List[Dict[str, Any]]:
+    from .bench_serialization import make_payload
+
+    return [make_payload(seed) for seed in range(n)]
+
+
+def _inputs(n: int) -> List[Dict[str, Any]]:
+    """Вхід етапів до радикала: підготовка не завантажує класифікатор."""
+    from .bench_serialization import make_inputs
+
+    return [make_inputs(seed) for seed in range(n)]
+
+
+def _reset_model_caches():
+    """Скидає кеш класифікатора, щоб холодний виклик міряв його завантаження."""
+    module = sys.modules.get("analyzer.ml_radical_classifier")
+    if module is not None:
+        module._engine = None
+        module._clf = None
+
+
+def _setup_face_detector(corpus: List[bytes]) -> Step:
+    from analyzer.context import as_context
+    from analyzer.face_crop import FACE_SHARED_DETECTION, detect_and_crop
+    from analyzer.face_detector import detect_face_info
+
+    def step(i: int):
+        ctx = as_context(corpus[i])
+        if FACE_SHARED_DETECTION and detect_and_crop(ctx) is None:
+            return None
+        return detect_face_info(ctx)
+
+    return step
+
+
+def _setup_stress_model(corpus: List[bytes]) -> Step:
+    from analyzer.context import as_context
+    from analyzer.face_crop import FACE_SHARED_DETECTION, detect_and_crop
+    from analyzer.stress_model import detect_microstress
+
+    # Детекція і кроп — підготовка, міряється лише FaceMesh + метрики
+    contexts = []
+    for data in corpus:
+        ctx = as_context(data)
+        if FACE_SHARED_DETECTION:
+            detect_and_crop(ctx)
+        contexts.append(ctx)
+
+    return lambda i: detect_microstress(contexts[i])
+
+
+def _setup_physiognomy_model(corpus: List[bytes]) -> Step:
+    from analyzer.physiognomy_model import build_physiognomy_profile
+
+    payloads = _inputs(len(corpus))
+    return lambda i: build_physiognomy_profile(payloads[i]["face_info"])
+
+
+def _setup_personality_model(corpus: List[bytes]) -> Step:
+    from analyzer.personality_model import build_personality_profile
+
+    payloads = _inputs(len(corpus))
+    return lambda i: build_personality_profile(
+        payloads[i]["face_info"],
+        payloads[i]["emotion_data"],
+        payloads[i]["stress_data"],
+        payloads[i]["physiognomy"],
+    )
+
+
+def _setup_ml_radical_classifier(corpus: List[bytes]) -> Step:
+    from analyzer.ml_radical_classifier import predict_radical
+    from analyzer.personality_model import build_personality_features
+
+    # Модель вантажить перший виклик: у cold він і міряється
+    payloads = _inputs(len(corpus))
+    features = [
+        build_personality_features(p["emotion_data"], p["stress_data"], p["physiognomy"])[1]
+        for p in payloads
+    ]
+    return lambda i: predict_radical(features[i])
+
+
+def _setup_report_builder(corpus: List[bytes]) -> Step:
+    from analyzer.report_builder import build_full_report
+
+    payloads = _payloads(len(corpus))
+    return lambda i: build_full_report(
+        payloads[i]["face_info"],
+        payloads[i]["emotion_data"],
+        payloads[i]["stress_data"],
+        payloads[i]["personality"],
+        payloads[i]["professional"],
+        payloads[i]["physiognomy"],
+    )
+
+
+def _drop_database(tmp: tempfile.TemporaryDirectory) -> None:
+    import database
+
+    if database._storage is not None and database._storage.db_path.startswith(tmp.name):
+        database._storage.close()
+        database._storage = None
+    tmp.cleanup()
+
+
+def _setup_database(corpus: List[bytes]) -> Step:
+    # Окрема тимчасова БД, щоб не чіпати reports.db
+    tmp = tempfile.TemporaryDirectory(prefix="bench-db-")
+    os.environ["DB_PATH"] = os.path.join(tmp.name, "reports.db")
+    import database
+
+    database.DB_PATH = os.environ["DB_PATH"]
+    database.init_db()
+    payloads = _payloads(len(corpus))
+
+    def step(i: int):
+        p = payloads[i]
+        database.save_report(
+            i, "", p["face_info"], p["emotion_data"], p["stress_data"],
+            p["personality"], p["professional"], p["full_report"],
+        )
+        return database.get_latest_reports(i, limit=5)
+
+    # Каталог БД живе, доки живе крок; прибираємо і при аварійному виході
+    weakref.finalize(step, _drop_database, tmp)
+    return step
+
+
+def _setup_end_to_end(corpus: List[bytes]) -> Step:
+    from analyzer.pipeline import run_analysis
+
+    return lambda i: run_analysis(corpus[i])
+
+
+STAGES: Dict[str, Callable[[List[bytes]], Step]] = {
+    "face_detector": _setup_face_detector,
+    "stress_model": _setup_stress_model,
+    "physiognomy_model": _setup_physiognomy_model,
+    "personality_model": _setup_personality_model,
+    "ml_radical_classifier": _setup_ml_radical_classifier,
+    "report_builder": _setup_report_builder,
+    "database": _setup_database,
+    "end_to_end": _setup_end_to_end,
+}
+
+
+# ======================================================
+#                  ВИМІРЮВАННЯ
+# ======================================================
+def _summary(samples_s: List[float]) -> Dict[str, float]:
+    ms = sorted(s * 1000.0 for s in samples_s)
+    p95 = ms[min(len(ms) - 1, int(round(0.95 * (len(ms) - 1))))]
+    return {
+        "n": len(ms),
+        "mean_ms": round(statistics.fmean(ms), 3),
+        "p50_ms": round(statistics.median(ms), 3),
+        "p95_ms": round(p95, 3),
+        "min_ms": round(ms[0], 3),
+    }
+
+
+def bench_warm(name: str, corpus: List[bytes], repeat: int) -> Dict[str, Any]:
+    step = STAGES[name](corpus)
+    for i in range(len(corpus)):
+        step(i)  # прогрів: моделі, кеші, JIT TensorFlow
+
+    samples = []
+    for _ in range(repeat):
+        for i in range(len(corpus)):
+            start = time.perf_counter()
+            step(i)
+            samples.append(time.perf_counter() - start)
+    return _summary(samples)
+
+
+def _cold_child(name: str, corpus_args: List[str]) -> Dict[str, Any]:
+    """Виконується у свіжому процесі: імпорт + підготовка + перший виклик."""
+    t0 = time.perf_counter()
+    corpus = _load_corpus(_parse_args(corpus_args))
+    t1 = time.perf_counter()
+    step = STAGES[name](corpus)
+    # Підготовка інших етапів могла вже завантажити модель (payload з personality)
+    _reset_model_caches()
+    t2 = time.perf_counter()
+    step(0)
+    t3 = time.perf_counter()
+    return {
+        "setup_ms": round((t2 - t1) * 1000.0, 3),
+        "first_call_ms": round((t3 - t2) * 1000.0, 3),
+        "peak_rss_mb": _peak_rss_mb(),
+        "_corpus_ms": round((t1 - t0) * 1000.0, 3),
+    }
+
+
+def bench_cold(name: str, corpus_args: List[str]) -> Dict[str, Any]:
+    start = time.perf_counter()
+    proc = subprocess.run(
+        [sys.executable, "-m", "benchmarks.bench_pipeline", "--cold-child", name, *corpus_args],
+        cwd=BASE_DIR, capture_output=True, text=True,
+    )
+    wall = time.perf_counter() - start
+
+    if proc.returncode != 0:
+        tail = (proc.stderr.strip().splitlines() or ["?"])[-1]
+        return {"error": tail}
+
+    result = json.loads(proc.stdout.strip().splitlines()[-1])
+    # Процес від запуску до першого результату, без генерації корпусу
+    result["process_ms"] = round(wall * 1000.0 - result.pop("_corpus_ms"), 3)
+    return result
+
+
+def _pool_run(data: bytes):
+    from analyzer.pipeline import run_analysis
+
+    return run_analysis(data) is not None
+
+
+def bench_throughput(corpus: List[bytes], workers: int, repeat: int) -> Dict[str, Any]:
+    from analyzer.model_registry import warm_worker
+
+    ctx = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=workers, mp_context=ctx, initializer=warm_worker) as pool:
+        # Прогрів: по задачі на воркер, щоб усі процеси піднялись до заміру
+        list(pool.map(_pool_run, [corpus[i % len(corpus)] for i in range(workers * 2)]))
+
+        items = corpus * repeat
+        start = time.perf_counter()
+        found = sum(pool.map(_pool_run, items))
+        elapsed = time.perf_counter() - start
+
+    return {
+        "photos": len(items),
+        "faces_found": found,
+        "seconds": round(elapsed, 3),
+        "photos_per_s": round(len(items) / elapsed, 3),
+        "peak_worker_rss_mb": _peak_rss_mb(resource.RUSAGE_CHILDREN),
+    }
+
+
+# ======================================================
+#             ПОРІВНЯННЯ З BASELINE
+# ======================================================
+def compare(current: Dict[str, Any], baseline: Dict[str, Any], threshold: float) -> List[str]:
+    """Список регресій: warm p50 / cold first call повільніше, throughput нижче."""
+    regressions = []
+
+    for name, result in current.get("stages", {}).items():
+        base = baseline.get("stages", {}).get(name) or {}
+        for section, key in (("warm", "p50_ms"), ("cold", "first_call_ms")):
+            new = (result.get(section) or {}).get(key)
+            old = (base.get(section) or {}).get(key)
+            if new is not None and old and new > old * (1 + threshold):
+                regressions.append(f"{name}.{section}.{key}: {old} -> {new} (+{(new / old - 1) * 100:.0f}%)")
+
+    for workers, result in current.get("throughput", {}).items():
+        old = (baseline.get("throughput", {}).get(workers) or {}).get("photos_per_s")
+        new = result.get("photos_per_s")
+        if new is not None and old and new < old * (1 - threshold):
+            regressions.append(f"throughput[{workers}]: {old} -> {new} photos/s")
+
+    return regressions
+
+
+# ======================================================
+#                     CLI
+# ======================================================
+def _parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Analyzer pipeline benchmark.")
+    parser.add_argument("--stages", default=",".join(STAGES), help="етапи через кому")
+    parser.add_argument("--corpus-size", type=int, default=12)
+    parser.add_argument("--corpus-dir", help="каталог реальних фото замість синтетики")
+    parser.add_argument("--seed", type=int, default=1234)
+    parser.add_argument("--repeat", type=int, default=3, help="проходів по корпусу для warm / throughput")
+    parser.add_argument("--workers", default="", help="кількості воркерів для throughput, напр. 1,2,4")
+    parser.add_argument("--no-cold", action="store_true", help="без вимірів холодного старту")
+    parser.add_argument("--output", help="куди зберегти JSON (за замовчуванням benchmarks/results/)")
+    parser.add_argument("--baseline", help="JSON попереднього запуску для порівняння")
+    parser.add_argument("--threshold", type=float, default=0.15, help="допустиме погіршення (0.15 = 15%%)")
+    parser.add_argument("--cold-child", help=argparse.SUPPRESS)
+    return parser.parse_args(argv)
+
+
+def _load_corpus(args: argparse.Namespace) -> List[bytes]:
+    if args.corpus_dir:
+        return load_corpus_dir(args.corpus_dir, args.corpus_size)
+    return synthetic_corpus(args.corpus_size, DEFAULT_SIZES, args.seed)
+
+
+def _git_revision() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=BASE_DIR,
+            capture_output=True, text=True, timeout=5,
+        ).stdout.strip()
+    except Exception:
+        return ""
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    argv = sys.argv[1:] if argv is None else argv
+    args = _parse_args(argv)
+
+    if args.cold_child:
+        print(json.dumps(_cold_child(args.cold_child, argv[2:])))
+        return 0
+
+    stages = [s for s in args.stages.split(",") if s]
+    unknown = [s for s in stages if s not in STAGES]
+    if unknown:
+        print(f"[bench] Unknown stages: {unknown}; available: {list(STAGES)}", file=sys.stderr)
+        return 2
+
+    corpus = _load_corpus(args)
+    corpus_args = ["--corpus-size", str(args.corpus_size), "--seed", str(args.seed)]
+    if args.corpus_dir:
+        corpus_args += ["--corpus-dir", args.corpus_dir]
+
+    report: Dict[str, Any] = {
+        "meta": {
+            "revision": _git_revision(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "corpus": {
+                "size": len(corpus),
+                "source": args.corpus_dir or f"synthetic(seed={args.seed})",
+                "bytes": sum(len(c) for c in corpus),
+            },
+            "repeat": args.repeat,
+        },
+        "stages": {},
+        "throughput": {},
+    }
+
+    for name in stages:
+        result: Dict[str, Any] = {}
+        if not args.no_cold:
+            result["cold"] = bench_cold(name, corpus_args)
+        try:
+            result["warm"] = bench_warm(name, corpus, args.repeat)
+        except Exception as e:
+            result["error"] = f"{type(e).__name__}: {e}"
+        report["stages"][name] = result
+
+        warm = result.get("warm")
+        cold = result.get("cold") or {}
+        print(
+            f"[bench] {name:<22}"
+            + (f" warm p50 {warm['p50_ms']:>9.2f} ms  p95 {warm['p95_ms']:>9.2f} ms" if warm else f" {result['error']}")
+            + (f"  cold {cold['first_call_ms']:>9.1f} ms  rss {cold['peak_rss_mb']} MB" if "first_call_ms" in cold else "")
+        )
+
+    for workers in (int(w) for w in args.workers.split(",") if w):
+        try:
+            result = bench_throughput(corpus, workers, args.repeat)
+            print(f"[bench] throughput x{workers}: {result['photos_per_s']} photos/s")
+        except Exception as e:
+            result = {"error": f"{type(e).__name__}: {e}"}
+            print(f"[bench] throughput x{workers}: {result['error']}")
+        report["throughput"][str(workers)] = result
+
+    report["meta"]["peak_rss_mb"] = _peak_rss_mb()
+
+    output = args.output or os.path.join(
+        RESULTS_DIR, f"bench-{time.strftime('%Y%m%d-%H%M%S')}-{report['meta']['revision'] or 'local'}.json"
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"[bench] Saved {output}")
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            regressions = compare(report, json.load(f), args.threshold)
+        for line in regressions:
+            print(f"[bench] REGRESSION {line}")
+        if regressions:
+            return 1
+        print("[bench] No regressions against baseline.")
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,180 @@
+# benchmarks/bench_serialization.py
+"""
+Порівняння шляхів серіалізації результатів аналізу:
+
+    legacy    — json.dumps(_make_jsonable(obj)) (як було в database.py);
+    json      — serialization з запасним бекендом (json + default-хук);
+    orjson    — serialization з orjson (якщо встановлений).
+
+Навантаження — реалістичні face_info / emotion / personality / professional
+з numpy-значеннями, як їх повертає DeepFace і конвеєр.
+
+    python -m benchmarks.bench_serialization [--rounds 2000]
+"""
+
+import json
+import math
+import time
+import argparse
+from typing import Any, Callable, Dict
+
+import numpy as np
+
+import serialization
+from database import _make_jsonable
+from analyzer.emotion_model import interpret_emotions
+from analyzer.physiognomy_model import build_physiognomy_profile
+from analyzer.personality_model import build_personality_profile
+from analyzer.professional_profile import build_professional_profile
+from analyzer.report_builder import build_full_report
+
+EMOTIONS = ("angry", "disgust", "fear", "happy", "sad", "surprise", "neutral")
+RACES = ("asian", "indian", "black", "white", "middle eastern", "latino hispanic")
+
+
+def make_inputs(seed: int = 0) -> Dict[str, Any]:
+    """
+    Вхід етапу personality (face_info, emotion_data, stress_data, physiognomy)
+    з фіксованих значень — без класифікатора радикалів.
+    """
+    rng = np.random.default_rng(seed)
+
+    emotion = rng.dirichlet(np.ones(len(EMOTIONS))).astype(np.float32) * 100
+    race = rng.dirichlet(np.ones(len(RACES))).astype(np.float32) * 100
+
+    face_info = {
+        "age": np.int64(rng.integers(18, 70)),
+        "gender": "Woman",
+        "emotion": dict(zip(EMOTIONS, emotion)),
+        "dominant_emotion": EMOTIONS[int(np.argmax(emotion))],
+        "race": dict(zip(RACES, race)),
+        "dominant_race": RACES[int(np.argmax(race))],
+        "actions": ["emotion", "age", "gender"],
+        "preprocess": {
+            "frame": [np.int64(1280), np.int64(960)],
+            "detect_scale": np.float64(0.8),
+            "face_px": np.int64(312),
+            "landmarks": rng.random((16, 2), dtype=np.float32),
+        },
+    }
+
+    emotion_data = interpret_emotions({k: float(v) for k, v in face_info["emotion"].items()})
+    emotion_data["raw"] = {k: np.float32(v) for k, v in emotion_data["raw"].items()}
+    emotion_data["valence"] = np.float64(emotion_data["valence"])
+
+    stress_data = {
+        "microstress_level": np.int64(rng.integers(10, 90)),
+        "stress_label": "середній",
+        "factors": ["Помірне напруження в зоні брів."],
+    }
+
+    physiognomy = build_physiognomy_profile(
+        {"age": 33, "gender": "Woman", "dominant_emotion": face_info["dominant_emotion"]}
+    )
+    return {
+        "face_info": face_info,
+        "emotion_data": emotion_data,
+        "stress_data": stress_data,
+        "physiognomy": physiognomy,
+    }
+
+
+def make_payload(seed: int = 0) -> Dict[str, Any]:
+    """Один результат run_analysis з numpy-типами там, де їх дає DeepFace."""
+    payload = make_inputs(seed)
+    face_info, emotion_data, stress_data, physiognomy = (
+        payload["face_info"], payload["emotion_data"], payload["stress_data"], payload["physiognomy"],
+    )
+
+    personality = build_personality_profile(face_info, emotion_data, stress_data, physiognomy)
+    personality["big_five_scores"] = {
+        k: np.int64(v) for k, v in personality["big_five_scores"].items()
+    }
+    professional = build_professional_profile(personality)
+
+    return {
+        **payload,
+        "personality": personality,
+        "professional": professional,
+        "full_report": build_full_report(
+            face_info, emotion_data, stress_data, personality, professional, physiognomy
+        ),
+    }
+
+
+def _legacy(obj: Any) -> str:
+    return json.dumps(_make_jsonable(obj), ensure_ascii=False)
+
+
+def _assert_same(expected: Any, actual: Any, path: str = "$"):
+    """
+    Повне порівняння декодованих структур. Числа — з допуском:
+    float32 legacy пише як float64, а orjson — найкоротшим float32-записом.
+    """
+    if isinstance(expected, bool) or isinstance(actual, bool):
+        assert expected is actual, f"{path}: {expected!r} != {actual!r}"
+    elif isinstance(expected, (int, float)) and isinstance(actual, (int, float)):
+        assert math.isclose(expected, actual, rel_tol=1e-6, abs_tol=1e-9), \
+            f"{path}: {expected!r} != {actual!r}"
+    elif isinstance(expected, dict) and isinstance(actual, dict):
+        assert expected.keys() == actual.keys(), f"{path}: keys {sorted(expected)} != {sorted(actual)}"
+        for key in expected:
+            _assert_same(expected[key], actual[key], f"{path}.{key}")
+    elif isinstance(expected, list) and isinstance(actual, list):
+        assert len(expected) == len(actual), f"{path}: length {len(expected)} != {len(actual)}"
+        for i, (e, a) in enumerate(zip(expected, actual)):
+            _assert_same(e, a, f"{path}[{i}]")
+    else:
+        assert expected == actual, f"{path}: {expected!r} != {actual!r}"
+
+
+def _bench(fn: Callable[[Any], str], payloads, rounds: int) -> float:
+    """Середній час (мкс) на один payload."""
+    for payload in payloads:
+        fn(payload)  # прогрів
+
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for payload in payloads:
+            fn(payload)
+    elapsed = time.perf_counter() - start
+    return elapsed / (rounds * len(payloads)) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rounds", type=int, default=2000)
+    parser.add_argument("--payloads", type=int, default=8)
+    args = parser.parse_args()
+
+    results = [make_payload(seed) for seed in range(args.payloads)]
+
+    candidates = {"legacy": _legacy, "json": serialization._dumps_json}
+    if serialization._dumps_orjson is not None:
+        candidates["orjson"] = serialization._dumps_orjson
+
+    # Що зберігає save_report: окремі блоби + весь результат (result_cache)
+    workloads = {
+        "face_info": [r["face_info"] for r in results],
+        "personality": [r["personality"] for r in results],
+        "full_result": results,
+    }
+
+    # Нові шляхи мають давати той самий JSON (з точністю до float32-округлення)
+    for name, fn in candidates.items():
+        for payload in results:
+            expected = json.loads(_legacy(payload))
+            actual = json.loads(fn(payload))
+            _assert_same(expected, actual, name)
+
+    print(f"[bench] default backend: {serialization.BACKEND}")
+    print(f"{'workload':<14}" + "".join(f"{name:>12}" for name in candidates) + "   speedup")
+    for workload, payloads in workloads.items():
+        timings = {name: _bench(fn, payloads, args.rounds) for name, fn in candidates.items()}
+        best = min(t for name, t in timings.items() if name != "legacy")
+        row = "".join(f"{timings[name]:>10.1f}us" for name in candidates)
+        print(f"{workload:<14}{row}   x{timings['legacy'] / best:.1f}")
+
+
+if __name__ == "__main__":
+    main()
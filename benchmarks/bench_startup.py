@@ -0,0 +1,166 @@
+# benchmarks/bench_startup.py
+"""
+Холодний старт bot.py.
+
+    importtime — профіль `python -X importtime -c "import bot"`: загальний час
+                 імпорту, найдорожчі модулі (cumulative / self) і перевірка,
+                 що важкі залежності аналізатора (DeepFace, TensorFlow,
+                 MediaPipe, cv2, sklearn) НЕ імпортуються при старті;
+    startup    — bot.py проти benchmarks.fake_telegram: час від запуску
+                 процесу до першого getUpdates і до відповіді на /start.
+
+    python -m benchmarks.bench_startup [--top 15] [--output startup.json]
+"""
+
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+import tempfile
+import subprocess
+from typing import Any, Dict, List, Optional
+
+from .fake_telegram import BOT_TOKEN, FakeTelegramServer
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Модулі, яким не місце на шляху старту бота
+HEAVY_MODULES = ("deepface", "tensorflow", "keras", "tf_keras", "mediapipe", "cv2", "sklearn")
+
+
+def _bot_env(**extra: str) -> Dict[str, str]:
+    env = dict(os.environ)
+    env.update({
+        "BOT_TOKEN": BOT_TOKEN,
+        "DB_PATH": os.path.join(tempfile.mkdtemp(prefix="bench-startup-"), "reports.db"),
+        "METRICS_PORT": "0",
+    })
+    env.update(extra)
+    return env
+
+
+# ======================================================
+#                  -X importtime
+# ======================================================
+def parse_importtime(stderr: str) -> List[Dict[str, Any]]:
+    """Рядки 'import time: self | cumulative | name' -> список модулів (мкс)."""
+    modules = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        try:
+            self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+            modules.append({
+                "module": name.strip(),
+                "depth": (len(name) - len(name.lstrip())) // 2,
+                "self_ms": int(self_us) / 1000.0,
+                "cumulative_ms": int(cumulative_us) / 1000.0,
+            })
+        except ValueError:
+            continue
+    return modules
+
+
+def bench_importtime(top: int) -> Dict[str, Any]:
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import bot"],
+        cwd=BASE_DIR, env=_bot_env(), capture_output=True, text=True,
+    )
+    modules = parse_importtime(proc.stderr)
+    if proc.returncode != 0 or not modules:
+        tail = (proc.stderr.strip().splitlines() or ["?"])[-1]
+        return {"error": tail}
+
+    bot_entry = next((m for m in modules if m["module"] == "bot"), None)
+    heavy = sorted({
+        m["module"].split(".")[0] for m in modules
+        if m["module"].split(".")[0] in HEAVY_MODULES
+    })
+
+    by_cumulative = sorted(modules, key=lambda m: m["cumulative_ms"], reverse=True)[:top]
+    by_self = sorted(modules, key=lambda m: m["self_ms"], reverse=True)[:top]
+    return {
+        "total_ms": round(bot_entry["cumulative_ms"], 1) if bot_entry else None,
+        "modules": len(modules),
+        "heavy_imported": heavy,
+        "top_cumulative": [
+            {"module": m["module"], "ms": round(m["cumulative_ms"], 1)} for m in by_cumulative
+        ],
+        "top_self": [{"module": m["module"], "ms": round(m["self_ms"], 1)} for m in by_self],
+    }
+
+
+# ======================================================
+#          Старт процесу до відповіді на /start
+# ======================================================
+async def _bench_startup(port: int, timeout: float) -> Dict[str, Any]:
+    server = FakeTelegramServer()
+    api_url = await server.start(port=port)
+
+    started = time.perf_counter()
+    proc = await asyncio.create_subprocess_exec(
+        sys.executable, "bot.py", cwd=BASE_DIR,
+        env=_bot_env(TELEGRAM_API_URL=api_url),
+        stdout=asyncio.subprocess.DEVNULL, stderr=asyncio.subprocess.DEVNULL,
+    )
+    try:
+        await asyncio.wait_for(server.polling.wait(), timeout)
+        polling_ms = (time.perf_counter() - started) * 1000.0
+
+        chat_id = 1
+        _, sent_at = await server.send_text(chat_id, "/start")
+        received_at, _ = await asyncio.wait_for(server.inbox[chat_id].get(), timeout)
+
+        return {
+            "first_poll_ms": round(polling_ms, 1),
+            "start_reply_ms": round((received_at - started) * 1000.0, 1),
+            "start_roundtrip_ms": round((received_at - sent_at) * 1000.0, 1),
+        }
+    except asyncio.TimeoutError:
+        return {"error": f"no response within {timeout} s"}
+    finally:
+        if proc.returncode is None:
+            proc.terminate()
+            try:
+                await asyncio.wait_for(proc.wait(), 30)
+            except asyncio.TimeoutError:
+                proc.kill()
+        await server.stop()
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="bot.py cold start benchmark.")
+    parser.add_argument("--top", type=int, default=15)
+    parser.add_argument("--port", type=int, default=8082)
+    parser.add_argument("--timeout", type=float, default=60)
+    parser.add_argument("--no-startup", action="store_true", help="лише -X importtime")
+    parser.add_argument("--output", help="зберегти результат у JSON")
+    args = parser.parse_args(argv)
+
+    report: Dict[str, Any] = {"importtime": bench_importtime(args.top)}
+    imports = report["importtime"]
+    if "error" in imports:
+        print(f"[bench] import bot failed: {imports['error']}")
+    else:
+        print(f"[bench] import bot: {imports['total_ms']} ms, {imports['modules']} modules")
+        for entry in imports["top_cumulative"]:
+            print(f"[bench]   {entry['ms']:>9.1f} ms  {entry['module']}")
+        if imports["heavy_imported"]:
+            print(f"[bench] WARNING heavy modules on the startup path: {imports['heavy_imported']}")
+
+    if not args.no_startup:
+        report["startup"] = asyncio.run(_bench_startup(args.port, args.timeout))
+        print(f"[bench] startup: {report['startup']}")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"[bench] Saved {args.output}")
+
+    return 1 if imports.get("heavy_imported") else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
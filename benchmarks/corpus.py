@@ -0,0 +1,88 @@
+# benchmarks/corpus.py
+"""
+Фіксований корпус синтетичних «облич» для бенчмарків.
+
+Кожне зображення малюється детерміновано з seed: овал обличчя, очі,
+брови, ніс, рот, шум фону, невеликий нахил. Це не заміна реальним фото
+для точності, але дає однаковий вхід між версіями для затримки й
+пропускної здатності. Замість синтетики можна передати каталог реальних
+фото (load_corpus_dir).
+"""
+
+import os
+from typing import List, Sequence, Tuple
+
+import cv2
+import numpy as np
+
+# Розміри кадру: від прев'ю Telegram до оригіналу з телефона
+DEFAULT_SIZES: Tuple[Tuple[int, int], ...] = ((640, 480), (1280, 960), (3024, 4032))
+
+
+def synthetic_face(seed: int, size: Tuple[int, int] = (1280, 960)) -> np.ndarray:
+    """BGR-кадр size=(width, height) з одним «обличчям»."""
+    rng = np.random.default_rng(seed)
+    w, h = size
+
+    img = rng.integers(40, 90, (h, w, 3), dtype=np.uint8)
+    img = cv2.GaussianBlur(img, (0, 0), 3)
+
+    face_h = int(min(w, h) * rng.uniform(0.35, 0.6))
+    face_w = int(face_h * 0.75)
+    cx = int(w / 2 + rng.uniform(-0.1, 0.1) * w)
+    cy = int(h / 2 + rng.uniform(-0.1, 0.1) * h)
+
+    skin = tuple(int(c) for c in rng.integers((120, 150, 180), (170, 190, 230)))
+    cv2.ellipse(img, (cx, cy), (face_w // 2, face_h // 2), 0, 0, 360, skin, -1, cv2.LINE_AA)
+
+    eye_y = cy - face_h // 8
+    eye_dx = face_w // 5
+    eye_r = max(2, face_w // 14)
+    for side in (-1, 1):
+        ex = cx + side * eye_dx
+        cv2.ellipse(img, (ex, eye_y), (eye_r * 2, eye_r), 0, 0, 360, (240, 240, 240), -1, cv2.LINE_AA)
+        cv2.circle(img, (ex, eye_y), eye_r, (50, 40, 30), -1, cv2.LINE_AA)
+        brow_y = eye_y - eye_r * 3
+        cv2.line(img, (ex - eye_r * 2, brow_y), (ex + eye_r * 2, brow_y - side * int(rng.integers(-3, 4))),
+                 (40, 30, 20), max(1, eye_r // 2), cv2.LINE_AA)
+
+    nose = max(1, face_w // 40)
+    cv2.line(img, (cx, eye_y + eye_r), (cx, cy + face_h // 10), (90, 110, 150), nose, cv2.LINE_AA)
+
+    mouth_y = cy + face_h // 4
+    smile = int(rng.integers(-1, 2))
+    cv2.ellipse(img, (cx, mouth_y), (face_w // 5, max(1, face_h // 25)), 0,
+                0 if smile >= 0 else 180, 180 if smile >= 0 else 360,
+                (60, 60, 160), max(1, face_w // 50), cv2.LINE_AA)
+
+    angle = rng.uniform(-8, 8)
+    M = cv2.getRotationMatrix2D((cx, cy), angle, 1.0)
+    return cv2.warpAffine(img, M, (w, h), borderMode=cv2.BORDER_REFLECT)
+
+
+def synthetic_corpus(count: int = 12, sizes: Sequence[Tuple[int, int]] = DEFAULT_SIZES,
+                     seed: int = 1234) -> List[bytes]:
+    """count JPEG-файлів (байти), розміри по колу з sizes."""
+    corpus = []
+    for i in range(count):
+        img = synthetic_face(seed + i, sizes[i % len(sizes)])
+        ok, buf = cv2.imencode(".jpg", img, [cv2.IMWRITE_JPEG_QUALITY, 90])
+        if not ok:
+            raise RuntimeError("JPEG encoding failed")
+        corpus.append(buf.tobytes())
+    return corpus
+
+
+def load_corpus_dir(path: str, limit: int = 0) -> List[bytes]:
+    """Реальні фото з каталогу (сортовано, щоб порядок був стабільним)."""
+    names = sorted(
+        n for n in os.listdir(path)
+        if os.path.splitext(n)[1].lower() in (".jpg", ".jpeg", ".png", ".webp", ".bmp")
+    )
+    if limit:
+        names = names[:limit]
+    corpus = []
+    for name in names:
+        with open(os.path.join(path, name), "rb") as f:
+            corpus.append(f.read())
+    return corpus
@@ -0,0 +1,359 @@
+# benchmarks/fake_telegram.py
+"""
+Локальна заміна Telegram Bot API для навантажувальних тестів.
+
+Бот підключається сюди через TELEGRAM_API_URL=http://127.0.0.1:<port>
+(aiogram TelegramAPIServer.from_base) і працює як зі справжнім Telegram:
+long polling getUpdates, getFile + завантаження файлу, sendMessage.
+
+Після setWebhook апдейти не чекають getUpdates, а надсилаються POST-ом на
+URL бота (з X-Telegram-Bot-Api-Secret-Token, до max_connections одночасно,
+з повторами, поки бот недоступний); deleteWebhook повертає polling.
+
+Апдейти (фото, команди) підкладає генератор навантаження
+(benchmarks.loadgen) напряму через API класу або HTTP-ендпоінти /_fake/*:
+
+    POST /_fake/photo  {"user_id": 1}              — фото з синтетичного корпусу
+    POST /_fake/text   {"user_id": 1, "text": "/compare"}
+    GET  /_fake/stats                              — лічильники викликів
+
+Окремий запуск:
+    python -m benchmarks.fake_telegram --port 8081
+"""
+
+import json
+import time
+import asyncio
+import aiohttp
+import argparse
+import itertools
+from collections import Counter, defaultdict
+from typing import Any, Dict, List, Optional, Tuple
+
+from aiohttp import web
+
+BOT_ID = 123456
+BOT_TOKEN = f"{BOT_ID}:FAKE-load-test-token"
+
+# Поля форми aiogram, які приходять як JSON-рядки
+_JSON_FIELDS = {"allowed_updates", "reply_markup", "entities"}
+
+
+class FakeTelegramServer:
+    def __init__(self, bot_id: int = BOT_ID):
+        self.bot_id = bot_id
+
+        self._update_ids = itertools.count(1)
+        self._message_ids = itertools.count(1)
+        self._updates: List[Dict[str, Any]] = []
+        self._updates_cond: Optional[asyncio.Condition] = None
+
+        self.files: Dict[str, bytes] = {}
+        # update_id -> час, коли бот забрав апдейт (getUpdates / відповідь на webhook)
+        self.delivered_at: Dict[int, float] = {}
+        # chat_id -> черга (час, текст) повідомлень від бота
+        self.inbox: Dict[int, asyncio.Queue] = defaultdict(asyncio.Queue)
+
+        self.calls: Counter = Counter()
+        self.polling = asyncio.Event()
+        self.webhook_set = asyncio.Event()
+        # Бот готовий приймати апдейти (перший getUpdates або setWebhook)
+        self.ready = asyncio.Event()
+
+        self.webhook: Optional[Dict[str, Any]] = None
+        self._webhook_task: Optional[asyncio.Task] = None
+        self._webhook_posts: set = set()
+
+        self._runner: Optional[web.AppRunner] = None
+
+    # ---------------------------------------------------
+    # Апдейти від «користувачів»
+    # ---------------------------------------------------
+    def _cond(self) -> asyncio.Condition:
+        if self._updates_cond is None:
+            self._updates_cond = asyncio.Condition()
+        return self._updates_cond
+
+    @staticmethod
+    def _user(user_id: int) -> Dict[str, Any]:
+        return {"id": user_id, "is_bot": False, "first_name": f"user{user_id}"}
+
+    def _message(self, user_id: int, **fields: Any) -> Dict[str, Any]:
+        return {
+            "message_id": next(self._message_ids),
+            "date": int(time.time()),
+            "chat": {"id": user_id, "type": "private"},
+            "from": self._user(user_id),
+            **fields,
+        }
+
+    async def _push(self, message: Dict[str, Any]) -> Tuple[int, float]:
+        update_id = next(self._update_ids)
+        sent_at = time.perf_counter()
+        async with self._cond():
+            self._updates.append({"update_id": update_id, "message": message})
+            self._cond().notify_all()
+        return update_id, sent_at
+
+    async def send_text(self, user_id: int, text: str) -> Tuple[int, float]:
+        entities = []
+        if text.startswith("/"):
+            entities = [{"type": "bot_command", "offset": 0, "length": len(text.split()[0])}]
+        return await self._push(self._message(user_id, text=text, entities=entities))
+
+    async def send_photo(self, user_id: int, data: bytes, width: int = 1280,
+                         height: int = 960, unique_id: Optional[str] = None) -> Tuple[int, float]:
+        """unique_id — той самий file_unique_id для «повторно надісланого» фото."""
+        n = len(self.files) + 1
+        file_id = f"photo-{n}"
+        self.files[file_id] = data
+        photo = {
+            "file_id": file_id,
+            "file_unique_id": unique_id or f"u-{n}",
+            "width": width,
+            "height": height,
+            "file_size": len(data),
+        }
+        return await self._push(self._message(user_id, photo=[photo]))
+
+    # ---------------------------------------------------
+    # Bot API
+    # ---------------------------------------------------
+    async def _params(self, request: web.Request) -> Dict[str, Any]:
+        params: Dict[str, Any] = dict(request.query)
+        if request.can_read_body:
+            if request.content_type == "application/json":
+                params.update(await request.json())
+            else:
+                params.update(await request.post())
+        for key in _JSON_FIELDS & params.keys():
+            if isinstance(params[key], str):
+                params[key] = json.loads(params[key])
+        return params
+
+    async def _get_updates(self, params: Dict[str, Any]) -> List[Dict[str, Any]]:
+        offset = int(params.get("offset") or 0)
+        timeout = float(params.get("timeout") or 0)
+        limit = int(params.get("limit") or 100)
+
+        cond = self._cond()
+        async with cond:
+            # offset підтверджує все, що нижче
+            if offset:
+                self._updates = [u for u in self._updates if u["update_id"] >= offset]
+            if not self._updates and timeout:
+                try:
+                    await asyncio.wait_for(cond.wait_for(lambda: bool(self._updates)), timeout)
+                except asyncio.TimeoutError:
+                    pass
+            batch = self._updates[:limit]
+
+        now = time.perf_counter()
+        for update in batch:
+            self.delivered_at.setdefault(update["update_id"], now)
+        return batch
+
+    # ---------------------------------------------------
+    # Webhook
+    # ---------------------------------------------------
+    def _set_webhook(self, params: Dict[str, Any]):
+        self._delete_webhook()
+        self.webhook = {
+            "url": params["url"],
+            "secret_token": params.get("secret_token"),
+            "max_connections": int(params.get("max_connections") or 40),
+        }
+        self._webhook_task = asyncio.create_task(self._webhook_loop(self.webhook))
+        self.webhook_set.set()
+        self.ready.set()
+
+    def _delete_webhook(self):
+        self.webhook = None
+        if self._webhook_task is not None:
+            self._webhook_task.cancel()
+            self._webhook_task = None
+
+    async def _webhook_loop(self, config: Dict[str, Any]):
+        """Забирає апдейти з черги і розсилає їх на webhook паралельно."""
+        cond = self._cond()
+        limit = asyncio.Semaphore(config["max_connections"])
+        async with aiohttp.ClientSession() as session:
+            try:
+                while True:
+                    async with cond:
+                        await cond.wait_for(lambda: bool(self._updates))
+                        batch, self._updates = self._updates, []
+
+                    for update in batch:
+                        await limit.acquire()
+                        task = asyncio.create_task(self._post_update(session, config, update, limit))
+                        self._webhook_posts.add(task)
+                        task.add_done_callback(self._webhook_posts.discard)
+            finally:
+                for task in list(self._webhook_posts):
+                    task.cancel()
+
+    async def _post_update(self, session: aiohttp.ClientSession, config: Dict[str, Any],
+                           update: Dict[str, Any], limit: asyncio.Semaphore):
+        headers = {}
+        if config["secret_token"]:
+            headers["X-Telegram-Bot-Api-Secret-Token"] = config["secret_token"]
+        try:
+            # Як Telegram: повторюємо, поки бот не відповість 2xx
+            while self.webhook is config:
+                try:
+                    async with session.post(config["url"], json=update, headers=headers) as resp:
+                        if resp.status < 300:
+                            self.delivered_at.setdefault(update["update_id"], time.perf_counter())
+                            self.calls["webhook_post"] += 1
+                            return
+                        self.calls["webhook_error"] += 1
+                except aiohttp.ClientError:
+                    self.calls["webhook_error"] += 1
+                await asyncio.sleep(0.5)
+        finally:
+            limit.release()
+
+    def _send_message(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        chat_id = int(params["chat_id"])
+        text = params.get("text", "")
+        self.inbox[chat_id].put_nowait((time.perf_counter(), text))
+        return {
+            "message_id": next(self._message_ids),
+            "date": int(time.time()),
+            "chat": {"id": chat_id, "type": "private"},
+            "from": {"id": self.bot_id, "is_bot": True, "first_name": "RadicalBot"},
+            "text": text,
+        }
+
+    async def handle_method(self, request: web.Request) -> web.Response:
+        method = request.match_info["method"].lower()
+        params = await self._params(request)
+        self.calls[method] += 1
+
+        if method == "getme":
+            result: Any = {
+                "id": self.bot_id, "is_bot": True, "first_name": "RadicalBot",
+                "username": "radical_fake_bot",
+            }
+        elif method == "getupdates":
+            if self.webhook is not None:
+                return web.json_response(
+                    {"ok": False, "error_code": 409,
+                     "description": "Conflict: can't use getUpdates method while webhook is active"},
+                    status=409,
+                )
+            self.polling.set()
+            self.ready.set()
+            result = await self._get_updates(params)
+        elif method == "setwebhook":
+            self._set_webhook(params)
+            result = True
+        elif method == "deletewebhook":
+            self._delete_webhook()
+            result = True
+        elif method == "getwebhookinfo":
+            result = {
+                "url": self.webhook["url"] if self.webhook else "",
+                "has_custom_certificate": False,
+                "pending_update_count": len(self._updates) + len(self._webhook_posts),
+                "max_connections": self.webhook["max_connections"] if self.webhook else None,
+            }
+        elif method == "sendmessage":
+            result = self._send_message(params)
+        elif method == "getfile":
+            file_id = params["file_id"]
+            if file_id not in self.files:
+                return web.json_response(
+                    {"ok": False, "error_code": 400, "description": "Bad Request: invalid file_id"},
+                    status=400,
+                )
+            result = {
+                "file_id": file_id,
+                "file_unique_id": file_id,
+                "file_size": len(self.files[file_id]),
+                "file_path": f"photos/{file_id}.jpg",
+            }
+        else:
+            # setMyCommands, close, ... — просто «ок»
+            result = True
+
+        return web.json_response({"ok": True, "result": result})
+
+    async def handle_file(self, request: web.Request) -> web.Response:
+        self.calls["download"] += 1
+        name = request.match_info["path"].rsplit("/", 1)[-1]
+        data = self.files.get(name.rsplit(".", 1)[0])
+        if data is None:
+            return web.Response(status=404)
+        return web.Response(body=data, content_type="image/jpeg")
+
+    # ---------------------------------------------------
+    # Керування (для окремого запуску)
+    # ---------------------------------------------------
+    async def handle_fake_photo(self, request: web.Request) -> web.Response:
+        from .corpus import synthetic_corpus
+
+        body = await request.json()
+        seed = int(body.get("seed", len(self.files)))
+        data = synthetic_corpus(1, seed=seed)[0]
+        update_id, _ = await self.send_photo(int(body["user_id"]), data)
+        return web.json_response({"update_id": update_id})
+
+    async def handle_fake_text(self, request: web.Request) -> web.Response:
+        body = await request.json()
+        update_id, _ = await self.send_text(int(body["user_id"]), body["text"])
+        return web.json_response({"update_id": update_id})
+
+    async def handle_fake_stats(self, _request: web.Request) -> web.Response:
+        return web.json_response({
+            "calls": dict(self.calls),
+            "pending_updates": len(self._updates),
+            "webhook": self.webhook["url"] if self.webhook else None,
+            "files": len(self.files),
+        })
+
+    # ---------------------------------------------------
+    # Життєвий цикл
+    # ---------------------------------------------------
+    def app(self) -> web.Application:
+        app = web.Application(client_max_size=32 * 1024 * 1024)
+        app.router.add_route("*", r"/bot{token}/{method}", self.handle_method)
+        app.router.add_get(r"/file/bot{token}/{path:.+}", self.handle_file)
+        app.router.add_post("/_fake/photo", self.handle_fake_photo)
+        app.router.add_post("/_fake/text", self.handle_fake_text)
+        app.router.add_get("/_fake/stats", self.handle_fake_stats)
+        return app
+
+    async def start(self, host: str = "127.0.0.1", port: int = 8081) -> str:
+        self._runner = web.AppRunner(self.app(), access_log=None)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, host, port).start()
+        return f"http://{host}:{port}"
+
+    async def stop(self):
+        self._delete_webhook()
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+
+async def _serve(host: str, port: int):
+    server = FakeTelegramServer()
+    url = await server.start(host, port)
+    print(f"[fake_telegram] Bot API on {url} (BOT_TOKEN={BOT_TOKEN}, TELEGRAM_API_URL={url})")
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await server.stop()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fake Telegram Bot API server.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8081)
+    args = parser.parse_args()
+    try:
+        asyncio.run(_serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,306 @@
+# benchmarks/loadgen.py
+"""
+Генератор навантаження на bot.py через локальний fake Telegram
+(benchmarks.fake_telegram) — без справжнього Telegram.
+
+Симулює N користувачів: кожен послідовно надсилає фото, /compare і
+(від імені адміна) /summary з паузами між діями; користувачі працюють
+паралельно. Для кожної дії міряється:
+
+    poll_ms    — від надсилання до моменту, коли бот забрав апдейт
+                 (getUpdates або відповідь на webhook-POST);
+    ack_ms     — до першої відповіді бота (черга dispatcher / event loop);
+    latency_ms — до фінальної відповіді (звіт збережено / помилка / «спробуй пізніше»).
+
+Помилки: таймаут без фінальної відповіді, відмова через чергу
+(busy — пул аналізу, rejected — черга допуску користувача).
+
+    python -m benchmarks.loadgen --users 20 --photos 3
+    python -m benchmarks.loadgen --users 50 --corpus-dir ~/faces --env ANALYZER_WORKERS=4
+    python -m benchmarks.loadgen --no-spawn-bot --port 8081   # бот запущений окремо
+
+Polling проти webhook — однакове навантаження, різний BOT_MODE:
+
+    python -m benchmarks.loadgen --users 20 --output polling.json
+    python -m benchmarks.loadgen --users 20 --bot-mode webhook --output webhook.json
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import secrets
+import asyncio
+import argparse
+import tempfile
+import statistics
+from collections import defaultdict
+from typing import Any, Dict, List, Optional
+
+from .corpus import load_corpus_dir, synthetic_corpus
+from .fake_telegram import BOT_TOKEN, FakeTelegramServer
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+ADMIN_ID = 270799202  # bot.ADMIN_IDS
+FIRST_USER_ID = 10_000
+
+# Фінальні відповіді handle_photo (початок тексту) -> результат
+PHOTO_OUTCOMES = (
+    ("💾", "ok"),
+    ("⚠️", "no_face"),
+    ("⏳ Зараз", "busy"),
+    ("⏳ У черзі", "rejected"),
+)
+
+
+def _photo_outcome(text: str) -> Optional[str]:
+    for prefix, outcome in PHOTO_OUTCOMES:
+        if text.startswith(prefix):
+            return outcome
+    return None
+
+
+class LoadGenerator:
+    def __init__(self, server: FakeTelegramServer, corpus: List[bytes], args: argparse.Namespace):
+        self.server = server
+        self.corpus = corpus
+        self.args = args
+        self.rng = random.Random(args.seed)
+        self.records: List[Dict[str, Any]] = []
+        # Відповіді адміну з різних /summary не можна розрізнити — по одній
+        self._admin_lock = asyncio.Lock()
+
+    async def _drain(self, chat_id: int):
+        queue = self.server.inbox[chat_id]
+        while not queue.empty():
+            queue.get_nowait()
+
+    async def _act(self, chat_id: int, kind: str, send) -> Dict[str, Any]:
+        await self._drain(chat_id)
+        update_id, sent_at = await send()
+        queue = self.server.inbox[chat_id]
+
+        record: Dict[str, Any] = {"kind": kind, "outcome": "timeout"}
+        deadline = sent_at + self.args.timeout
+        first = None
+
+        while True:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                received_at, text = await asyncio.wait_for(queue.get(), remaining)
+            except asyncio.TimeoutError:
+                break
+
+            if first is None:
+                first = received_at
+                record["ack_ms"] = (received_at - sent_at) * 1000.0
+
+            outcome = _photo_outcome(text) if kind == "photo" else "ok"
+            if outcome is not None:
+                record["outcome"] = outcome
+                record["latency_ms"] = (received_at - sent_at) * 1000.0
+                break
+
+        delivered = self.server.delivered_at.get(update_id)
+        if delivered is not None:
+            record["poll_ms"] = (delivered - sent_at) * 1000.0
+        return record
+
+    async def _user(self, index: int):
+        user_id = FIRST_USER_ID + index
+        plan = (["photo"] * self.args.photos + ["compare"] * self.args.compare
+                + ["summary"] * self.args.summary)
+        self.rng.shuffle(plan)
+
+        # Розносимо старт користувачів, щоб не було ідеально синхронного сплеску
+        await asyncio.sleep(self.rng.uniform(0, self.args.ramp_s))
+
+        for kind in plan:
+            if kind == "photo":
+                pick = self.rng.randrange(len(self.corpus))
+                data = self.corpus[pick]
+                repeat = self.rng.random() < self.args.repeat_ratio
+                unique = f"corpus-{pick}" if repeat else None
+                record = await self._act(
+                    user_id, kind, lambda: self.server.send_photo(user_id, data, unique_id=unique)
+                )
+            elif kind == "compare":
+                record = await self._act(user_id, kind, lambda: self.server.send_text(user_id, "/compare"))
+            else:
+                async with self._admin_lock:
+                    record = await self._act(
+                        ADMIN_ID, kind, lambda: self.server.send_text(ADMIN_ID, f"/summary {user_id}")
+                    )
+
+            record["user_id"] = user_id
+            self.records.append(record)
+            await asyncio.sleep(self.rng.expovariate(1000.0 / self.args.think_ms) if self.args.think_ms else 0)
+
+    async def run(self) -> float:
+        start = time.perf_counter()
+        await asyncio.gather(*(self._user(i) for i in range(self.args.users)))
+        return time.perf_counter() - start
+
+
+# ======================================================
+#                    ЗВІТ
+# ======================================================
+def _percentiles(values: List[float]) -> Dict[str, float]:
+    if not values:
+        return {}
+    values = sorted(values)
+    pick = lambda q: values[min(len(values) - 1, int(round(q * (len(values) - 1))))]
+    return {
+        "p50": round(statistics.median(values), 1),
+        "p95": round(pick(0.95), 1),
+        "p99": round(pick(0.99), 1),
+        "max": round(values[-1], 1),
+    }
+
+
+def summarize(records: List[Dict[str, Any]], elapsed: float) -> Dict[str, Any]:
+    by_kind: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+    for record in records:
+        by_kind[record["kind"]].append(record)
+
+    summary: Dict[str, Any] = {"elapsed_s": round(elapsed, 2), "actions": len(records), "kinds": {}}
+    failed = 0
+    for kind, items in sorted(by_kind.items()):
+        outcomes: Dict[str, int] = defaultdict(int)
+        for r in items:
+            outcomes[r["outcome"]] += 1
+        errors = sum(outcomes.get(k, 0) for k in ("timeout", "busy", "rejected"))
+        failed += errors
+        summary["kinds"][kind] = {
+            "count": len(items),
+            "outcomes": dict(outcomes),
+            "error_rate": round(errors / len(items), 4),
+            "latency_ms": _percentiles([r["latency_ms"] for r in items if "latency_ms" in r]),
+            "ack_ms": _percentiles([r["ack_ms"] for r in items if "ack_ms" in r]),
+            "poll_ms": _percentiles([r["poll_ms"] for r in items if "poll_ms" in r]),
+            "per_s": round(len(items) / elapsed, 3) if elapsed else 0.0,
+        }
+    summary["error_rate"] = round(failed / len(records), 4) if records else 0.0
+    return summary
+
+
+def _print_summary(summary: Dict[str, Any]):
+    print(f"[loadgen] {summary['actions']} actions in {summary['elapsed_s']} s, "
+          f"error rate {summary['error_rate'] * 100:.1f}%")
+    for kind, s in summary["kinds"].items():
+        lat, ack, poll = s["latency_ms"], s["ack_ms"], s["poll_ms"]
+        print(
+            f"[loadgen] {kind:<8} n={s['count']:<4} {s['per_s']:>6}/s  "
+            f"latency p50 {lat.get('p50', '-')} p95 {lat.get('p95', '-')} ms  "
+            f"ack p50 {ack.get('p50', '-')} ms  poll p50 {poll.get('p50', '-')} ms  "
+            f"{s['outcomes']}"
+        )
+
+
+# ======================================================
+#                    ЗАПУСК
+# ======================================================
+def _spawn_bot(api_url: str, args: argparse.Namespace) -> "asyncio.subprocess.Process":
+    env = dict(os.environ)
+    env.update({
+        "BOT_TOKEN": BOT_TOKEN,
+        "TELEGRAM_API_URL": api_url,
+        "DB_PATH": os.path.join(tempfile.mkdtemp(prefix="loadgen-db-"), "reports.db"),
+        "METRICS_PORT": "0",
+        "PHOTO_PERSIST": "0",
+        "BOT_MODE": args.bot_mode,
+    })
+    if args.bot_mode == "webhook":
+        env.update({
+            "WEBHOOK_URL": f"http://127.0.0.1:{args.webhook_port}",
+            "WEBHOOK_HOST": "127.0.0.1",
+            "WEBHOOK_PORT": str(args.webhook_port),
+            "WEBHOOK_SECRET": secrets.token_urlsafe(16),
+        })
+    for item in args.env:
+        key, _, value = item.partition("=")
+        env[key] = value
+    return asyncio.create_subprocess_exec(sys.executable, "bot.py", cwd=BASE_DIR, env=env)
+
+
+async def run(args: argparse.Namespace) -> Dict[str, Any]:
+    corpus = (load_corpus_dir(args.corpus_dir, args.corpus_size) if args.corpus_dir
+              else synthetic_corpus(args.corpus_size, seed=args.seed))
+
+    server = FakeTelegramServer()
+    api_url = await server.start(port=args.port)
+    print(f"[loadgen] Fake Bot API on {api_url}")
+
+    bot_proc = None
+    try:
+        if not args.no_spawn_bot:
+            bot_proc = await _spawn_bot(api_url, args)
+
+        # Бот готовий, коли почав long polling або встановив webhook
+        try:
+            await asyncio.wait_for(server.ready.wait(), args.startup_timeout)
+        except asyncio.TimeoutError:
+            raise RuntimeError("bot did not start polling / set a webhook in time")
+
+        generator = LoadGenerator(server, corpus, args)
+        elapsed = await generator.run()
+
+        summary = summarize(generator.records, elapsed)
+        summary["config"] = {
+            k: v for k, v in vars(args).items() if k not in ("output",)
+        }
+        summary["api_calls"] = dict(server.calls)
+        return summary
+    finally:
+        if bot_proc is not None and bot_proc.returncode is None:
+            bot_proc.terminate()
+            try:
+                await asyncio.wait_for(bot_proc.wait(), 30)
+            except asyncio.TimeoutError:
+                bot_proc.kill()
+        await server.stop()
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Load generator for bot.py against a fake Telegram API.")
+    parser.add_argument("--users", type=int, default=10)
+    parser.add_argument("--photos", type=int, default=2, help="фото на користувача")
+    parser.add_argument("--compare", type=int, default=1, help="/compare на користувача")
+    parser.add_argument("--summary", type=int, default=1, help="/summary на користувача (від адміна)")
+    parser.add_argument("--think-ms", type=float, default=500, help="середня пауза між діями")
+    parser.add_argument("--ramp-s", type=float, default=2.0, help="розкид старту користувачів")
+    parser.add_argument("--repeat-ratio", type=float, default=0.0,
+                        help="частка фото з уже баченим file_unique_id (кеш результатів)")
+    parser.add_argument("--timeout", type=float, default=120, help="таймаут фінальної відповіді, с")
+    parser.add_argument("--startup-timeout", type=float, default=300)
+    parser.add_argument("--corpus-size", type=int, default=12)
+    parser.add_argument("--corpus-dir")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--port", type=int, default=8081)
+    parser.add_argument("--bot-mode", choices=("polling", "webhook"), default="polling",
+                        help="BOT_MODE запущеного bot.py")
+    parser.add_argument("--webhook-port", type=int, default=8443,
+                        help="порт webhook-сервера бота (--bot-mode webhook)")
+    parser.add_argument("--no-spawn-bot", action="store_true",
+                        help=f"не запускати bot.py (запусти його з BOT_TOKEN={BOT_TOKEN})")
+    parser.add_argument("--env", action="append", default=[], metavar="KEY=VALUE",
+                        help="змінні оточення для bot.py (можна кілька)")
+    parser.add_argument("--output", help="зберегти підсумок у JSON")
+    args = parser.parse_args(argv)
+
+    summary = asyncio.run(run(args))
+    _print_summary(summary)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(summary, f, ensure_ascii=False, indent=2)
+        print(f"[loadgen] Saved {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
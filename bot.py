@@ -1,7 +1,11 @@
 import os
 import sys
 import asyncio
-from aiogram import Bot, Dispatcher, types, F
+from typing import Optional
+
+from aiogram import Bot, Dispatcher, Router, types, F
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiogram.client.telegram import TelegramAPIServer
 from aiogram.filters import Command
 
 # ======================================================
@@ -17,51 +21,188 @@ if BASE_DIR not in sys.path:
 if ANALYZER_DIR not in sys.path:
     sys.path.insert(0, ANALYZER_DIR)
 
-print("=== DEBUG PATH ===")
-print("BASE_DIR:", BASE_DIR)
-print("sys.path:", sys.path)
-print("Analyzer exists:", os.path.exists(ANALYZER_DIR))
-print("Analyzer content:", os.listdir(ANALYZER_DIR) if os.path.exists(ANALYZER_DIR) else "NONE")
-print("==================")
-
 
 # ======================================================
 #                 IMPORT LOCAL MODULES
 # ======================================================
 
-from analyzer.face_detector import detect_face_info
-from analyzer.emotion_model import interpret_emotions
-from analyzer.stress_model import detect_microstress
-from analyzer.personality_model import build_personality_profile
-from analyzer.professional_profile import build_professional_profile
-from analyzer.report_builder import build_full_report
-from analyzer.physiognomy_model import build_physiognomy_profile
+# Лише легкі модулі: DeepFace / TensorFlow / MediaPipe / cv2 вантажаться
+# у воркерах аналізу (analyzer.tasks), а не при старті бота
+from analyzer.tasks import analyze_batch
+from analyzer.executor import AnalysisExecutor, ExecutorBusy
+from analyzer.batching import MicroBatcher
+from analyzer.sharded import ShardedAnalyzer
 from analyzer.radicals import RADICALS
 
-from database import init_db, save_report, get_user_reports
+from database import (
+    init_db,
+    aget_latest_reports,
+    aget_metric_history,
+    get_storage,
+)
+from photo_store import schedule_persist, flush_pending, retention_loop
+from result_cache import ResultCache, content_key, file_key
+from admission import AdmissionController, AdmissionRejected
+from job_queue import get_job_queue
+from serving import UpdateTracker, serve
+from report_sender import (
+    BUSY_TEXT,
+    USER_QUEUE_FULL_TEXT,
+    NO_FACE_TEXT,
+    already_saved,
+    save_result,
+    send_report,
+    with_origin,
+)
+from metrics import (
+    REGISTRY,
+    PHOTOS_TOTAL,
+    STAGE_SECONDS,
+    timed,
+    observe_pipeline_timings,
+    start_metrics_server,
+)
 
 
 # ======================================================
-#                  BOT TOKEN
+#                  КОНФІГУРАЦІЯ
 # ======================================================
 
-BOT_TOKEN = os.getenv("BOT_TOKEN")    # ← Railway Variables
-
-if not BOT_TOKEN:
-    raise RuntimeError("❌ BOT_TOKEN is missing! Add it in Railway → Variables.")
+# Імпорт bot.py не має побічних ефектів: Bot, БД, пул аналізу, кеш і
+# допуск створює setup() з main(). Це важливо і для spawn-процесів пулу,
+# які імпортують головний модуль батька.
 
 ADMIN_IDS = [270799202]
 
-bot = Bot(token=BOT_TOKEN)
-dp = Dispatcher()
+# Інший Bot API сервер (локальний telegram-bot-api або benchmarks.fake_telegram)
+TELEGRAM_API_URL = os.getenv("TELEGRAM_API_URL", "")
+
+# inline  — аналіз у процесі бота (пул AnalysisExecutor);
+# sharded — бот-супервізор: ANALYZER_SHARDS процесів-аналізаторів,
+#           фото користувача завжди йдуть у «його» процес (analyzer.sharded);
+# queue   — бот лише кладе фото в таблицю jobs, аналізують процеси worker.py
+ANALYSIS_MODE = os.getenv("ANALYSIS_MODE", "inline").lower()
+
+router = Router()
+
+# Створюються в setup()
+bot: Optional[Bot] = None
+dp: Optional[Dispatcher] = None
+update_tracker: Optional[UpdateTracker] = None
+analysis_executor = None
+analysis_batcher = None
+result_cache: Optional[ResultCache] = None
+admission: Optional[AdmissionController] = None
+job_queue = None
+
+
+def setup() -> Dispatcher:
+    """Створює бота, диспетчер, пул аналізу, кеш, допуск і готує БД."""
+    global bot, dp, update_tracker, analysis_executor, analysis_batcher
+    global result_cache, admission, job_queue
+
+    bot_token = os.getenv("BOT_TOKEN")    # ← Railway Variables
+    if not bot_token:
+        raise RuntimeError("❌ BOT_TOKEN is missing! Add it in Railway → Variables.")
+
+    if ANALYSIS_MODE not in ("inline", "sharded", "queue"):
+        raise RuntimeError(f"❌ Unknown ANALYSIS_MODE={ANALYSIS_MODE!r} (inline | sharded | queue).")
+
+    session = (
+        AiohttpSession(api=TelegramAPIServer.from_base(TELEGRAM_API_URL))
+        if TELEGRAM_API_URL else None
+    )
+    bot = Bot(token=bot_token, session=session)
+    dp = Dispatcher()
+    dp.include_router(router)
+
+    # Ліміт одночасних обробників і дочікування їх при зупинці (polling і webhook)
+    update_tracker = UpdateTracker()
+    dp.update.outer_middleware(update_tracker)
+
+    if ANALYSIS_MODE == "sharded":
+        # Той самий інтерфейс, що й пара executor + batcher нижче
+        analysis_executor = ShardedAnalyzer(analyze_batch)
+        analysis_batcher = analysis_executor
+    else:
+        # CPU-важкий аналіз іде в пул воркерів, щоб не блокувати polling
+        analysis_executor = AnalysisExecutor()
+
+        # Конкурентні фото групуються в пачки (ANALYZER_BATCH_SIZE / ANALYZER_BATCH_WAIT_MS)
+        analysis_batcher = MicroBatcher(analyze_batch, analysis_executor)
+
+    # Кеш результатів за file_unique_id / хешем вмісту
+    result_cache = ResultCache()
+
+    # Допуск до аналізу: обмежена черга, ліміти на користувача, round-robin.
+    # За замовчуванням одночасно — стільки фото, скільки влазить у пачки всіх воркерів
+    admission = AdmissionController(
+        max_active=int(os.getenv(
+            "ADMISSION_MAX_ACTIVE",
+            analysis_executor.workers * analysis_batcher.max_batch_size,
+        )),
+    )
+
+    init_db()
+
+    job_queue = get_job_queue() if ANALYSIS_MODE == "queue" else None
+
+    register_gauges()
+    return dp
+
 
-init_db()
+# ======================================================
+#          METRICS (стан черги / прогріву / батчингу)
+# ======================================================
+def register_gauges():
+    REGISTRY.gauge("radical_analysis_queue_depth", "Аналізи, що виконуються або чекають у черзі",
+                   fn=lambda: analysis_executor.pending)
+    REGISTRY.gauge("radical_analysis_queue_capacity", "Максимум задач у черзі аналізу",
+                   fn=lambda: analysis_executor.capacity)
+    REGISTRY.gauge("radical_models_warm", "1 — моделі прогріті в усіх воркерах",
+                   fn=lambda: int(analysis_executor.ready))
+    REGISTRY.gauge("radical_result_cache_hits", "Влучання в кеш результатів",
+                   fn=lambda: result_cache.hits)
+    REGISTRY.gauge("radical_result_cache_misses", "Промахи кешу результатів",
+                   fn=lambda: result_cache.misses)
+    REGISTRY.gauge("radical_batches_total", "Пачки, передані в пул аналізу",
+                   fn=lambda: analysis_batcher.batches_total)
+    REGISTRY.gauge("radical_batch_size_avg", "Середній розмір пачки",
+                   fn=lambda: analysis_batcher.stats()["avg_batch_size"])
+    REGISTRY.gauge("radical_batch_wait_ms_avg", "Середнє очікування на формування пачки, мс",
+                   fn=lambda: analysis_batcher.stats()["avg_wait_ms"])
+    REGISTRY.gauge("radical_updates_in_flight", "Апдейти, що зараз обробляються",
+                   fn=lambda: update_tracker.in_flight)
+    REGISTRY.gauge("radical_admission_active", "Фото, допущені до аналізу",
+                   fn=lambda: admission.active)
+    REGISTRY.gauge("radical_admission_queued", "Фото в черзі допуску",
+                   fn=lambda: admission.queued)
+    REGISTRY.gauge("radical_admission_rejected", "Фото, відхилені контролем допуску",
+                   fn=lambda: sum(admission.rejected.values()))
+    if ANALYSIS_MODE == "sharded":
+        def _shard_stats(key: str):
+            return {
+                shard.index: ShardedAnalyzer.shard_stats(shard)[key]
+                for shard in analysis_executor.shards
+            }
+
+        REGISTRY.gauge("radical_shard_in_flight", "Фото в процесі-аналізаторі шарда",
+                       labels=("shard",), fn=lambda: _shard_stats("in_flight"))
+        REGISTRY.gauge("radical_shard_items_total", "Фото, проаналізовані шардом",
+                       labels=("shard",), fn=lambda: _shard_stats("items_total"))
+        REGISTRY.gauge("radical_shard_restarts", "Перезапуски процесу шарда після падіння",
+                       labels=("shard",), fn=lambda: _shard_stats("restarts"))
+        REGISTRY.gauge("radical_shard_ready", "1 — моделі шарда прогріті",
+                       labels=("shard",), fn=lambda: _shard_stats("ready"))
+    if job_queue is not None:
+        REGISTRY.gauge("radical_jobs_pending", "Задачі в durable-черзі (queued + running)",
+                       fn=lambda: job_queue.pending())
 
 
 # ======================================================
 #                    START
 # ======================================================
-@dp.message(Command("start"))
+@router.message(Command("start"))
 async def start(message: types.Message):
     await message.answer(
         "👋 Надішли фото — я створю розширений психологічний портрет.\n\n"
@@ -79,128 +220,172 @@ async def start(message: types.Message):
 # ======================================================
 #               PHOTO HANDLER
 # ======================================================
-@dp.message(F.photo)
-async def handle_photo(message: types.Message):
-    await message.answer("⏳ Аналізую фото… це може зайняти кілька секунд.")
-
-    user_id = message.from_user.id
-    file_id = message.photo[-1].file_id
 
-    file = await bot.get_file(file_id)
+# Найменша версія фото, у якої коротша сторона ≥ PHOTO_MIN_SIDE.
+# Детектор все одно зменшує кадр, тож 2560px-оригінал — зайвий трафік.
+# 0 — завжди брати найбільшу версію.
+PHOTO_MIN_SIDE = int(os.getenv("PHOTO_MIN_SIDE", "960"))
 
-    os.makedirs("photos", exist_ok=True)
-    img_path = f"photos/{user_id}_{file_id}.jpg"
 
-    await bot.download_file(file.file_path, img_path)
+def pick_photo_size(sizes):
+    if PHOTO_MIN_SIDE <= 0:
+        return sizes[-1]
+    for size in sorted(sizes, key=lambda p: p.width * p.height):
+        if min(size.width, size.height) >= PHOTO_MIN_SIDE:
+            return size
+    return sizes[-1]
 
-    # --- 1. FACE ---
-    face_info = detect_face_info(img_path)
-    if face_info is None:
-        return await message.answer(
-            "⚠️ Не вдалося розпізнати обличчя.\n"
-            "Спробуй інше фото: анфас, без тіней, з хорошим світлом."
-        )
-
-    # --- 2. EMOTION ---
-    emotion_data = interpret_emotions(face_info.get("emotion", {}))
 
-    # --- 3. STRESS ---
-    stress_data = detect_microstress(img_path)
+async def analyze_photo(photo: types.PhotoSize, user_id: int, unique_key: str):
+    """
+    Завантаження + аналіз (з кешем за хешем вмісту).
+    Повертає (result | None, img_path, cached). ExecutorBusy — пул переповнений.
+    """
+    with timed("download"):
+        file = await bot.get_file(photo.file_id)
 
-    # --- 4. PHYSIOGNOMY (must be BEFORE personality) ---
-    physiognomy = build_physiognomy_profile(face_info)
+        # Фото завантажується в памʼять і декодується напряму, без photos/
+        buffer = await bot.download_file(file.file_path)
+        img_bytes = buffer.getvalue()
 
-    # --- 5. PERSONALITY (Big Five + ML Radicals) ---
-    personality = build_personality_profile(face_info, emotion_data, stress_data, physiognomy)
+    # Збереження оригіналу — опціональне і фонове (PHOTO_PERSIST)
+    img_path = schedule_persist(img_bytes, user_id, photo.file_id) or ""
 
-    # --- 6. PROFESSIONAL PROFILE ---
-    professional = build_professional_profile(personality)
+    # Друга спроба — за хешем вмісту (перезбережене / переслане фото)
+    hash_key = content_key(img_bytes)
+    result = await result_cache.aget(hash_key)
+    if result is not None:
+        return result, img_path, True
 
-    # --- 7. FULL REPORT ---
-    full_report = build_full_report(
-        face_info,
-        emotion_data,
-        stress_data,
-        personality,
-        professional,
-        physiognomy,
-    )
+    # Одразу після старту моделі ще прогріваються у фоні
+    if not analysis_executor.ready:
+        with timed("warmup_wait"):
+            await analysis_executor.wait_warm()
 
-    # --- 8. SAVE ---
-    save_report(
-        user_id,
-        img_path,
-        face_info,
-        emotion_data,
-        stress_data,
-        personality,
-        professional,
-        full_report,
-    )
+    with timed("analysis"):
+        # user_id — ключ маршрутизації в ANALYSIS_MODE=sharded
+        result = await analysis_batcher.submit(img_bytes, key=user_id)
 
-    # --- 9. SEND CHUNKS ---
-    chunk = 3500
-    for i in range(0, len(full_report), chunk):
-        await message.answer(full_report[i:i + chunk])
+    if result is not None:
+        observe_pipeline_timings(result.get("timings"))
+        await result_cache.aput(with_origin(result, user_id), unique_key, hash_key)
+    return result, img_path, False
 
-    # --- SHORT BLOCK (Radical + Physio) ---
-    radical_code = personality.get("radical_key")
-    radical_info = RADICALS.get(radical_code)
 
-    short_block = ""
+async def enqueue_photo(message: types.Message, photo: types.PhotoSize):
+    """ANALYSIS_MODE=queue: задача в jobs, відповідь надішле worker.py."""
+    user_id = message.from_user.id
 
-    if radical_info:
-        short_block += (
-            f"🧩 Радикал: *{radical_info['name']}*\n"
-            f"{radical_info['short']}\n\n"
+    # Ліміт на користувача той самий, що й у контролі допуску
+    pending = await job_queue.apending_for_user(user_id)
+    if pending >= admission.per_user_queue:
+        PHOTOS_TOTAL.inc(outcome="rejected")
+        return await message.answer(USER_QUEUE_FULL_TEXT)
+
+    with timed("enqueue"):
+        job_id = await job_queue.aenqueue(
+            "photo",
+            {"file_id": photo.file_id, "file_unique_id": photo.file_unique_id},
+            user_id=user_id,
+            chat_id=message.chat.id,
         )
+    PHOTOS_TOTAL.inc(outcome="queued")
+
+    position = await job_queue.aposition(job_id)
+    await message.answer(
+        f"🕒 Фото в черзі, позиція: {position}. Результат надішлю автоматично."
+    )
 
-    if isinstance(physiognomy, dict):
-        phys_short = physiognomy.get("short_summary", "")
-        short_block += f"👁 Фізіогноміка (коротко):\n{phys_short}\n"
 
-    if short_block:
-        await message.answer(short_block, parse_mode="Markdown")
+@router.message(F.photo)
+async def handle_photo(message: types.Message):
+    await message.answer("⏳ Аналізую фото… це може зайняти кілька секунд.")
 
-    await message.answer("💾 Звіт збережено. Використай /compare, щоб побачити зміни.")
+    user_id = message.from_user.id
+    photo = pick_photo_size(message.photo)
+    unique_key = file_key(photo.file_unique_id)
+
+    # Те саме фото вже аналізувалось — не завантажуємо і не рахуємо заново
+    result = await result_cache.aget(unique_key)
+    img_path = ""
+
+    cached = result is not None
+
+    if result is None and job_queue is not None:
+        return await enqueue_photo(message, photo)
+
+    if result is None:
+        try:
+            ticket = admission.submit(user_id)
+        except AdmissionRejected as e:
+            PHOTOS_TOTAL.inc(outcome="rejected")
+            if e.reason == "user_queue_full":
+                return await message.answer(USER_QUEUE_FULL_TEXT)
+            return await message.answer(BUSY_TEXT)
+
+        try:
+            if not ticket.admitted:
+                await message.answer(
+                    f"🕒 Фото в черзі, позиція: {admission.position(ticket)}. Результат надішлю автоматично."
+                )
+            # Очікування в черзі — окремо від обробки
+            await ticket.wait()
+            STAGE_SECONDS.observe(ticket.wait_seconds, stage="queue_wait")
+
+            result, img_path, cached = await analyze_photo(photo, user_id, unique_key)
+        except ExecutorBusy:
+            PHOTOS_TOTAL.inc(outcome="busy")
+            return await message.answer(BUSY_TEXT)
+        except Exception:
+            PHOTOS_TOTAL.inc(outcome="error")
+            raise
+        finally:
+            admission.release(ticket)
+
+    if result is None:
+        PHOTOS_TOTAL.inc(outcome="no_face")
+        return await message.answer(NO_FACE_TEXT)
+
+    PHOTOS_TOTAL.inc(outcome="cached" if cached else "ok")
+
+    # Повтор уже збереженого фото не дублює рядок у reports (/compare, /summary)
+    if cached and already_saved(result, user_id):
+        return await send_report(bot, message.chat.id, result, saved=False)
+
+    await save_result(user_id, img_path, result)
+    await send_report(bot, message.chat.id, result)
 
 # ======================================================
 #                   COMPARE
 # ======================================================
-@dp.message(Command("compare"))
+@router.message(Command("compare"))
 async def compare(message: types.Message):
-    reports = get_user_reports(message.from_user.id)
+    # Типізовані колонки метрик — без json.loads блобів
+    reports = await aget_metric_history(message.from_user.id, limit=2)
 
     if len(reports) < 2:
         return await message.answer("Потрібні мінімум 2 фото для порівняння стану.")
 
-    import json
-
-    last = reports[0]
-    prev = reports[1]
-
-    emo1 = json.loads(last[4])
-    stress1 = json.loads(last[5])
-
-    emo2 = json.loads(prev[4])
-    stress2 = json.loads(prev[5])
+    # Порожні (NULL) метрики старих записів — як відсутні ключі
+    last = {k: v for k, v in reports[0].items() if v is not None}
+    prev = {k: v for k, v in reports[1].items() if v is not None}
 
     result = f"""
 📊 **Порівняння двох аналізів**
 
 1️⃣ Останнє:
-• Емоція: {emo1.get('dominant_emotion', '—')}
-• Валентність: {emo1.get('valence', 0)}
-• Стрес: {stress1.get('microstress_level', 0)}
+• Емоція: {last.get('dominant_emotion', '—')}
+• Валентність: {last.get('valence', 0)}
+• Стрес: {last.get('microstress_level', 0)}
 
 2️⃣ Попереднє:
-• Емоція: {emo2.get('dominant_emotion', '—')}
-• Валентність: {emo2.get('valence', 0)}
-• Стрес: {stress2.get('microstress_level', 0)}
+• Емоція: {prev.get('dominant_emotion', '—')}
+• Валентність: {prev.get('valence', 0)}
+• Стрес: {prev.get('microstress_level', 0)}
 
 🔥 Динаміка:
-• Емоційність: {'покращилась' if emo1.get('valence', 0) > emo2.get('valence', 0) else 'погіршилась або стабільна'}
-• Стрес: {'зріс' if stress1.get('microstress_level', 0) > stress2.get('microstress_level', 0) else 'знизився або стабільний'}
+• Емоційність: {'покращилась' if last.get('valence', 0) > prev.get('valence', 0) else 'погіршилась або стабільна'}
+• Стрес: {'зріс' if last.get('microstress_level', 0) > prev.get('microstress_level', 0) else 'знизився або стабільний'}
 """
 
     await message.answer(result)
@@ -209,7 +394,7 @@ async def compare(message: types.Message):
 # ======================================================
 #           ADMIN SUMMARY (з радикалом + описом)
 # ======================================================
-@dp.message(Command("summary"))
+@router.message(Command("summary"))
 async def admin_summary(message: types.Message):
     if message.from_user.id not in ADMIN_IDS:
         return await message.answer("⛔ Доступ заборонений.")
@@ -223,14 +408,16 @@ async def admin_summary(message: types.Message):
     except ValueError:
         return await message.answer("user_id має бути числом.")
 
-    reports = get_user_reports(target)
+    reports = await aget_latest_reports(
+        target, limit=1, columns=("personality_data", "professional_data")
+    )
 
     if not reports:
         return await message.answer("У користувача немає історії.")
 
     import json
-    personality = json.loads(reports[0][6])
-    professional = json.loads(reports[0][7])
+    personality = json.loads(reports[0]["personality_data"])
+    professional = json.loads(reports[0]["professional_data"])
 
     big_five = personality.get("big_five_scores", {}) or {}
 
@@ -271,8 +458,42 @@ Big Five:
 # ======================================================
 #                     RUN BOT
 # ======================================================
+def _on_warm_done(task: asyncio.Future):
+    if task.cancelled():
+        return
+    if task.exception() is not None or not task.result():
+        print("[bot] Warning: warm-up incomplete, some models will load lazily.")
+    else:
+        print("[bot] Analyzer workers are warm.")
+
+
 async def main():
-    await dp.start_polling(bot)
+    setup()
+
+    # Прогрів моделей у воркерах — у фоні: polling стартує одразу,
+    # /start, /compare, /summary відповідають без очікування, а фото
+    # чекають завершення прогріву (analysis_executor.wait_warm)
+    # У режимі queue моделі живуть у worker.py — пул бота не потрібен
+    if ANALYSIS_MODE != "queue":
+        analysis_executor.start_warm_up().add_done_callback(_on_warm_done)
+
+    background = [asyncio.create_task(retention_loop())]
+    if ANALYSIS_MODE == "sharded":
+        # Перезапуск процесів-аналізаторів, що впали, поки шард простоював
+        background.append(asyncio.create_task(analysis_executor.monitor()))
+    metrics_runner = await start_metrics_server()
+
+    try:
+        # BOT_MODE=polling | webhook; при зупинці апдейти в обробці дообробляються
+        await serve(dp, bot, update_tracker)
+    finally:
+        for task in background:
+            task.cancel()
+        if metrics_runner is not None:
+            await metrics_runner.cleanup()
+        await flush_pending()
+        analysis_executor.shutdown(wait=False)
+        get_storage().close()
 
 
 if __name__ == "__main__":
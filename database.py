@@ -1,16 +1,54 @@
 # database.py
 import os
 import json
-import sqlite3
-from typing import Any, List, Tuple
+from typing import Any, Dict, List, Optional, Sequence, Tuple
 
-DB_PATH = os.path.join(os.path.dirname(__file__), "reports.db")
+from storage import Storage
+from payload_codec import PayloadCodec
+from serialization import dumps
+
+DB_PATH = os.getenv("DB_PATH", os.path.join(os.path.dirname(__file__), "reports.db"))
+
+_storage: Optional[Storage] = None
+_codec: Optional[PayloadCodec] = None
+
+
+def get_storage() -> Storage:
+    """Спільний Storage процесу (довгоживучі зʼєднання, WAL)."""
+    global _storage
+    if _storage is None or _storage.db_path != DB_PATH:
+        _storage = Storage(DB_PATH)
+    return _storage
+
+
+def get_codec() -> PayloadCodec:
+    """Кодек стиснених полів звітів (словник статичного тексту — в БД)."""
+    global _codec
+    storage = get_storage()
+    if _codec is None or _codec.storage is not storage:
+        _codec = PayloadCodec(storage)
+    return _codec
+
+
+# Колонки, які зберігаються стиснено (payload_codec) і розпаковуються при читанні
+PAYLOAD_COLUMNS = (
+    "face_data",
+    "emotion_data",
+    "stress_data",
+    "personality_data",
+    "professional_data",
+    "full_report",
+)
 
 
 def _make_jsonable(obj: Any):
     """
     Рекурсивно перетворює numpy-типи, масиви тощо
     у звичайні Python-типи, які json.dumps розуміє.
+
+    Старий шлях: збереження тепер іде через serialization.dumps
+    (один прохід, без копії). Лишається для сумісності і як базовий
+    варіант у benchmarks/bench_serialization.py.
     """
     # Лінивий імпорт, щоб не падати, якщо раптом немає numpy
     try:
@@ -36,9 +74,7 @@ def _make_jsonable(obj: Any):
 
 
 def init_db():
-    conn = sqlite3.connect(DB_PATH)
-    cur = conn.cursor()
-    cur.execute(
+    get_storage().executescript(
         """
         CREATE TABLE IF NOT EXISTS reports (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -51,11 +87,118 @@ def init_db():
             professional_data TEXT,
             full_report TEXT,
             created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-        )
+        );
+
+        -- Історія користувача: пошук по user_id + сортування по часу
+        -- без сканування таблиці (rowid входить в індекс неявно)
+        CREATE INDEX IF NOT EXISTS idx_reports_user_created
+            ON reports (user_id, created_at);
         """
     )
-    conn.commit()
-    conn.close()
+    get_codec().ensure_schema()
+    _migrate_metric_columns()
+
+
+# ======================================================
+#     НОРМАЛІЗОВАНІ МЕТРИКИ (типізовані колонки)
+# ======================================================
+
+# Скаляри, які раніше жили лише всередині JSON-блобів.
+# Пишуться поруч із JSON при вставці, тож тренди й агрегати
+# рахуються в SQL без json.loads.
+METRIC_COLUMNS = {
+    "dominant_emotion": "TEXT",
+    # NUMERIC: 50.0 зберігається як 50, 62.3 — як дійсне
+    "valence": "NUMERIC",
+    "microstress_level": "NUMERIC",
+    "openness": "INTEGER",
+    "conscientiousness": "INTEGER",
+    "extraversion": "INTEGER",
+    "agreeableness": "INTEGER",
+    "neuroticism": "INTEGER",
+    "radical_key": "TEXT",
+    # 1 — метрики заповнені (при вставці або бекфілом)
+    "metrics_version": "INTEGER",
+}
+
+METRICS_VERSION = 1
+BIG_FIVE = ("openness", "conscientiousness", "extraversion", "agreeableness", "neuroticism")
+
+
+def _extract_metrics(emotion_data: Optional[dict], stress_data: Optional[dict],
+                     personality_data: Optional[dict]) -> Dict[str, Any]:
+    emotion_data = emotion_data or {}
+    stress_data = stress_data or {}
+    personality_data = personality_data or {}
+    big_five = personality_data.get("big_five_scores") or {}
+
+    def _num(value, cast):
+        try:
+            return cast(value) if value is not None else None
+        except (TypeError, ValueError):
+            return None
+
+    metrics = {
+        "dominant_emotion": emotion_data.get("dominant_emotion"),
+        "valence": _num(emotion_data.get("valence"), float),
+        "microstress_level": _num(stress_data.get("microstress_level"), float),
+        "radical_key": personality_data.get("radical_key"),
+        "metrics_version": METRICS_VERSION,
+    }
+    for trait in BIG_FIVE:
+        metrics[trait] = _num(big_five.get(trait), int)
+    return metrics
+
+
+def _migrate_metric_columns(batch_size: int = 500):
+    """
+    Додає колонки метрик у стару таблицю і заповнює їх з JSON-блобів
+    для рядків, вставлених до міграції. Безпечно запускати повторно.
+    """
+    storage = get_storage()
+    existing = {row[1] for row in storage.query("PRAGMA table_info(reports)")}
+
+    for column, sql_type in METRIC_COLUMNS.items():
+        if column not in existing:
+            storage.execute(f"ALTER TABLE reports ADD COLUMN {column} {sql_type}")
+
+    storage.executescript(
+        """
+        CREATE INDEX IF NOT EXISTS idx_reports_radical ON reports (radical_key);
+        """
+    )
+
+    assignments = ", ".join(f"{c} = ?" for c in METRIC_COLUMNS)
+    decode = get_codec().decode
+    last_id = 0
+    while True:
+        rows = storage.query(
+            """
+            SELECT id, emotion_data, stress_data, personality_data
+            FROM reports
+            WHERE metrics_version IS NULL AND id > ?
+            ORDER BY id
+            LIMIT ?
+            """,
+            (last_id, batch_size),
+        )
+        if not rows:
+            break
+
+        updates = []
+        for row_id, emotion_json, stress_json, personality_json in rows:
+            try:
+                metrics = _extract_metrics(
+                    json.loads(decode(emotion_json) or "{}"),
+                    json.loads(decode(stress_json) or "{}"),
+                    json.loads(decode(personality_json) or "{}"),
+                )
+            except (TypeError, ValueError):
+                metrics = _extract_metrics(None, None, None)
+            updates.append([metrics[c] for c in METRIC_COLUMNS] + [row_id])
+
+        storage.executemany(f"UPDATE reports SET {assignments} WHERE id = ?", updates)
+        last_id = rows[-1][0]
 
 
 def save_report(
@@ -70,19 +213,21 @@ def save_report(
 ):
     """
     Зберігає все в SQLite.
-    ВАЖЛИВО: перед json.dumps ганяємо через _make_jsonable.
+    numpy-значення серіалізуються напряму (serialization.dumps).
+    JSON і full_report стискаються зі словником статичного тексту (payload_codec).
     """
-    conn = sqlite3.connect(DB_PATH)
-    cur = conn.cursor()
+    codec = get_codec()
+    face_json = codec.encode(dumps(face_data))
+    emotion_json = codec.encode(dumps(emotion_data))
+    stress_json = codec.encode(dumps(stress_data))
+    personality_json = codec.encode(dumps(personality_data))
+    professional_json = codec.encode(dumps(professional_data))
 
-    face_json = json.dumps(_make_jsonable(face_data), ensure_ascii=False)
-    emotion_json = json.dumps(_make_jsonable(emotion_data), ensure_ascii=False)
-    stress_json = json.dumps(_make_jsonable(stress_data), ensure_ascii=False)
-    personality_json = json.dumps(_make_jsonable(personality_data), ensure_ascii=False)
-    professional_json = json.dumps(_make_jsonable(professional_data), ensure_ascii=False)
+    metrics = _extract_metrics(emotion_data, stress_data, personality_data)
+    metric_names = list(METRIC_COLUMNS)
 
-    cur.execute(
-        """
+    return get_storage().execute(
+        f"""
         INSERT INTO reports (
             user_id,
             image_path,
@@ -91,8 +236,9 @@ def save_report(
             stress_data,
             personality_data,
             professional_data,
-            full_report
-        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            full_report,
+            {", ".join(metric_names)}
+        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, {", ".join("?" for _ in metric_names)})
         """,
         (
             user_id,
@@ -102,22 +248,19 @@ def save_report(
             stress_json,
             personality_json,
             professional_json,
-            full_report,
+            codec.encode(full_report),
+            *(metrics[c] for c in metric_names),
         ),
     )
 
-    conn.commit()
-    conn.close()
-
 
 def get_user_reports(user_id: int) -> List[Tuple]:
     """
     Повертає список записів для користувача.
     ORDER BY created_at DESC — останні зверху.
     """
-    conn = sqlite3.connect(DB_PATH)
-    cur = conn.cursor()
-    cur.execute(
+    decode = get_codec().decode
+    rows = get_storage().query(
         """
         SELECT
             id,
@@ -132,10 +275,229 @@ def get_user_reports(user_id: int) -> List[Tuple]:
             created_at
         FROM reports
         WHERE user_id = ?
-        ORDER BY created_at DESC
+        ORDER BY created_at DESC, id DESC
         """,
         (user_id,),
     )
-    rows = cur.fetchall()
-    conn.close()
-    return rows
\ No newline at end of file
+    # Колонки 3..8 — стиснені поля (PAYLOAD_COLUMNS)
+    return [row[:3] + tuple(decode(v) for v in row[3:9]) + row[9:] for row in rows]
+
+
+# ======================================================
+#     ПАГІНАЦІЯ + ПРОЕКЦІЯ (без повного читання історії)
+# ======================================================
+
+# Колонки, які дозволено запитувати (імена йдуть прямо в SQL)
+REPORT_COLUMNS = (
+    "id",
+    "user_id",
+    "image_path",
+    "face_data",
+    "emotion_data",
+    "stress_data",
+    "personality_data",
+    "professional_data",
+    "full_report",
+    "created_at",
+    *METRIC_COLUMNS,
+)
+
+# Курсор сторінки: (created_at, id) останнього рядка попередньої сторінки
+Cursor = Tuple[str, int]
+
+
+def _projection(columns: Optional[Sequence[str]]) -> List[str]:
+    if not columns:
+        return list(REPORT_COLUMNS)
+
+    unknown = [c for c in columns if c not in REPORT_COLUMNS]
+    if unknown:
+        raise ValueError(f"Unknown report columns: {unknown}")
+
+    # id і created_at потрібні для курсора
+    cols = ["id", "created_at"]
+    cols += [c for c in columns if c not in cols]
+    return cols
+
+
+def get_reports_page(
+    user_id: int,
+    limit: int = 20,
+    columns: Optional[Sequence[str]] = None,
+    cursor: Optional[Cursor] = None,
+) -> Tuple[List[Dict[str, Any]], Optional[Cursor]]:
+    """
+    Сторінка історії користувача, від новіших до старіших.
+
+    columns — які колонки читати (наприклад, лише emotion_data і stress_data,
+    без великого full_report). cursor — значення, повернуте попередньою
+    сторінкою; None — перша сторінка.
+
+    Keyset-пагінація по індексу (user_id, created_at): вартість не залежить
+    від довжини історії. Повертає (рядки як dict, курсор наступної сторінки).
+    """
+    limit = max(1, int(limit))
+    cols = _projection(columns)
+    sql = f"SELECT {', '.join(cols)} FROM reports WHERE user_id = ?"
+    params: List[Any] = [user_id]
+
+    if cursor is not None:
+        # Row value, а не OR: лише так SQLite бере межу created_at < ? з індексу
+        # (EXPLAIN QUERY PLAN: idx_reports_user_created (user_id=? AND created_at<?))
+        sql += " AND (created_at, id) < (?, ?)"
+        params += [cursor[0], cursor[1]]
+
+    sql += " ORDER BY created_at DESC, id DESC LIMIT ?"
+    params.append(limit)
+
+    rows = [dict(zip(cols, row)) for row in get_storage().query(sql, params)]
+
+    payload = [c for c in cols if c in PAYLOAD_COLUMNS]
+    if payload:
+        decode = get_codec().decode
+        for row in rows:
+            for c in payload:
+                row[c] = decode(row[c])
+
+    next_cursor = None
+    if len(rows) == limit:
+        next_cursor = (rows[-1]["created_at"], rows[-1]["id"])
+    return rows, next_cursor
+
+
+def get_latest_reports(
+    user_id: int,
+    limit: int = 1,
+    columns: Optional[Sequence[str]] = None,
+) -> List[Dict[str, Any]]:
+    """Останні `limit` звітів користувача (лише потрібні колонки)."""
+    rows, _ = get_reports_page(user_id, limit=limit, columns=columns)
+    return rows
+
+
+# ======================================================
+#           АНАЛІТИКА ПО ТИПІЗОВАНИХ КОЛОНКАХ
+# ======================================================
+def get_metric_history(user_id: int, limit: int = 30) -> List[Dict[str, Any]]:
+    """Останні `limit` значень метрик користувача — без читання JSON."""
+    return get_latest_reports(
+        user_id,
+        limit=limit,
+        columns=("dominant_emotion", "valence", "microstress_level", *BIG_FIVE, "radical_key"),
+    )
+
+
+def get_user_metric_summary(user_id: int) -> Dict[str, Any]:
+    """Середні / крайні значення по всій історії користувача — агрегат у SQL."""
+    row = get_storage().query_one(
+        f"""
+        SELECT
+            COUNT(*),
+            AVG(valence), MIN(valence), MAX(valence),
+            AVG(microstress_level), MIN(microstress_level), MAX(microstress_level),
+            {", ".join(f"AVG({t})" for t in BIG_FIVE)}
+        FROM reports
+        WHERE user_id = ?
+        """,
+        (user_id,),
+    )
+    keys = [
+        "reports",
+        "valence_avg", "valence_min", "valence_max",
+        "stress_avg", "stress_min", "stress_max",
+        *(f"{t}_avg" for t in BIG_FIVE),
+    ]
+    return dict(zip(keys, row))
+
+
+def get_radical_distribution() -> Dict[str, int]:
+    """Скільки звітів припадає на кожен радикал (по всіх користувачах)."""
+    rows = get_storage().query(
+        "SELECT radical_key, COUNT(*) FROM reports GROUP BY radical_key ORDER BY COUNT(*) DESC"
+    )
+    return {key or "unknown": count for key, count in rows}
+
+
+# ======================================================
+#     УЩІЛЬНЕННЯ СТАРИХ ЗАПИСІВ
+# ======================================================
+def _stored_size(value: Any) -> int:
+    if isinstance(value, str):
+        return len(value.encode("utf-8"))
+    return len(value) if value is not None else 0
+
+
+def compact_reports(batch_size: int = 200, vacuum: bool = True) -> Dict[str, int]:
+    """
+    Перепаковує рядки, збережені до payload_codec (звичайний текст),
+    у стиснений формат і звільняє місце (VACUUM). Безпечно запускати повторно.
+    """
+    storage = get_storage()
+    codec = get_codec()
+    cols = ", ".join(PAYLOAD_COLUMNS)
+    assignments = ", ".join(f"{c} = ?" for c in PAYLOAD_COLUMNS)
+
+    stats = {"rows": 0, "bytes_before": 0, "bytes_after": 0}
+    last_id = 0
+    while True:
+        rows = storage.query(
+            f"SELECT id, {cols} FROM reports WHERE id > ? ORDER BY id LIMIT ?",
+            (last_id, batch_size),
+        )
+        if not rows:
+            break
+
+        updates = []
+        for row_id, *values in rows:
+            # Вже стиснені поля лишаються як є; дрібні — теж (encode їх не чіпає)
+            packed = [v if not isinstance(v, str) else codec.encode(v) for v in values]
+            if packed == values:
+                continue
+            stats["rows"] += 1
+            stats["bytes_before"] += sum(_stored_size(v) for v in values)
+            stats["bytes_after"] += sum(_stored_size(v) for v in packed)
+            updates.append(packed + [row_id])
+
+        if updates:
+            storage.executemany(f"UPDATE reports SET {assignments} WHERE id = ?", updates)
+        last_id = rows[-1][0]
+
+    if vacuum and stats["rows"]:
+        storage.executescript("VACUUM;")
+    return stats
+
+
+# ======================================================
+#       ASYNC-ФАСАД (не блокує event loop бота)
+# ======================================================
+async def asave_report(*args, **kwargs):
+    return await get_storage().run(lambda: save_report(*args, **kwargs))
+
+
+async def aget_user_reports(user_id: int) -> List[Tuple]:
+    return await get_storage().run(get_user_reports, user_id)
+
+
+async def aget_reports_page(user_id: int, limit: int = 20,
+                            columns: Optional[Sequence[str]] = None,
+                            cursor: Optional[Cursor] = None):
+    return await get_storage().run(get_reports_page, user_id, limit, columns, cursor)
+
+
+async def aget_latest_reports(user_id: int, limit: int = 1,
+                              columns: Optional[Sequence[str]] = None) -> List[Dict[str, Any]]:
+    return await get_storage().run(get_latest_reports, user_id, limit, columns)
+
+
+async def aget_metric_history(user_id: int, limit: int = 30) -> List[Dict[str, Any]]:
+    return await get_storage().run(get_metric_history, user_id, limit)
+
+
+if __name__ == "__main__":
+    import sys
+
+    if sys.argv[1:] == ["compact"]:
+        init_db()
+        print(f"[database] Compacted: {compact_reports()}")
+    else:
+        print("Usage: python database.py compact")
@@ -0,0 +1,356 @@
+# job_queue.py
+"""
+Надійна черга задач аналізу в тій самій SQLite-базі (таблиця jobs).
+
+Бот у режимі ANALYSIS_MODE=queue лише кладе задачу і відповідає
+користувачу, а аналізом займаються окремі процеси worker.py — на інших
+ядрах або в інших контейнерах зі спільним томом для БД. Задача
+переживає перезапуск будь-якого з процесів.
+
+Семантика:
+    enqueue — нова задача (status=queued);
+    claim   — воркер атомарно (BEGIN IMMEDIATE) забирає найстарішу видиму
+              задачу: status=running, visible_at = now + visibility_timeout;
+    extend  — heartbeat: воркер продовжує видимість довгої задачі;
+    ack     — успіх (status=done);
+    nack    — помилка: повтор після затримки або failed після max_attempts;
+    release — воркер не зміг взятися за задачу (пул зайнятий): повернути
+              в чергу із затримкою, спроба не рахується.
+
+Якщо воркер впав, його задача стає видимою знову після visibility
+timeout і дістається іншому воркеру (at-least-once). Якщо це була остання
+спроба, claim переводить задачу у failed; такі задачі (notified = 0)
+воркер забирає через take_failed і повідомляє користувача.
+"""
+
+import json
+import time
+import socket
+import os
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Sequence
+
+from database import get_storage
+from storage import Storage
+
+JOB_VISIBILITY_TIMEOUT = float(os.getenv("JOB_VISIBILITY_TIMEOUT", "120"))
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+JOB_RETRY_DELAY = float(os.getenv("JOB_RETRY_DELAY", "5"))
+
+
+@dataclass
+class Job:
+    id: int
+    kind: str
+    user_id: int
+    chat_id: int
+    payload: Dict[str, Any]
+    attempts: int
+    max_attempts: int
+    created_at: float
+
+
+def default_worker_id() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+class JobQueue:
+    def __init__(self, storage: Storage):
+        self.storage = storage
+
+    def ensure_schema(self):
+        self.storage.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS jobs (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                kind TEXT NOT NULL,
+                user_id INTEGER,
+                chat_id INTEGER,
+                payload TEXT NOT NULL,
+                status TEXT NOT NULL DEFAULT 'queued',
+                attempts INTEGER NOT NULL DEFAULT 0,
+                max_attempts INTEGER NOT NULL,
+                visible_at REAL NOT NULL,
+                claimed_by TEXT,
+                error TEXT,
+                result_id INTEGER,
+                notified INTEGER NOT NULL DEFAULT 0,
+                created_at REAL NOT NULL,
+                updated_at REAL NOT NULL
+            );
+
+            -- claim: найстаріша видима задача серед queued / running
+            CREATE INDEX IF NOT EXISTS idx_jobs_status_visible
+                ON jobs (status, visible_at, id);
+
+            CREATE INDEX IF NOT EXISTS idx_jobs_user_status
+                ON jobs (user_id, status);
+            """
+        )
+        self._migrate_notified()
+
+    def _migrate_notified(self):
+        """Колонка notified у таблиці зі старої версії; старі failed вважаються повідомленими."""
+        existing = {row[1] for row in self.storage.query("PRAGMA table_info(jobs)")}
+        if "notified" in existing:
+            return
+        self.storage.execute("ALTER TABLE jobs ADD COLUMN notified INTEGER NOT NULL DEFAULT 0")
+        self.storage.execute("UPDATE jobs SET notified = 1 WHERE status IN ('done', 'failed')")
+
+    # ---------------------------------------------------
+    # Продюсер
+    # ---------------------------------------------------
+    def enqueue(self, kind: str, payload: Dict[str, Any], user_id: int, chat_id: int,
+                max_attempts: int = JOB_MAX_ATTEMPTS, delay: float = 0.0) -> int:
+        now = time.time()
+        return self.storage.execute(
+            """
+            INSERT INTO jobs (kind, user_id, chat_id, payload, max_attempts,
+                              visible_at, created_at, updated_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            """,
+            (kind, user_id, chat_id, json.dumps(payload, ensure_ascii=False),
+             max(1, max_attempts), now + delay, now, now),
+        )
+
+    def pending_for_user(self, user_id: int) -> int:
+        row = self.storage.query_one(
+            "SELECT COUNT(*) FROM jobs WHERE user_id = ? AND status IN ('queued', 'running')",
+            (user_id,),
+        )
+        return row[0] if row else 0
+
+    def position(self, job_id: int) -> int:
+        """Скільки queued-задач (включно з цією) стоїть до неї в черзі."""
+        row = self.storage.query_one(
+            "SELECT COUNT(*) FROM jobs WHERE status = 'queued' AND id <= ?",
+            (job_id,),
+        )
+        return row[0] if row else 0
+
+    def pending(self) -> int:
+        """Задачі, які ще не завершені (queued + running)."""
+        row = self.storage.query_one(
+            "SELECT COUNT(*) FROM jobs WHERE status IN ('queued', 'running')"
+        )
+        return row[0] if row else 0
+
+    # ---------------------------------------------------
+    # Воркер
+    # ---------------------------------------------------
+    def claim(self, worker_id: str, visibility_timeout: float = JOB_VISIBILITY_TIMEOUT,
+              kinds: Optional[Sequence[str]] = None) -> Optional[Job]:
+        """
+        Забирає одну задачу або None. Running-задачі з простроченою
+        видимістю (воркер помер) теж беруться — це і є повтор.
+        """
+        now = time.time()
+        kind_sql = ""
+        params: List[Any] = [now]
+        if kinds:
+            kind_sql = f" AND kind IN ({', '.join('?' for _ in kinds)})"
+            params += list(kinds)
+
+        with self.storage.transaction() as conn:
+            # Прострочені задачі, які вичерпали спроби, — у failed
+            conn.execute(
+                """
+                UPDATE jobs SET status = 'failed', updated_at = ?,
+                       error = COALESCE(error, 'visibility timeout')
+                WHERE status = 'running' AND visible_at <= ? AND attempts >= max_attempts
+                """,
+                (now, now),
+            )
+
+            row = conn.execute(
+                f"""
+                SELECT id, kind, user_id, chat_id, payload, attempts, max_attempts, created_at
+                FROM jobs
+                WHERE status IN ('queued', 'running') AND visible_at <= ?{kind_sql}
+                ORDER BY id
+                LIMIT 1
+                """,
+                params,
+            ).fetchone()
+            if row is None:
+                return None
+
+            conn.execute(
+                """
+                UPDATE jobs
+                SET status = 'running', attempts = attempts + 1, claimed_by = ?,
+                    visible_at = ?, updated_at = ?
+                WHERE id = ?
+                """,
+                (worker_id, now + visibility_timeout, now, row[0]),
+            )
+
+        return Job(
+            id=row[0], kind=row[1], user_id=row[2], chat_id=row[3],
+            payload=json.loads(row[4]), attempts=row[5] + 1, max_attempts=row[6],
+            created_at=row[7],
+        )
+
+    def extend(self, job_id: int, worker_id: str,
+               visibility_timeout: float = JOB_VISIBILITY_TIMEOUT) -> bool:
+        """Heartbeat. False — задачу вже перехопив інший воркер."""
+        now = time.time()
+        with self.storage.transaction() as conn:
+            cur = conn.execute(
+                """
+                UPDATE jobs SET visible_at = ?, updated_at = ?
+                WHERE id = ? AND claimed_by = ? AND status = 'running'
+                """,
+                (now + visibility_timeout, now, job_id, worker_id),
+            )
+            return cur.rowcount == 1
+
+    def ack(self, job_id: int, worker_id: str, result_id: Optional[int] = None) -> bool:
+        now = time.time()
+        with self.storage.transaction() as conn:
+            cur = conn.execute(
+                """
+                UPDATE jobs SET status = 'done', result_id = ?, error = NULL, updated_at = ?
+                WHERE id = ? AND claimed_by = ? AND status = 'running'
+                """,
+                (result_id, now, job_id, worker_id),
+            )
+            return cur.rowcount == 1
+
+    def nack(self, job_id: int, worker_id: str, error: str,
+             retry_delay: float = JOB_RETRY_DELAY) -> str:
+        """Повертає новий статус задачі: queued (буде повтор) або failed."""
+        now = time.time()
+        with self.storage.transaction() as conn:
+            row = conn.execute(
+                """
+                SELECT attempts, max_attempts FROM jobs
+                WHERE id = ? AND claimed_by = ? AND status = 'running'
+                """,
+                (job_id, worker_id),
+            ).fetchone()
+            if row is None:
+                return "lost"
+
+            # failed з nack воркер повідомляє сам — take_failed її не бере
+            status = "failed" if row[0] >= row[1] else "queued"
+            conn.execute(
+                """
+                UPDATE jobs SET status = ?, error = ?, visible_at = ?, updated_at = ?,
+                       notified = ?
+                WHERE id = ? AND claimed_by = ? AND status = 'running'
+                """,
+                (status, error[:2000], now + retry_delay, now, int(status == "failed"),
+                 job_id, worker_id),
+            )
+        return status
+
+    def take_failed(self, limit: int = 20) -> List[Job]:
+        """
+        Задачі, що стали failed без nack (воркер помер на останній спробі),
+        і про які користувач ще не знає. Позначаються notified атомарно,
+        тож кожну повідомляє рівно один воркер.
+        """
+        with self.storage.transaction() as conn:
+            rows = conn.execute(
+                """
+                SELECT id, kind, user_id, chat_id, payload, attempts, max_attempts, created_at
+                FROM jobs
+                WHERE status = 'failed' AND notified = 0
+                ORDER BY id
+                LIMIT ?
+                """,
+                (limit,),
+            ).fetchall()
+            if rows:
+                conn.execute(
+                    f"UPDATE jobs SET notified = 1 WHERE id IN ({', '.join('?' for _ in rows)})",
+                    [row[0] for row in rows],
+                )
+
+        return [
+            Job(id=row[0], kind=row[1], user_id=row[2], chat_id=row[3],
+                payload=json.loads(row[4]), attempts=row[5], max_attempts=row[6],
+                created_at=row[7])
+            for row in rows
+        ]
+
+    def release(self, job_id: int, worker_id: str, delay: float = JOB_RETRY_DELAY) -> bool:
+        """Повертає задачу в чергу без витрати спроби. False — задача вже не наша."""
+        now = time.time()
+        with self.storage.transaction() as conn:
+            cur = conn.execute(
+                """
+                UPDATE jobs
+                SET status = 'queued', attempts = MAX(0, attempts - 1), claimed_by = NULL,
+                    visible_at = ?, updated_at = ?
+                WHERE id = ? AND claimed_by = ? AND status = 'running'
+                """,
+                (now + delay, now, job_id, worker_id),
+            )
+            return cur.rowcount == 1
+
+    # ---------------------------------------------------
+    # Обслуговування
+    # ---------------------------------------------------
+    def stats(self) -> Dict[str, int]:
+        rows = self.storage.query("SELECT status, COUNT(*) FROM jobs GROUP BY status")
+        return {status: count for status, count in rows}
+
+    def purge(self, older_than_s: float = 7 * 86400) -> int:
+        """Видаляє завершені (done / failed) задачі, старші за older_than_s."""
+        with self.storage.transaction() as conn:
+            return conn.execute(
+                "DELETE FROM jobs WHERE status IN ('done', 'failed') AND updated_at < ?",
+                (time.time() - older_than_s,),
+            ).rowcount
+
+    # ---------------------------------------------------
+    # Async-фасад
+    # ---------------------------------------------------
+    async def aenqueue(self, kind: str, payload: Dict[str, Any], user_id: int, chat_id: int,
+                       **kwargs: Any) -> int:
+        return await self.storage.run(lambda: self.enqueue(kind, payload, user_id, chat_id, **kwargs))
+
+    async def apending_for_user(self, user_id: int) -> int:
+        return await self.storage.run(self.pending_for_user, user_id)
+
+    async def aposition(self, job_id: int) -> int:
+        return await self.storage.run(self.position, job_id)
+
+    async def aclaim(self, worker_id: str, visibility_timeout: float = JOB_VISIBILITY_TIMEOUT,
+                     kinds: Optional[Sequence[str]] = None) -> Optional[Job]:
+        return await self.storage.run(self.claim, worker_id, visibility_timeout, kinds)
+
+    async def aextend(self, job_id: int, worker_id: str,
+                      visibility_timeout: float = JOB_VISIBILITY_TIMEOUT) -> bool:
+        return await self.storage.run(self.extend, job_id, worker_id, visibility_timeout)
+
+    async def aack(self, job_id: int, worker_id: str, result_id: Optional[int] = None) -> bool:
+        return await self.storage.run(self.ack, job_id, worker_id, result_id)
+
+    async def anack(self, job_id: int, worker_id: str, error: str,
+                    retry_delay: float = JOB_RETRY_DELAY) -> str:
+        return await self.storage.run(self.nack, job_id, worker_id, error, retry_delay)
+
+    async def atake_failed(self, limit: int = 20) -> List[Job]:
+        return await self.storage.run(self.take_failed, limit)
+
+    async def arelease(self, job_id: int, worker_id: str, delay: float = JOB_RETRY_DELAY) -> bool:
+        return await self.storage.run(self.release, job_id, worker_id, delay)
+
+    async def astats(self) -> Dict[str, int]:
+        return await self.storage.run(self.stats)
+
+
+_queue: Optional[JobQueue] = None
+
+
+def get_job_queue() -> JobQueue:
+    """Черга над спільним Storage процесу (схема створюється при першому виклику)."""
+    global _queue
+    storage = get_storage()
+    if _queue is None or _queue.storage is not storage:
+        _queue = JobQueue(storage)
+        _queue.ensure_schema()
+    return _queue
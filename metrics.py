@@ -0,0 +1,298 @@
+# metrics.py
+"""
+Легкі метрики процесу бота у форматі Prometheus (text exposition 0.0.4).
+
+Без залежностей, крім aiohttp (вже є разом з aiogram):
+
+    Counter   — лічильники (фото, відмови, «обличчя не знайдено», ...);
+    Histogram — затримки етапів (download, analysis, save, send та
+                внутрішні етапи конвеєра: detect, face, stress, ...);
+    Gauge     — поточні значення (глибина черги аналізу, прогрів моделей),
+                можуть рахуватись функцією в момент скрейпу.
+
+Ендпоінт: http://METRICS_HOST:METRICS_PORT/metrics
+Налаштування:
+    METRICS_PORT — порт HTTP (за замовчуванням 9108; 0 — вимкнено)
+    METRICS_HOST — адреса (за замовчуванням 127.0.0.1 — лише локальний скрейпер)
+"""
+
+import os
+import time
+import bisect
+import threading
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+METRICS_PORT = int(os.getenv("METRICS_PORT", "9108"))
+METRICS_HOST = os.getenv("METRICS_HOST", "127.0.0.1")
+
+# Від мілісекунд (кеш, SQLite) до десятків секунд (DeepFace на холодну)
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+LabelValues = Tuple[str, ...]
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+# ======================================================
+#                     МЕТРИКИ
+# ======================================================
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help_text: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.help = help_text
+        self.label_names = tuple(labels)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> LabelValues:
+        if set(labels) != set(self.label_names):
+            raise ValueError(f"{self.name}: expected labels {self.label_names}, got {tuple(labels)}")
+        return tuple(str(labels[n]) for n in self.label_names)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(self._samples())
+        return lines
+
+    def _samples(self) -> List[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, help_text: str, labels: Sequence[str] = ()):
+        super().__init__(name, help_text, labels)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: str):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels: str) -> float:
+        return self._values.get(self._key(labels), 0.0)
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return [
+            f"{self.name}{_format_labels(self.label_names, key)} {_format_value(v)}"
+            for key, v in items
+        ]
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def __init__(self, name: str, help_text: str, labels: Sequence[str] = (),
+                 fn: Optional[Callable[[], Any]] = None):
+        super().__init__(name, help_text, labels)
+        self._values: Dict[LabelValues, float] = {}
+        self._fn = fn
+
+    def set(self, value: float, **labels: str):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = float(value)
+
+    def set_function(self, fn: Callable[[], Any]):
+        """
+        Значення рахується в момент скрейпу. Для gauge з мітками fn
+        повертає {значення міток (або кортеж значень): число}.
+        """
+        self._fn = fn
+
+    def _samples(self) -> List[str]:
+        if self._fn is not None:
+            try:
+                if not self.label_names:
+                    return [f"{self.name} {_format_value(float(self._fn()))}"]
+                items = sorted(
+                    (tuple(str(v) for v in (k if isinstance(k, tuple) else (k,))), float(value))
+                    for k, value in self._fn().items()
+                )
+                return [
+                    f"{self.name}{_format_labels(self.label_names, key)} {_format_value(v)}"
+                    for key, v in items
+                ]
+            except Exception as e:
+                print(f"[metrics] Gauge {self.name} failed: {e}")
+                return []
+        with self._lock:
+            items = sorted(self._values.items())
+        return [
+            f"{self.name}{_format_labels(self.label_names, key)} {_format_value(v)}"
+            for key, v in items
+        ]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help_text: str, labels: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, help_text, labels)
+        self.buckets = tuple(sorted(buckets))
+        # мітки -> (лічильники по бакетах, сума, кількість)
+        self._values: Dict[LabelValues, Tuple[List[int], float, int]] = {}
+
+    def observe(self, value: float, **labels: str):
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            counts, total, count = self._values.get(key) or ([0] * len(self.buckets), 0.0, 0)
+            if index < len(counts):
+                counts[index] += 1
+            self._values[key] = (counts, total + value, count + 1)
+
+    @contextmanager
+    def time(self, **labels: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            items = sorted((k, (list(c), s, n)) for k, (c, s, n) in self._values.items())
+
+        lines = []
+        for key, (counts, total, count) in items:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                le = _format_labels(self.label_names, key, f'le="{_format_value(bound)}"')
+                lines.append(f"{self.name}_bucket{le} {cumulative}")
+            le = _format_labels(self.label_names, key, 'le="+Inf"')
+            lines.append(f"{self.name}_bucket{le} {count}")
+
+            plain = _format_labels(self.label_names, key)
+            lines.append(f"{self.name}_sum{plain} {_format_value(total)}")
+            lines.append(f"{self.name}_count{plain} {count}")
+        return lines
+
+
+# ======================================================
+#                     РЕЄСТР
+# ======================================================
+class Registry:
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def _register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                if type(existing) is not type(metric):
+                    raise ValueError(f"Metric {metric.name} already registered as {existing.kind}")
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def counter(self, name: str, help_text: str, labels: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, help_text, labels))
+
+    def gauge(self, name: str, help_text: str, labels: Sequence[str] = (),
+              fn: Optional[Callable[[], Any]] = None) -> Gauge:
+        gauge = self._register(Gauge(name, help_text, labels))
+        if fn is not None:
+            gauge.set_function(fn)
+        return gauge
+
+    def histogram(self, name: str, help_text: str, labels: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, help_text, labels, buckets))
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines: List[str] = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+
+# ======================================================
+#              МЕТРИКИ БОТА (спільні імена)
+# ======================================================
+PHOTOS_TOTAL = REGISTRY.counter(
+    "radical_photos_total",
+    "Оброблені фото за результатом (ok, cached, no_face, busy, error)",
+    labels=("outcome",),
+)
+STAGE_SECONDS = REGISTRY.histogram(
+    "radical_stage_seconds",
+    "Тривалість етапів обробки фото в handle_photo",
+    labels=("stage",),
+)
+PIPELINE_STAGE_SECONDS = REGISTRY.histogram(
+    "radical_pipeline_stage_seconds",
+    "Тривалість етапів конвеєра аналізу (всередині воркера)",
+    labels=("stage",),
+)
+
+
+def timed(stage: str, histogram: Histogram = STAGE_SECONDS):
+    """with timed("download"): ... — записує тривалість етапу в гістограму."""
+    return histogram.time(stage=stage)
+
+
+def observe_pipeline_timings(timings: Optional[Dict[str, float]]):
+    """Таймінги, які конвеєр повернув у result["timings"] (працює і з process-pool)."""
+    for stage, seconds in (timings or {}).items():
+        PIPELINE_STAGE_SECONDS.observe(seconds, stage=stage)
+
+
+# ======================================================
+#                  HTTP-ЕНДПОІНТ
+# ======================================================
+async def start_metrics_server(port: int = METRICS_PORT, host: str = METRICS_HOST,
+                               registry: Registry = REGISTRY):
+    """
+    Піднімає /metrics на aiohttp у поточному event loop.
+    Повертає AppRunner (для cleanup) або None, якщо порт = 0.
+    """
+    if not port:
+        return None
+
+    from aiohttp import web
+
+    async def handle(_request):
+        return web.Response(
+            text=registry.render(),
+            headers={"Content-Type": "text/plain; version=0.0.4; charset=utf-8"},
+        )
+
+    app = web.Application()
+    app.router.add_get("/metrics", handle)
+
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, host, port).start()
+    print(f"[metrics] Serving on http://{host}:{port}/metrics")
+    return runner
@@ -0,0 +1,215 @@
+# payload_codec.py
+"""
+Стиснене зберігання звітів з дедуплікацією статичного тексту.
+
+Кожен рядок reports містить повний full_report і пʼять JSON-блобів, а
+значна частина цього тексту однакова в усіх рядках: описи RADICALS,
+scientific_notes і шаблонні блоки фізіогноміки, формулювання
+professional_profile, каркас звіту.
+
+Увесь цей статичний текст збирається в «словник» (zlib preset dictionary),
+який зберігається в БД ОДИН раз (таблиця payload_dicts), а кожне поле
+стискається zlib з цим словником і посилається на нього за id. Повтори
+статичного тексту в рядку кодуються як короткі посилання на словник.
+
+Формат поля:
+    str                         — старий / нестиснений запис (як раніше)
+    bytes: b"PZ" + id(4, BE) + zlib(data, zdict=dictionary[id])
+
+Читання прозоре: decode() повертає той самий str, що був записаний.
+Якщо статичні тексти в коді зміняться, зʼявиться новий словник з новим
+id, а старі рядки продовжать читатись зі своїм.
+"""
+
+import zlib
+import struct
+import hashlib
+import threading
+from typing import Any, Dict, List, Optional, Union
+
+from serialization import dumps
+from storage import Storage
+
+MAGIC = b"PZ"
+_HEADER = struct.Struct(">2sI")
+
+# zlib використовує лише останні 32 КБ словника
+ZDICT_MAX_BYTES = 32 * 1024
+
+# Дрібні поля (на кшталт stress_data) стискати немає сенсу
+MIN_COMPRESS_BYTES = 96
+
+
+# ======================================================
+#          СЛОВНИК СТАТИЧНОГО ТЕКСТУ
+# ======================================================
+def _static_segments() -> List[str]:
+    """
+    Тексти, які повторюються між звітами. Порядок важливий: zlib найдешевше
+    кодує посилання на кінець словника, тому найчастіші тексти — в кінці.
+    """
+    from analyzer.radicals import RADICALS
+    from analyzer.physiognomy_model import build_physiognomy_profile
+    from analyzer.professional_profile import build_professional_profile
+    from analyzer.report_builder import build_full_report
+
+    segments: List[str] = []
+
+    # Фізіогноміка: перебираємо гілки (вік / стать / емоція)
+    physio_samples = []
+    for age in (None, 16, 28, 45, 70):
+        for gender in (None, "Woman", "Man", ""):
+            for emotion in ("angry", "happy", "neutral", "contempt"):
+                physio_samples.append(build_physiognomy_profile(
+                    {"age": age, "gender": gender, "dominant_emotion": emotion}
+                ))
+
+    # Професійний профіль: крайні значення Big Five для кожного радикала
+    professional_samples = []
+    for radical in RADICALS.values():
+        for level in (30, 70):
+            scores = {t: level for t in (
+                "openness", "conscientiousness", "extraversion", "agreeableness", "neuroticism",
+            )}
+            professional_samples.append(build_professional_profile(
+                {"big_five_scores": scores, "radical": radical["name"]}
+            ))
+
+    # Каркас звіту (заголовки, розділювачі, фіксовані фрази)
+    radical = RADICALS["mixed"]
+    skeleton = build_full_report(
+        {"age": 30, "gender": "Man"},
+        {"dominant_emotion": "neutral"},
+        {"microstress_level": 50},
+        {
+            "big_five_scores": {t: 50 for t in (
+                "openness", "conscientiousness", "extraversion", "agreeableness", "neuroticism",
+            )},
+            "radical": radical["name"],
+            "radical_description": "",
+            "radical_short": radical["short"],
+            "radical_key": "mixed",
+        },
+        professional_samples[0],
+        physio_samples[0],
+    )
+
+    for prof in professional_samples:
+        for key in ("recommended_roles", "work_style", "risks", "communication_style"):
+            segments.extend(prof[key])
+    for physio in physio_samples:
+        segments.extend(
+            v for v in physio.values() if isinstance(v, str)
+        )
+        segments.extend(physio["dominant_features"])
+    segments.append(skeleton)
+    for radical in RADICALS.values():
+        segments.extend([radical["name"], radical["short"], radical["description"]])
+
+    # Унікальні, зі збереженням порядку (останнє входження — найближче до кінця)
+    seen = set()
+    unique = []
+    for segment in reversed(segments):
+        if segment and segment not in seen:
+            seen.add(segment)
+            unique.append(segment)
+    return list(reversed(unique))
+
+
+def build_static_dictionary() -> bytes:
+    data = "\n".join(_static_segments()).encode("utf-8")
+    return data[-ZDICT_MAX_BYTES:]
+
+
+# ======================================================
+#                    КОДЕК
+# ======================================================
+class PayloadCodec:
+    """Стискає / розпаковує поля звітів; словники живуть у тій самій БД."""
+
+    def __init__(self, storage: Storage):
+        self.storage = storage
+        self._lock = threading.Lock()
+        self._dicts: Dict[int, bytes] = {}
+        self._current: Optional[int] = None
+
+    def ensure_schema(self):
+        self.storage.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS payload_dicts (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                digest TEXT UNIQUE NOT NULL,
+                content BLOB NOT NULL,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            );
+            """
+        )
+
+    # ---------------------------------------------------
+    # Словники
+    # ---------------------------------------------------
+    def _current_dict_id(self) -> int:
+        if self._current is None:
+            with self._lock:
+                if self._current is None:
+                    content = build_static_dictionary()
+                    digest = hashlib.sha256(content).hexdigest()
+                    self.storage.execute(
+                        "INSERT OR IGNORE INTO payload_dicts (digest, content) VALUES (?, ?)",
+                        (digest, content),
+                    )
+                    row = self.storage.query_one(
+                        "SELECT id FROM payload_dicts WHERE digest = ?", (digest,)
+                    )
+                    self._dicts[row[0]] = content
+                    self._current = row[0]
+        return self._current
+
+    def _dict(self, dict_id: int) -> bytes:
+        content = self._dicts.get(dict_id)
+        if content is None:
+            row = self.storage.query_one(
+                "SELECT content FROM payload_dicts WHERE id = ?", (dict_id,)
+            )
+            if row is None:
+                raise ValueError(f"Unknown payload dictionary id {dict_id}")
+            content = self._dicts[dict_id] = bytes(row[0])
+        return content
+
+    # ---------------------------------------------------
+    # Кодування
+    # ---------------------------------------------------
+    def encode(self, text: Optional[str]) -> Union[str, bytes, None]:
+        if text is None:
+            return None
+
+        raw = text.encode("utf-8")
+        if len(raw) < MIN_COMPRESS_BYTES:
+            return text
+
+        dict_id = self._current_dict_id()
+        compressor = zlib.compressobj(level=9, zdict=self._dict(dict_id))
+        packed = _HEADER.pack(MAGIC, dict_id) + compressor.compress(raw) + compressor.flush()
+
+        # Якщо стиснення не виграло — зберігаємо як є
+        return packed if len(packed) < len(raw) else text
+
+    def decode(self, value: Union[str, bytes, memoryview, None]) -> Optional[str]:
+        if value is None or isinstance(value, str):
+            return value
+
+        value = bytes(value)
+        if len(value) < _HEADER.size or value[:2] != MAGIC:
+            return value.decode("utf-8")
+
+        _, dict_id = _HEADER.unpack_from(value)
+        decompressor = zlib.decompressobj(zdict=self._dict(dict_id))
+        raw = decompressor.decompress(value[_HEADER.size:]) + decompressor.flush()
+        return raw.decode("utf-8")
+
+    def encode_json(self, obj: Any) -> Union[str, bytes]:
+        return self.encode(dumps(obj))
+
+    @staticmethod
+    def is_encoded(value: Any) -> bool:
+        return isinstance(value, (bytes, memoryview)) and bytes(value[:2]) == MAGIC
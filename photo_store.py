@@ -0,0 +1,97 @@
+# photo_store.py
+"""
+Зберігання оригіналів фото — опціональний, асинхронний побічний ефект.
+
+Аналіз працює з байтами, завантаженими в памʼять, тож диск на критичному
+шляху більше не потрібен. Якщо оригінали все ж треба зберігати:
+
+    PHOTO_PERSIST=1          — писати фото у PHOTO_DIR (за замовчуванням вимкнено)
+    PHOTO_DIR=photos         — каталог для оригіналів
+    PHOTO_RETENTION_DAYS=7   — скільки днів зберігати (0 — без обмеження)
+"""
+
+import os
+import time
+import asyncio
+from typing import Optional, Set
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+PHOTO_PERSIST = os.getenv("PHOTO_PERSIST", "0").lower() in ("1", "true", "yes")
+PHOTO_DIR = os.getenv("PHOTO_DIR", os.path.join(BASE_DIR, "photos"))
+
+try:
+    PHOTO_RETENTION_DAYS = float(os.getenv("PHOTO_RETENTION_DAYS", "7"))
+except ValueError:
+    PHOTO_RETENTION_DAYS = 7.0
+
+# Посилання на фонові задачі, щоб їх не зібрав GC до завершення
+_pending_writes: Set[asyncio.Task] = set()
+
+
+def photo_path(user_id: int, file_id: str) -> str:
+    return os.path.join(PHOTO_DIR, f"{user_id}_{file_id}.jpg")
+
+
+def _write_file(path: str, data: bytes):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+async def _persist(path: str, data: bytes):
+    try:
+        await asyncio.to_thread(_write_file, path, data)
+    except OSError as e:
+        print(f"[photo_store] Failed to save {path}: {e}")
+
+
+def schedule_persist(data: bytes, user_id: int, file_id: str) -> Optional[str]:
+    """
+    Запускає фоновий запис оригіналу і одразу повертає шлях,
+    під яким він буде збережений. Якщо зберігання вимкнене — None.
+    """
+    if not PHOTO_PERSIST:
+        return None
+
+    path = photo_path(user_id, file_id)
+    task = asyncio.create_task(_persist(path, data))
+    _pending_writes.add(task)
+    task.add_done_callback(_pending_writes.discard)
+    return path
+
+
+async def flush_pending():
+    """Дочікується незавершених записів (при зупинці бота)."""
+    if _pending_writes:
+        await asyncio.gather(*list(_pending_writes), return_exceptions=True)
+
+
+def cleanup_expired(retention_days: float = PHOTO_RETENTION_DAYS) -> int:
+    """Видаляє фото, старші за retention_days. Повертає кількість видалених."""
+    if retention_days <= 0 or not os.path.isdir(PHOTO_DIR):
+        return 0
+
+    cutoff = time.time() - retention_days * 86400
+    removed = 0
+
+    for entry in os.scandir(PHOTO_DIR):
+        try:
+            if entry.is_file() and entry.stat().st_mtime < cutoff:
+                os.remove(entry.path)
+                removed += 1
+        except OSError:
+            continue
+
+    return removed
+
+
+async def retention_loop(interval_sec: float = 3600):
+    """Періодично прибирає застарілі фото, не блокуючи event loop."""
+    while True:
+        removed = await asyncio.to_thread(cleanup_expired)
+        if removed:
+            print(f"[photo_store] Removed {removed} expired photos.")
+        await asyncio.sleep(interval_sec)
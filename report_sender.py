@@ -0,0 +1,107 @@
+# report_sender.py
+"""
+Збереження результату аналізу і надсилання звіту користувачу.
+
+Спільне для двох шляхів:
+    bot.py    — ANALYSIS_MODE=inline: аналіз у процесі бота;
+    worker.py — ANALYSIS_MODE=queue: аналіз в окремому процесі з job_queue,
+                результат надсилається через Bot API від імені того ж бота.
+"""
+
+from typing import Any, Dict, Optional
+
+from aiogram import Bot
+
+from analyzer.radicals import RADICALS
+from database import asave_report
+from metrics import timed
+
+# Telegram обмежує повідомлення 4096 символами
+REPORT_CHUNK = 3500
+
+NO_FACE_TEXT = (
+    "⚠️ Не вдалося розпізнати обличчя.\n"
+    "Спробуй інше фото: анфас, без тіней, з хорошим світлом."
+)
+BUSY_TEXT = "⏳ Зараз аналізується забагато фото. Спробуй надіслати ще раз за хвилину."
+USER_QUEUE_FULL_TEXT = "⏳ У черзі вже багато твоїх фото. Дочекайся результатів і надішли решту."
+ERROR_TEXT = "❌ Не вдалося проаналізувати фото. Спробуй надіслати його ще раз або інше фото."
+SAVED_TEXT = "💾 Звіт збережено. Використай /compare, щоб побачити зміни."
+ALREADY_SAVED_TEXT = "💾 Це фото вже є в твоїй історії — повторно не зберігаю. /compare покаже зміни."
+
+# Хто отримав результат першим: result_cache зберігає його разом з результатом
+ORIGIN_USER_KEY = "origin_user"
+
+
+def already_saved(result: Dict[str, Any], user_id: int) -> bool:
+    """Результат з кешу, який уже записаний у reports цього користувача."""
+    return result.get(ORIGIN_USER_KEY) == user_id
+
+
+def with_origin(result: Dict[str, Any], user_id: int) -> Dict[str, Any]:
+    """Копія результату для кешу з позначкою, чия це історія."""
+    return {**result, ORIGIN_USER_KEY: user_id}
+
+
+async def save_result(user_id: int, img_path: str, result: Dict[str, Any]) -> Optional[int]:
+    """Пише результат у reports. Повертає id звіту."""
+    with timed("save"):
+        return await asave_report(
+            user_id,
+            img_path,
+            result["face_info"],
+            result["emotion_data"],
+            result["stress_data"],
+            result["personality"],
+            result["professional"],
+            result["full_report"],
+        )
+
+
+def short_block(result: Dict[str, Any]) -> str:
+    """Короткий блок: радикал + фізіогноміка."""
+    personality = result["personality"]
+    physiognomy = result["physiognomy"]
+
+    radical_code = personality.get("radical_key")
+    radical_info = RADICALS.get(radical_code)
+
+    block = ""
+
+    if radical_info:
+        block += (
+            f"🧩 Радикал: *{radical_info['name']}*\n"
+            f"{radical_info['short']}\n\n"
+        )
+
+    if isinstance(physiognomy, dict):
+        phys_short = physiognomy.get("short_summary", "")
+        block += f"👁 Фізіогноміка (коротко):\n{phys_short}\n"
+
+    return block
+
+
+async def send_report(bot: Bot, chat_id: int, result: Dict[str, Any], saved: bool = True):
+    """
+    Повний звіт частинами, короткий блок і підтвердження збереження.
+    saved=False — звіт з кешу, рядок у reports не додавався.
+    """
+    full_report = result["full_report"]
+
+    with timed("send"):
+        for i in range(0, len(full_report), REPORT_CHUNK):
+            await bot.send_message(chat_id, full_report[i:i + REPORT_CHUNK])
+
+        block = short_block(result)
+        if block:
+            await bot.send_message(chat_id, block, parse_mode="Markdown")
+
+        await bot.send_message(chat_id, SAVED_TEXT if saved else ALREADY_SAVED_TEXT)
+
+
+async def send_no_face(bot: Bot, chat_id: int):
+    await bot.send_message(chat_id, NO_FACE_TEXT)
+
+
+async def send_error(bot: Bot, chat_id: int):
+    await bot.send_message(chat_id, ERROR_TEXT)
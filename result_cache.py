@@ -0,0 +1,185 @@
+# result_cache.py
+"""
+Кеш результатів аналізу перед конвеєром.
+
+Користувачі часто надсилають те саме фото повторно або пересилають уже
+проаналізоване — тоді DeepFace + FaceMesh + RandomForest не потрібні.
+
+Ключі:
+    fu:<file_unique_id>  — стабільний ідентифікатор файлу в Telegram
+                           (перевіряється ще ДО завантаження фото);
+    sha:<sha256>         — хеш вмісту, якщо file_unique_id інший
+                           (наприклад, фото перезбережене / надіслане заново).
+
+Кожен ключ має префікс-простір імен — версію моделі й профіль дій
+DeepFace (analysis_fingerprint), тож після зміни FACE_ACTIONS_PROFILE або
+MODEL_VERSION старі записи (зокрема в SQLite) просто не знаходяться.
+
+Рівні:
+    1) памʼять — LRU на RESULT_CACHE_SIZE записів;
+    2) SQLite (опційно, RESULT_CACHE_DB=<шлях>) — переживає перезапуск.
+
+Результат — змінюваний dict, а обробники доповнюють його після кешу,
+тому get повертає копію, а put зберігає власну.
+"""
+
+import os
+import copy
+import time
+import asyncio
+import hashlib
+import sqlite3
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+from analyzer.fingerprint import analysis_fingerprint
+from serialization import dumps, loads
+
+RESULT_CACHE_SIZE = int(os.getenv("RESULT_CACHE_SIZE", "512"))
+RESULT_CACHE_DB = os.getenv("RESULT_CACHE_DB", "")
+
+
+def content_key(data: bytes) -> str:
+    return "sha:" + hashlib.sha256(data).hexdigest()
+
+
+def file_key(file_unique_id: str) -> str:
+    return "fu:" + file_unique_id
+
+
+class ResultCache:
+    """LRU у памʼяті + опційний персистентний рівень у SQLite."""
+
+    def __init__(self, max_entries: int = RESULT_CACHE_SIZE, db_path: str = RESULT_CACHE_DB,
+                 namespace: Optional[str] = None):
+        self.max_entries = max(1, max_entries)
+        self.db_path = db_path or None
+        # None — конфігурація аналізу цього процесу
+        self.namespace = namespace if namespace is not None else analysis_fingerprint()
+
+        self._mem: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+
+        if self.db_path:
+            self._init_db()
+
+    # ---------------------------------------------------
+    # SQLite-рівень
+    # ---------------------------------------------------
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.db_path, timeout=5)
+
+    def _init_db(self):
+        conn = self._connect()
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS result_cache (
+                key TEXT PRIMARY KEY,
+                payload TEXT NOT NULL,
+                created_at REAL NOT NULL
+            )
+            """
+        )
+        conn.commit()
+        conn.close()
+
+    def _db_get(self, key: str) -> Optional[Dict[str, Any]]:
+        conn = self._connect()
+        row = conn.execute(
+            "SELECT payload FROM result_cache WHERE key = ?", (key,)
+        ).fetchone()
+        conn.close()
+        return loads(row[0]) if row else None
+
+    def _db_put(self, keys, payload: str):
+        now = time.time()
+        conn = self._connect()
+        conn.executemany(
+            "INSERT OR REPLACE INTO result_cache (key, payload, created_at) VALUES (?, ?, ?)",
+            [(k, payload, now) for k in keys],
+        )
+        conn.commit()
+        conn.close()
+
+    # ---------------------------------------------------
+    # Памʼять (LRU)
+    # ---------------------------------------------------
+    def _mem_get(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            value = self._mem.get(key)
+            if value is not None:
+                self._mem.move_to_end(key)
+            return value
+
+    def _mem_put(self, key: str, value: Dict[str, Any]):
+        with self._lock:
+            self._mem[key] = value
+            self._mem.move_to_end(key)
+            while len(self._mem) > self.max_entries:
+                self._mem.popitem(last=False)
+
+    # ---------------------------------------------------
+    # Публічне API (синхронне)
+    # ---------------------------------------------------
+    def _keys(self, keys) -> list:
+        return [f"{self.namespace}|{k}" for k in keys if k]
+
+    def get(self, *keys: Optional[str]) -> Optional[Dict[str, Any]]:
+        """Повертає копію результату за першим знайденим ключем або None."""
+        keys = self._keys(keys)
+
+        for key in keys:
+            value = self._mem_get(key)
+            if value is not None:
+                for k in keys:
+                    if k != key:
+                        self._mem_put(k, value)
+                self.hits += 1
+                return copy.deepcopy(value)
+
+        if self.db_path:
+            for key in keys:
+                value = self._db_get(key)
+                if value is not None:
+                    # Піднімаємо в памʼять під усіма відомими ключами
+                    for k in keys:
+                        self._mem_put(k, value)
+                    self.hits += 1
+                    return copy.deepcopy(value)
+
+        self.misses += 1
+        return None
+
+    def put(self, result: Dict[str, Any], *keys: Optional[str]):
+        keys = self._keys(keys)
+        if not keys:
+            return
+
+        # Власна копія: подальші зміни result у викликача кеш не зачіпають
+        value = copy.deepcopy(result)
+        for key in keys:
+            self._mem_put(key, value)
+
+        if self.db_path:
+            payload = dumps(value)
+            self._db_put(keys, payload)
+
+    # ---------------------------------------------------
+    # Async-обгортки: SQLite не повинен блокувати event loop
+    # ---------------------------------------------------
+    async def aget(self, *keys: Optional[str]) -> Optional[Dict[str, Any]]:
+        if not self.db_path:
+            return self.get(*keys)
+        return await asyncio.to_thread(self.get, *keys)
+
+    async def aput(self, result: Dict[str, Any], *keys: Optional[str]):
+        if not self.db_path:
+            return self.put(result, *keys)
+        await asyncio.to_thread(self.put, result, *keys)
+
+    def __len__(self) -> int:
+        return len(self._mem)
@@ -0,0 +1,111 @@
+# serialization.py
+"""
+Серіалізація результатів аналізу в JSON.
+
+Раніше кожне збереження проходило через database._make_jsonable:
+рекурсивний обхід усієї структури з `import numpy` на кожному рівні
+і повною копією перед json.dumps. Тут — один прохід:
+
+    orjson (якщо встановлений) — нативно серіалізує np.generic / ndarray
+                                 (OPT_SERIALIZE_NUMPY), у кілька разів
+                                 швидший за json;
+    json   (запасний шлях)     — json.dumps з default-хуком, який
+                                 викликається лише для numpy-значень.
+
+Вихід — str у UTF-8 (як ensure_ascii=False), сумісний зі старими записами.
+NaN / ±Infinity в обох бекендах пишуться як null: orjson робить так сам,
+а json-шлях нормалізує їх так само (інакше він писав би `NaN`, який
+не є валідним JSON і який orjson.loads не читає). Старі записи з `NaN`
+loads() дочитує через json.
+Налаштування:
+    JSON_BACKEND — auto (за замовчуванням) / orjson / json
+"""
+
+import os
+import json
+import math
+from typing import Any
+
+JSON_BACKEND = os.getenv("JSON_BACKEND", "auto").lower()
+
+try:
+    import numpy as np
+except ImportError:  # numpy потрібен аналізатору, але серіалізація без нього теж працює
+    np = None
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def _default(obj: Any) -> Any:
+    """Хук для значень, яких JSON-енкодер не знає (викликається лише для них)."""
+    if np is not None:
+        # np.float32, np.int64, np.bool_ і т.п.
+        if isinstance(obj, np.generic):
+            return obj.item()
+        if isinstance(obj, np.ndarray):
+            return obj.tolist()
+    if isinstance(obj, (set, frozenset)):
+        return list(obj)
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def _finite(obj: Any) -> Any:
+    """Копія структури, в якій NaN / ±Infinity замінено на None."""
+    if isinstance(obj, float):
+        return obj if math.isfinite(obj) else None
+    if isinstance(obj, dict):
+        return {k: _finite(v) for k, v in obj.items()}
+    if isinstance(obj, (list, tuple, set, frozenset)):
+        return [_finite(v) for v in obj]
+    if np is not None and isinstance(obj, (np.generic, np.ndarray)):
+        return _finite(_default(obj))
+    return obj
+
+
+def _dumps_json(obj: Any) -> str:
+    try:
+        return json.dumps(obj, ensure_ascii=False, default=_default, allow_nan=False)
+    except ValueError:
+        # Рідкісний шлях: у результаті є NaN / Infinity — пишемо null, як orjson
+        return json.dumps(_finite(obj), ensure_ascii=False, default=_default, allow_nan=False)
+
+
+if orjson is not None:
+    _ORJSON_OPTIONS = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+
+    def _dumps_orjson(obj: Any) -> str:
+        # Масиви з нестандартним dtype / не C-contiguous orjson віддає в default
+        return orjson.dumps(obj, default=_default, option=_ORJSON_OPTIONS).decode("utf-8")
+
+    def _loads(data):
+        try:
+            return orjson.loads(data)
+        except orjson.JSONDecodeError:
+            # Старі записи json-бекенду могли містити NaN / Infinity
+            return json.loads(data)
+else:
+    _dumps_orjson = None
+
+    def _loads(data):
+        return json.loads(data)
+
+
+if JSON_BACKEND == "json" or _dumps_orjson is None:
+    BACKEND = "json"
+    _dumps = _dumps_json
+else:
+    BACKEND = "orjson"
+    _dumps = _dumps_orjson
+
+
+def dumps(obj: Any) -> str:
+    """Серіалізує результат аналізу (з numpy-значеннями) в JSON-рядок."""
+    return _dumps(obj)
+
+
+def loads(data):
+    """Розбирає JSON (str / bytes)."""
+    return _loads(data)
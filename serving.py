@@ -0,0 +1,173 @@
+# serving.py
+"""
+Прийом апдейтів від Telegram: long polling або webhook.
+
+    BOT_MODE=polling  — dp.start_polling (за замовчуванням);
+    BOT_MODE=webhook  — aiohttp-сервер приймає апдейти від Telegram
+                        (SimpleRequestHandler), кожен обробляється окремою
+                        задачею, без round-trip getUpdates.
+
+Webhook:
+    WEBHOOK_URL              — публічна адреса бота (https://<app>.up.railway.app);
+                               Telegram надсилатиме апдейти на WEBHOOK_URL + WEBHOOK_PATH;
+    WEBHOOK_PATH             — шлях обробника (/webhook);
+    WEBHOOK_HOST / WEBHOOK_PORT — де слухає aiohttp (0.0.0.0 / $PORT або 8080);
+    WEBHOOK_SECRET           — секрет для X-Telegram-Bot-Api-Secret-Token
+                               (якщо не задано — випадковий на кожен старт);
+    WEBHOOK_MAX_CONNECTIONS  — скільки одночасних з'єднань відкриває Telegram.
+
+Спільне для обох режимів:
+    UPDATE_CONCURRENCY      — максимум апдейтів, що обробляються одночасно (0 — без ліміту);
+    SHUTDOWN_DRAIN_TIMEOUT  — скільки секунд при зупинці чекати на апдейти
+                              в обробці (аналізи, що вже йдуть), перш ніж закрити сесію.
+
+Зупинка (SIGTERM / SIGINT): нові апдейти не приймаються, обробники, що
+вже працюють, дообробляються (до SHUTDOWN_DRAIN_TIMEOUT), потім закривається
+сесія бота. Webhook при зупинці не видаляється — Telegram притримає
+апдейти до наступного старту.
+"""
+
+import os
+import signal
+import asyncio
+import secrets
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from aiogram import BaseMiddleware, Bot, Dispatcher
+from aiogram.types import TelegramObject
+
+BOT_MODE = os.getenv("BOT_MODE", "polling").lower()
+
+WEBHOOK_URL = os.getenv("WEBHOOK_URL", "")
+WEBHOOK_PATH = os.getenv("WEBHOOK_PATH", "/webhook")
+WEBHOOK_HOST = os.getenv("WEBHOOK_HOST", "0.0.0.0")
+WEBHOOK_PORT = int(os.getenv("WEBHOOK_PORT", os.getenv("PORT", "8080")))
+WEBHOOK_SECRET = os.getenv("WEBHOOK_SECRET", "")
+WEBHOOK_MAX_CONNECTIONS = int(os.getenv("WEBHOOK_MAX_CONNECTIONS", "40"))
+
+UPDATE_CONCURRENCY = int(os.getenv("UPDATE_CONCURRENCY", "0"))
+SHUTDOWN_DRAIN_TIMEOUT = float(os.getenv("SHUTDOWN_DRAIN_TIMEOUT", "60"))
+
+
+class UpdateTracker(BaseMiddleware):
+    """
+    Outer-middleware на dp.update: рахує апдейти в обробці, обмежує
+    їх кількість (UPDATE_CONCURRENCY) і дає дочекатися завершення при зупинці.
+    """
+
+    def __init__(self, limit: int = UPDATE_CONCURRENCY):
+        self.limit = max(0, limit)
+        self.in_flight = 0
+        self.handled_total = 0
+        self._semaphore = asyncio.Semaphore(self.limit) if self.limit else None
+        self._idle = asyncio.Event()
+        self._idle.set()
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any],
+    ) -> Any:
+        self.in_flight += 1
+        self._idle.clear()
+        try:
+            if self._semaphore is None:
+                return await handler(event, data)
+            async with self._semaphore:
+                return await handler(event, data)
+        finally:
+            self.in_flight -= 1
+            self.handled_total += 1
+            if self.in_flight == 0:
+                self._idle.set()
+
+    async def drain(self, timeout: float = SHUTDOWN_DRAIN_TIMEOUT) -> bool:
+        """Чекає, поки всі апдейти в обробці завершаться. False — таймаут."""
+        # Задачі, створені щойно прийнятими апдейтами, ще не дійшли до middleware
+        await asyncio.sleep(0)
+        if self.in_flight == 0:
+            return True
+
+        print(f"[serving] Waiting for {self.in_flight} updates in progress (up to {timeout:.0f} s)...")
+        try:
+            await asyncio.wait_for(self._idle.wait(), timeout)
+            return True
+        except asyncio.TimeoutError:
+            print(f"[serving] Drain timeout, {self.in_flight} updates abandoned.")
+            return False
+
+
+# ======================================================
+#                    POLLING
+# ======================================================
+async def run_polling(dp: Dispatcher, bot: Bot, tracker: UpdateTracker):
+    # Сесію закриваємо самі — після того, як дообробляться апдейти
+    try:
+        await dp.start_polling(bot, close_bot_session=False)
+        await tracker.drain()
+    finally:
+        await bot.session.close()
+
+
+# ======================================================
+#                    WEBHOOK
+# ======================================================
+def _stop_event() -> asyncio.Event:
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        try:
+            loop.add_signal_handler(sig, stop.set)
+        except NotImplementedError:
+            pass
+    return stop
+
+
+async def run_webhook(dp: Dispatcher, bot: Bot, tracker: UpdateTracker,
+                      stop: Optional[asyncio.Event] = None):
+    if not WEBHOOK_URL:
+        raise RuntimeError("❌ WEBHOOK_URL is missing! Set it for BOT_MODE=webhook.")
+
+    from aiohttp import web
+    from aiogram.webhook.aiohttp_server import SimpleRequestHandler, setup_application
+
+    secret = WEBHOOK_SECRET or secrets.token_urlsafe(32)
+    path = "/" + WEBHOOK_PATH.lstrip("/")
+
+    app = web.Application()
+    # Відповідь Telegram — одразу, обробка апдейту — окремою задачею
+    SimpleRequestHandler(dispatcher=dp, bot=bot, secret_token=secret).register(app, path=path)
+    setup_application(app, dp, bot=bot)
+
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    site = web.TCPSite(runner, WEBHOOK_HOST, WEBHOOK_PORT)
+    await site.start()
+
+    stop = stop or _stop_event()
+    try:
+        await bot.set_webhook(
+            WEBHOOK_URL.rstrip("/") + path,
+            secret_token=secret,
+            max_connections=WEBHOOK_MAX_CONNECTIONS,
+        )
+        print(f"[serving] Webhook on {WEBHOOK_HOST}:{WEBHOOK_PORT}{path}")
+        await stop.wait()
+    finally:
+        # Спершу перестаємо приймати апдейти, потім дочікуємося тих, що в обробці;
+        # runner.cleanup() викликає emit_shutdown і закриває сесію бота
+        await site.stop()
+        await tracker.drain()
+        await runner.cleanup()
+
+
+async def serve(dp: Dispatcher, bot: Bot, tracker: UpdateTracker):
+    """Точка входу bot.py: polling або webhook залежно від BOT_MODE."""
+    if BOT_MODE not in ("polling", "webhook"):
+        raise RuntimeError(f"❌ Unknown BOT_MODE={BOT_MODE!r} (polling | webhook).")
+
+    if BOT_MODE == "webhook":
+        await run_webhook(dp, bot, tracker)
+    else:
+        await run_polling(dp, bot, tracker)
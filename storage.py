@@ -0,0 +1,151 @@
+# storage.py
+"""
+Шар зберігання над SQLite.
+
+Раніше кожен виклик database.py відкривав і закривав свій
+sqlite3.connect(DB_PATH) з журналом за замовчуванням, прямо в потоці
+event loop. Тут:
+
+- довгоживучі зʼєднання: одне на запис + по одному на читання в кожному потоці;
+- WAL: читачі не блокують запис і навпаки;
+- налаштовані PRAGMA (synchronous=NORMAL, кеш сторінок, mmap, busy_timeout);
+- кеш підготовлених запитів sqlite3 (cached_statements) — SQL-текст
+  компілюється один раз на зʼєднання;
+- усі записи йдуть через одне зʼєднання під локом, тож конкурентні аналізи
+  стають у чергу в памʼяті, а не ловлять "database is locked" на файлі;
+- async-фасад: виклики виконуються в окремому пулі потоків і не блокують бота.
+
+Налаштування:
+    DB_THREADS      — потоки async-фасаду (за замовчуванням 4)
+    DB_CACHE_MB     — кеш сторінок на зʼєднання (за замовчуванням 16)
+"""
+
+import os
+import asyncio
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Any, Callable, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+DB_THREADS = int(os.getenv("DB_THREADS", "4"))
+DB_CACHE_MB = int(os.getenv("DB_CACHE_MB", "16"))
+
+
+class Storage:
+    def __init__(self, db_path: str, threads: int = DB_THREADS):
+        self.db_path = db_path
+        self.threads = max(1, threads)
+
+        self._write_lock = threading.RLock()
+        self._writer: Optional[sqlite3.Connection] = None
+        self._local = threading.local()
+        self._readers: List[sqlite3.Connection] = []
+        self._readers_lock = threading.Lock()
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    # ---------------------------------------------------
+    # Зʼєднання
+    # ---------------------------------------------------
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(
+            self.db_path,
+            timeout=30,
+            check_same_thread=False,
+            cached_statements=256,
+            isolation_level=None,  # транзакції керуються явно
+        )
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute(f"PRAGMA cache_size=-{DB_CACHE_MB * 1024}")
+        conn.execute("PRAGMA temp_store=MEMORY")
+        conn.execute("PRAGMA mmap_size=67108864")
+        conn.execute("PRAGMA busy_timeout=30000")
+        return conn
+
+    def _writer_conn(self) -> sqlite3.Connection:
+        if self._writer is None:
+            self._writer = self._connect()
+        return self._writer
+
+    def _reader_conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._connect()
+            conn.execute("PRAGMA query_only=ON")
+            self._local.conn = conn
+            with self._readers_lock:
+                self._readers.append(conn)
+        return conn
+
+    def close(self):
+        with self._write_lock:
+            if self._writer is not None:
+                self._writer.close()
+                self._writer = None
+        with self._readers_lock:
+            for conn in self._readers:
+                try:
+                    conn.close()
+                except sqlite3.ProgrammingError:
+                    pass
+            self._readers.clear()
+        self._local = threading.local()
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+    # ---------------------------------------------------
+    # Запис
+    # ---------------------------------------------------
+    @contextmanager
+    def transaction(self) -> Iterator[sqlite3.Connection]:
+        """Одна транзакція запису: BEGIN IMMEDIATE ... COMMIT / ROLLBACK."""
+        with self._write_lock:
+            conn = self._writer_conn()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield conn
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            else:
+                conn.execute("COMMIT")
+
+    def execute(self, sql: str, params: Sequence[Any] = ()) -> int:
+        """Один запис. Повертає lastrowid."""
+        with self.transaction() as conn:
+            return conn.execute(sql, params).lastrowid
+
+    def executemany(self, sql: str, rows: Iterable[Sequence[Any]]) -> int:
+        with self.transaction() as conn:
+            return conn.executemany(sql, rows).rowcount
+
+    def executescript(self, script: str):
+        with self._write_lock:
+            self._writer_conn().executescript(script)
+
+    # ---------------------------------------------------
+    # Читання
+    # ---------------------------------------------------
+    def query(self, sql: str, params: Sequence[Any] = ()) -> List[Tuple]:
+        return self._reader_conn().execute(sql, params).fetchall()
+
+    def query_one(self, sql: str, params: Sequence[Any] = ()) -> Optional[Tuple]:
+        return self._reader_conn().execute(sql, params).fetchone()
+
+    # ---------------------------------------------------
+    # Async-фасад
+    # ---------------------------------------------------
+    def _ensure_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.threads,
+                thread_name_prefix="storage",
+            )
+        return self._executor
+
+    async def run(self, fn: Callable[..., Any], *args: Any) -> Any:
+        """Виконує синхронну функцію роботи з БД у пулі storage-потоків."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._ensure_executor(), fn, *args)
@@ -0,0 +1,137 @@
+# tests/test_admission.py
+"""AdmissionController: round-robin між користувачами, відмови, звільнення при скасуванні."""
+
+import os
+import sys
+import asyncio
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from admission import AdmissionController, AdmissionRejected
+
+
+def _run(coro):
+    return asyncio.run(coro)
+
+
+def _controller(**kwargs):
+    params = {"max_active": 1, "max_queue": 10, "per_user_active": 1, "per_user_queue": 5}
+    params.update(kwargs)
+    return AdmissionController(**params)
+
+
+def test_round_robin_between_two_users():
+    async def main():
+        admission = _controller()
+        first = admission.submit(1)
+        # Альбом користувача 1, потім одне фото користувача 2
+        album = [admission.submit(1) for _ in range(3)]
+        other = admission.submit(2)
+
+        assert first.admitted
+        assert admission.position(other) == 2
+
+        order = []
+        current = first
+        for _ in range(4):
+            admission.release(current)
+            current = next(t for t in album + [other] if t.admitted and not t.released)
+            order.append(current.user_id)
+        return order
+
+    # Фото користувача 2 не чекає, поки пройде весь альбом
+    assert _run(main()) == [1, 2, 1, 1]
+
+
+def test_rejects_when_user_queue_is_full():
+    async def main():
+        admission = _controller(per_user_queue=2)
+        admission.submit(1)  # одразу допущено
+        admission.submit(1)
+        admission.submit(1)
+        with pytest.raises(AdmissionRejected) as exc:
+            admission.submit(1)
+        # Інший користувач досі проходить
+        admission.submit(2)
+        return exc.value.reason, admission.stats()
+
+    reason, stats = _run(main())
+    assert reason == "user_queue_full"
+    assert stats["rejected_user_queue_full"] == 1
+    assert stats["queued"] == 3
+
+
+def test_rejects_when_global_queue_is_full():
+    async def main():
+        admission = _controller(max_queue=2)
+        admission.submit(1)
+        admission.submit(2)
+        admission.submit(3)
+        with pytest.raises(AdmissionRejected) as exc:
+            admission.submit(4)
+        return exc.value.reason, admission.stats()
+
+    reason, stats = _run(main())
+    assert reason == "queue_full"
+    assert stats["rejected_queue_full"] == 1
+    assert stats["active"] == 1 and stats["queued"] == 2
+
+
+def test_release_of_cancelled_waiter_frees_queue_slot():
+    async def main():
+        admission = _controller(max_queue=1)
+        active = admission.submit(1)
+        waiting = admission.submit(2)
+
+        task = asyncio.ensure_future(waiting.wait())
+        await asyncio.sleep(0)
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+        finally:
+            admission.release(waiting)
+
+        # Місце в черзі звільнилося, а слот після активного дістається новому
+        replacement = admission.submit(3)
+        admission.release(active)
+        return waiting, replacement, admission.stats()
+
+    waiting, replacement, stats = _run(main())
+    assert not waiting.admitted
+    assert replacement.admitted
+    assert stats["active"] == 1 and stats["queued"] == 0 and stats["users_waiting"] == 0
+
+
+def test_release_of_cancelled_active_admits_next():
+    async def main():
+        admission = _controller()
+        active = admission.submit(1)
+        waiting = admission.submit(2)
+
+        async def analyze(ticket):
+            try:
+                await ticket.wait()
+                await asyncio.sleep(10)
+            finally:
+                admission.release(ticket)
+
+        task = asyncio.ensure_future(analyze(active))
+        await asyncio.sleep(0)
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+
+        admitted_after = waiting.admitted
+        # Повторний release — no-op, лічильник не йде в мінус
+        admission.release(active)
+        return admitted_after, admission.stats()
+
+    admitted_after, stats = _run(main())
+    assert admitted_after
+    assert stats["active"] == 1 and stats["queued"] == 0
@@ -0,0 +1,62 @@
+# tests/test_batching.py
+"""MicroBatcher: порядок пачок, повтори на своє місце, ізоляція помилок."""
+
+import os
+import sys
+import asyncio
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from analyzer.batching import BatchItemError, MicroBatcher
+from analyzer.executor import AnalysisExecutor
+
+
+def _batch(items):
+    return [BatchItemError("bad", "ValueError") if item == "bad" else item.upper() for item in items]
+
+
+def _run(coro):
+    return asyncio.run(coro)
+
+
+def _batcher(batches):
+    def batch_fn(items):
+        batches.append(list(items))
+        return _batch(items)
+
+    executor = AnalysisExecutor(kind="thread", workers=1, initializer=None)
+    return MicroBatcher(batch_fn, executor, max_batch_size=3, max_wait_ms=20), executor
+
+
+def test_item_error_fails_only_its_request():
+    async def main():
+        batcher, executor = _batcher([])
+        try:
+            return await asyncio.gather(
+                batcher.submit("a"), batcher.submit("bad"), batcher.submit("c"),
+                return_exceptions=True,
+            )
+        finally:
+            executor.shutdown()
+
+    a, bad, c = _run(main())
+    assert (a, c) == ("A", "C")
+    assert isinstance(bad, BatchItemError) and str(bad) == "ValueError: bad"
+
+
+def test_retry_keeps_original_position():
+    batches = []
+
+    async def main():
+        batcher, executor = _batcher(batches)
+        try:
+            early = batcher.next_seq()
+            late = asyncio.ensure_future(batcher.submit("late"))
+            await asyncio.sleep(0)
+            # Повтор старішого запиту стає перед новішим
+            return await asyncio.gather(batcher.submit("early", seq=early), late)
+        finally:
+            executor.shutdown()
+
+    assert _run(main()) == ["EARLY", "LATE"]
+    assert batches == [["early", "late"]]
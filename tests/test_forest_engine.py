@@ -0,0 +1,74 @@
+# tests/test_forest_engine.py
+"""
+Скомпільований ліс (analyzer.forest_engine) має давати ті самі мітки
+й імовірності, що й sklearn — і після збереження / завантаження .npz.
+"""
+
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+pytest.importorskip("sklearn")
+
+from sklearn.ensemble import RandomForestClassifier
+
+from analyzer.fingerprint import MODEL_VERSION
+from analyzer.forest_engine import CompiledForest
+from analyzer.ml_radical_classifier import TRAINING_SEED, build_training_set, compile_engine
+
+
+@pytest.fixture(scope="module")
+def forest():
+    X, y = build_training_set(TRAINING_SEED)
+    clf = RandomForestClassifier(
+        n_estimators=15,
+        max_depth=8,
+        min_samples_leaf=2,
+        random_state=TRAINING_SEED,
+    )
+    clf.fit(X, y)
+
+    # Навчальні вектори + зашумлені, щоб потрапити і в «рідкісні» листки
+    rng = np.random.RandomState(TRAINING_SEED + 7)
+    X = np.asarray(X, dtype=np.float64)
+    probe = np.vstack([X, X + rng.normal(0, 5, X.shape)])
+    return clf, probe
+
+
+def assert_matches_sklearn(engine: CompiledForest, clf, X):
+    proba = engine.predict_proba(X)
+    np.testing.assert_allclose(proba, clf.predict_proba(X), rtol=0, atol=1e-12)
+
+    labels, confidence = engine.predict_with_proba(X)
+    np.testing.assert_array_equal(labels.astype(str), clf.predict(X).astype(str))
+    np.testing.assert_allclose(confidence, proba.max(axis=1), rtol=0, atol=0)
+
+
+def test_compiled_forest_matches_sklearn(forest, tmp_path):
+    clf, X = forest
+    engine = compile_engine(clf, path=str(tmp_path / "engine.npz"))
+    assert_matches_sklearn(engine, clf, X)
+
+
+def test_npz_round_trip(forest, tmp_path):
+    clf, X = forest
+    path = str(tmp_path / "engine.npz")
+    compile_engine(clf, path=path)
+
+    loaded, version = CompiledForest.load(path)
+    assert version == MODEL_VERSION
+    assert loaded.max_depth == max(est.tree_.max_depth for est in clf.estimators_)
+    assert_matches_sklearn(loaded, clf, X)
+
+
+def test_single_row(forest, tmp_path):
+    clf, X = forest
+    engine = compile_engine(clf, path=str(tmp_path / "engine.npz"), verify=False)
+
+    # Один вектор ознак без осі пачки (X.ndim == 1)
+    proba = engine.predict_proba(X[0])
+    np.testing.assert_allclose(proba, clf.predict_proba(X[:1]), rtol=0, atol=1e-12)
@@ -0,0 +1,129 @@
+# tests/test_job_queue.py
+"""Черга задач у SQLite (job_queue): claim / ack / nack / release і видимість."""
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from job_queue import JobQueue
+from storage import Storage
+
+
+@pytest.fixture
+def queue(tmp_path):
+    storage = Storage(str(tmp_path / "jobs.db"))
+    q = JobQueue(storage)
+    q.ensure_schema()
+    yield q
+    storage.close()
+
+
+def _enqueue(queue: JobQueue, n: int = 1, **kwargs):
+    return [
+        queue.enqueue("photo", {"file_id": f"f{i}"}, user_id=1, chat_id=10 + i, **kwargs)
+        for i in range(n)
+    ]
+
+
+def _expire(queue: JobQueue, job_id: int):
+    """Воркер «помер»: видимість задачі минула."""
+    queue.storage.execute("UPDATE jobs SET visible_at = 0 WHERE id = ?", (job_id,))
+
+
+def _status(queue: JobQueue, job_id: int):
+    return queue.storage.query_one("SELECT status, attempts FROM jobs WHERE id = ?", (job_id,))
+
+
+def test_claim_oldest_first_and_only_once(queue):
+    ids = _enqueue(queue, 3)
+
+    claimed = [queue.claim("w1").id for _ in range(3)]
+    assert claimed == ids
+    assert queue.claim("w2") is None
+
+    job = queue.storage.query_one("SELECT status, claimed_by, attempts FROM jobs WHERE id = ?", (ids[0],))
+    assert job == ("running", "w1", 1)
+
+
+def test_claim_skips_invisible_and_other_kinds(queue):
+    _enqueue(queue, delay=60)
+    queue.enqueue("other", {}, user_id=1, chat_id=1)
+
+    assert queue.claim("w1", kinds=("photo",)) is None
+
+
+def test_ack_marks_done(queue):
+    (job_id,) = _enqueue(queue)
+    queue.claim("w1")
+
+    assert queue.ack(job_id, "w1", result_id=5)
+    assert _status(queue, job_id) == ("done", 1)
+    assert queue.pending() == 0
+
+
+def test_expired_job_is_reclaimed_and_stale_worker_rejected(queue):
+    (job_id,) = _enqueue(queue, max_attempts=3)
+    queue.claim("w1")
+    _expire(queue, job_id)
+
+    job = queue.claim("w2")
+    assert job.id == job_id and job.attempts == 2
+
+    # Старий воркер прокинувся: ні ack, ні extend, ні nack уже не його
+    assert not queue.ack(job_id, "w1")
+    assert not queue.extend(job_id, "w1")
+    assert queue.nack(job_id, "w1", "late") == "lost"
+    assert queue.ack(job_id, "w2")
+
+
+def test_nack_retries_until_failed(queue):
+    (job_id,) = _enqueue(queue, max_attempts=2)
+
+    queue.claim("w1")
+    assert queue.nack(job_id, "w1", "boom", retry_delay=0) == "queued"
+
+    queue.claim("w1")
+    assert queue.nack(job_id, "w1", "boom", retry_delay=0) == "failed"
+    assert _status(queue, job_id) == ("failed", 2)
+    assert queue.claim("w1") is None
+    # nack-failed воркер повідомляє сам
+    assert queue.take_failed() == []
+
+
+def test_nack_after_ack_is_ignored(queue):
+    (job_id,) = _enqueue(queue)
+    queue.claim("w1")
+    queue.ack(job_id, "w1")
+
+    assert queue.nack(job_id, "w1", "late") == "lost"
+    assert _status(queue, job_id) == ("done", 1)
+
+
+def test_crash_on_last_attempt_fails_and_notifies_once(queue):
+    (job_id,) = _enqueue(queue, max_attempts=1)
+    queue.claim("w1")
+    _expire(queue, job_id)
+
+    assert queue.claim("w2") is None
+    assert _status(queue, job_id) == ("failed", 1)
+
+    failed = queue.take_failed()
+    assert [(job.id, job.chat_id) for job in failed] == [(job_id, 10)]
+    assert queue.take_failed() == []
+
+
+def test_release_does_not_spend_attempt(queue):
+    (job_id,) = _enqueue(queue, max_attempts=1)
+    queue.claim("w1")
+
+    assert queue.release(job_id, "w1", delay=60)
+    assert _status(queue, job_id) == ("queued", 0)
+    assert queue.claim("w1") is None  # ще невидима
+
+    _expire(queue, job_id)
+    job = queue.claim("w1")
+    assert job.id == job_id and job.attempts == 1
+    assert not queue.release(job_id, "w2")
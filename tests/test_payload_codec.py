@@ -0,0 +1,78 @@
+# tests/test_payload_codec.py
+"""payload_codec: round-trip полів, старі нестиснені рядки, невідомий словник."""
+
+import os
+import sys
+import json
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import database
+from payload_codec import _HEADER, MAGIC, MIN_COMPRESS_BYTES, PayloadCodec
+
+
+@pytest.fixture
+def db(tmp_path, monkeypatch):
+    monkeypatch.setattr(database, "DB_PATH", str(tmp_path / "reports.db"))
+    database.init_db()
+    yield database.get_storage()
+    database.get_storage().close()
+
+
+def _report_text() -> str:
+    return json.dumps({
+        "radical": "Паранояльний",
+        "work_style": ["Працює на результат", "Тримає фокус на меті"] * 5,
+    }, ensure_ascii=False)
+
+
+def test_small_field_is_stored_as_is(db):
+    codec = database.get_codec()
+    text = json.dumps({"microstress_level": 42})
+    assert len(text.encode("utf-8")) < MIN_COMPRESS_BYTES
+
+    encoded = codec.encode(text)
+    assert encoded == text
+    assert codec.decode(encoded) == text
+
+
+def test_large_field_round_trip(db):
+    codec = database.get_codec()
+    text = _report_text()
+    assert len(text.encode("utf-8")) >= MIN_COMPRESS_BYTES
+
+    encoded = codec.encode(text)
+    assert PayloadCodec.is_encoded(encoded)
+    assert len(encoded) < len(text.encode("utf-8"))
+
+    # Новий кодек на тій самій БД читає словник з payload_dicts
+    fresh = PayloadCodec(db)
+    assert fresh.decode(encoded) == text
+    assert fresh.decode(memoryview(encoded)) == text
+    assert codec.decode(None) is None and codec.encode(None) is None
+
+
+def test_legacy_plain_json_rows_are_read(db):
+    personality = _report_text()
+    db.execute(
+        "INSERT INTO reports (user_id, image_path, stress_data, personality_data) VALUES (?, ?, ?, ?)",
+        (7, "", '{"microstress_level": 10}', personality),
+    )
+    # Старий BLOB без заголовка PZ — просто UTF-8
+    db.execute(
+        "INSERT INTO reports (user_id, image_path, personality_data) VALUES (?, ?, ?)",
+        (7, "", personality.encode("utf-8")),
+    )
+
+    rows = database.get_latest_reports(7, limit=2, columns=["stress_data", "personality_data"])
+    assert [row["personality_data"] for row in rows] == [personality, personality]
+    assert rows[1]["stress_data"] == '{"microstress_level": 10}'
+
+
+def test_unknown_dictionary_id_fails_loudly(db):
+    codec = database.get_codec()
+    value = _HEADER.pack(MAGIC, 999999) + b"\x00" * 8
+    with pytest.raises(ValueError, match="999999"):
+        codec.decode(value)
@@ -0,0 +1,63 @@
+# tests/test_reports_page.py
+"""Keyset-пагінація історії (database.get_reports_page)."""
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import database
+
+
+@pytest.fixture
+def db(tmp_path, monkeypatch):
+    monkeypatch.setattr(database, "DB_PATH", str(tmp_path / "reports.db"))
+    database.init_db()
+    yield database.get_storage()
+    database.get_storage().close()
+
+
+def _add_reports(storage, user_id: int, count: int):
+    # Однаковий created_at у кількох рядків — курсор мусить розрізняти їх за id
+    for i in range(count):
+        storage.execute(
+            "INSERT INTO reports (user_id, image_path, created_at) VALUES (?, ?, ?)",
+            (user_id, f"{i}.jpg", f"2024-01-01 00:00:0{i // 3}"),
+        )
+
+
+def test_pages_cover_history_once(db):
+    _add_reports(db, user_id=1, count=8)
+    _add_reports(db, user_id=2, count=2)
+
+    seen, cursor = [], None
+    while True:
+        rows, cursor = database.get_reports_page(1, limit=3, columns=["id"], cursor=cursor)
+        seen += [row["id"] for row in rows]
+        if cursor is None:
+            break
+
+    expected = [row[0] for row in db.query(
+        "SELECT id FROM reports WHERE user_id = 1 ORDER BY created_at DESC, id DESC"
+    )]
+    assert seen == expected
+
+
+def test_next_cursor_uses_clamped_limit(db):
+    _add_reports(db, user_id=1, count=2)
+
+    rows, cursor = database.get_reports_page(1, limit=0, columns=["id"])
+    assert len(rows) == 1
+    assert cursor is not None
+
+
+def test_cursor_bound_uses_index(db):
+    plan = " ".join(str(row[-1]) for row in db.query(
+        "EXPLAIN QUERY PLAN SELECT id FROM reports WHERE user_id = ? "
+        "AND (created_at, id) < (?, ?) ORDER BY created_at DESC, id DESC LIMIT 3",
+        (1, "2024-01-01 00:00:00", 10),
+    ))
+    assert "idx_reports_user_created" in plan
+    assert "created_at<?" in plan
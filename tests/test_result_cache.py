@@ -0,0 +1,63 @@
+# tests/test_result_cache.py
+"""Кеш результатів: ізоляція копій, LRU, простори імен, SQLite-рівень."""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from result_cache import ResultCache, content_key, file_key
+
+
+def _result(n: int = 1):
+    return {"personality": {"radical_key": "r", "scores": [n, 2.5]}, "full_report": f"report {n}"}
+
+
+def test_get_and_put_return_isolated_copies():
+    cache = ResultCache(max_entries=4, db_path="", namespace="ns")
+    original = _result()
+    cache.put(original, file_key("a"))
+
+    # Зміни після put кеш не бачить
+    original["personality"]["scores"].append(99)
+    first = cache.get(file_key("a"))
+    assert first == _result()
+
+    # Зміни отриманої копії — теж
+    first["personality"]["radical_key"] = "changed"
+    assert cache.get(file_key("a")) == _result()
+
+
+def test_hit_by_any_key_fills_the_others():
+    cache = ResultCache(max_entries=4, db_path="", namespace="ns")
+    cache.put(_result(), content_key(b"photo"))
+
+    assert cache.get(file_key("a"), content_key(b"photo")) == _result()
+    assert cache.get(file_key("a")) == _result()
+    assert (cache.hits, cache.misses) == (2, 0)
+
+
+def test_lru_eviction():
+    cache = ResultCache(max_entries=2, db_path="", namespace="ns")
+    cache.put(_result(1), "k1")
+    cache.put(_result(2), "k2")
+    cache.get("k1")                # k1 — свіжіший за k2
+    cache.put(_result(3), "k3")
+
+    assert cache.get("k2") is None
+    assert cache.get("k1") == _result(1)
+    assert cache.get("k3") == _result(3)
+    assert len(cache) == 2
+
+
+def test_namespaces_do_not_share_entries(tmp_path):
+    db_path = str(tmp_path / "cache.db")
+    old = ResultCache(db_path=db_path, namespace="radical-rf-1/emotion,age")
+    old.put(_result(), file_key("a"))
+
+    new = ResultCache(db_path=db_path, namespace="radical-rf-2/emotion,age")
+    assert new.get(file_key("a")) is None
+
+    # Та сама конфігурація після перезапуску читає SQLite-рівень
+    restarted = ResultCache(db_path=db_path, namespace="radical-rf-1/emotion,age")
+    assert restarted.get(file_key("a")) == _result()
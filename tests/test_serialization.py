@@ -0,0 +1,52 @@
+# tests/test_serialization.py
+"""serialization: однаковий вихід json- і orjson-бекендів, у тому числі для NaN / Infinity."""
+
+import os
+import sys
+import json
+import math
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import serialization
+
+BACKENDS = [serialization._dumps_json]
+if serialization._dumps_orjson is not None:
+    BACKENDS.append(serialization._dumps_orjson)
+
+
+def _payload():
+    return {
+        "age": np.int64(31),
+        "confidence": np.float32(0.5),
+        "is_real": np.bool_(True),
+        "landmarks": np.array([[1.0, np.nan], [np.inf, 2.0]]),
+        "stress": float("nan"),
+        "scores": {"openness": float("-inf"), "neuroticism": np.float64(np.nan)},
+        "tags": ("a", "b"),
+    }
+
+
+@pytest.mark.parametrize("dumps", BACKENDS, ids=lambda fn: fn.__name__)
+def test_non_finite_floats_become_null(dumps):
+    text = dumps(_payload())
+    assert "NaN" not in text and "Infinity" not in text
+
+    data = json.loads(text)
+    assert data["stress"] is None
+    assert data["scores"] == {"openness": None, "neuroticism": None}
+    assert data["landmarks"] == [[1.0, None], [None, 2.0]]
+    assert data["age"] == 31 and data["confidence"] == 0.5 and data["is_real"] is True
+    assert data["tags"] == ["a", "b"]
+
+
+def test_backends_agree():
+    decoded = [json.loads(dumps(_payload())) for dumps in BACKENDS]
+    assert all(d == decoded[0] for d in decoded)
+
+
+def test_loads_reads_legacy_nan():
+    assert math.isnan(serialization.loads('{"stress": NaN}')["stress"])
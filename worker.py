@@ -0,0 +1,323 @@
+# worker.py
+"""
+Воркер аналізу для ANALYSIS_MODE=queue.
+
+Бот (bot.py) лише кладе фото в таблицю jobs (job_queue) і відповідає
+користувачу; цей процес забирає задачі, завантажує фото через Bot API,
+проганяє конвеєр аналізу у власному пулі (AnalysisExecutor + MicroBatcher),
+пише звіт через save_report і надсилає результат у чат від імені бота.
+
+Воркерів може бути кілька (різні процеси / контейнери зі спільною БД):
+claim атомарний, а задача впалого воркера повертається в чергу після
+JOB_VISIBILITY_TIMEOUT. Доставка at-least-once: якщо воркер помер між
+надсиланням звіту і ack, звіт може прийти повторно.
+
+    BOT_TOKEN=... ANALYSIS_MODE=queue python bot.py
+    BOT_TOKEN=... python worker.py
+
+Змінні оточення:
+    WORKER_CONCURRENCY    — задач одночасно (за замовчуванням воркери пулу × розмір пачки);
+    WORKER_POLL_INTERVAL  — максимальна пауза між опитуваннями порожньої черги, с;
+    WORKER_METRICS_PORT   — /metrics воркера (0 — вимкнено);
+    WORKER_BUSY_DELAY     — затримка повернення задачі в чергу, коли пул зайнятий, с;
+    JOB_VISIBILITY_TIMEOUT / JOB_MAX_ATTEMPTS / JOB_RETRY_DELAY — див. job_queue.
+"""
+
+import os
+import sys
+import time
+import signal
+import asyncio
+import traceback
+from typing import Optional
+
+from aiogram import Bot
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiogram.client.telegram import TelegramAPIServer
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+if BASE_DIR not in sys.path:
+    sys.path.insert(0, BASE_DIR)
+
+from analyzer.tasks import analyze_batch
+from analyzer.executor import AnalysisExecutor, ExecutorBusy
+from analyzer.batching import MicroBatcher
+
+from database import init_db, get_storage
+from job_queue import JOB_VISIBILITY_TIMEOUT, Job, JobQueue, default_worker_id, get_job_queue
+from photo_store import schedule_persist, flush_pending
+from result_cache import ResultCache, content_key, file_key
+from report_sender import (
+    already_saved,
+    save_result,
+    send_report,
+    send_no_face,
+    send_error,
+    with_origin,
+)
+from metrics import (
+    REGISTRY,
+    PHOTOS_TOTAL,
+    STAGE_SECONDS,
+    timed,
+    observe_pipeline_timings,
+    start_metrics_server,
+)
+
+
+# ======================================================
+#                  НАЛАШТУВАННЯ
+# ======================================================
+
+# Імпорт worker.py не має побічних ефектів (як і bot.py): Bot, пул аналізу,
+# кеш і черга створюються в setup() з main().
+
+TELEGRAM_API_URL = os.getenv("TELEGRAM_API_URL", "")
+WORKER_POLL_INTERVAL = float(os.getenv("WORKER_POLL_INTERVAL", "1.0"))
+WORKER_METRICS_PORT = int(os.getenv("WORKER_METRICS_PORT", "0"))
+# Через скільки секунд повернути задачу, коли пул воркера переповнений
+WORKER_BUSY_DELAY = float(os.getenv("WORKER_BUSY_DELAY", "1.0"))
+
+WORKER_ID = default_worker_id()
+
+# Створюються в setup()
+bot: Optional[Bot] = None
+analysis_executor: Optional[AnalysisExecutor] = None
+analysis_batcher: Optional[MicroBatcher] = None
+result_cache: Optional[ResultCache] = None
+job_queue: Optional[JobQueue] = None
+WORKER_CONCURRENCY = 0
+
+
+def setup():
+    """Створює бота, пул аналізу, кеш результатів і чергу; готує БД."""
+    global bot, analysis_executor, analysis_batcher, result_cache, job_queue
+    global WORKER_CONCURRENCY
+
+    bot_token = os.getenv("BOT_TOKEN")
+    if not bot_token:
+        raise RuntimeError("❌ BOT_TOKEN is missing! Add it in Railway → Variables.")
+
+    session = (
+        AiohttpSession(api=TelegramAPIServer.from_base(TELEGRAM_API_URL))
+        if TELEGRAM_API_URL else None
+    )
+    bot = Bot(token=bot_token, session=session)
+
+    analysis_executor = AnalysisExecutor()
+    analysis_batcher = MicroBatcher(analyze_batch, analysis_executor)
+    result_cache = ResultCache()
+
+    WORKER_CONCURRENCY = int(os.getenv(
+        "WORKER_CONCURRENCY",
+        analysis_executor.workers * analysis_batcher.max_batch_size,
+    ))
+
+    init_db()
+    job_queue = get_job_queue()
+
+    register_gauges()
+
+
+# ======================================================
+#                    METRICS
+# ======================================================
+_in_progress = 0
+
+
+def register_gauges():
+    REGISTRY.gauge("radical_worker_jobs_in_progress", "Задачі, які зараз обробляє воркер",
+                   fn=lambda: _in_progress)
+    REGISTRY.gauge("radical_models_warm", "1 — моделі прогріті в усіх воркерах",
+                   fn=lambda: int(analysis_executor.ready))
+
+
+# ======================================================
+#                  ОБРОБКА ЗАДАЧІ
+# ======================================================
+async def _heartbeat(job: Job):
+    """Продовжує видимість задачі, поки вона обробляється."""
+    while True:
+        await asyncio.sleep(JOB_VISIBILITY_TIMEOUT / 3)
+        try:
+            extended = await job_queue.aextend(job.id, WORKER_ID)
+        except Exception as e:
+            # Напр. "database is locked" — повтор на наступному тіку,
+            # інакше задача «протухне» і дістанеться іншому воркеру
+            print(f"[worker] Heartbeat for job {job.id} failed: {type(e).__name__}: {e}")
+            continue
+        if not extended:
+            print(f"[worker] Job {job.id} was taken over by another worker")
+            return
+
+
+async def process_photo(job: Job):
+    payload = job.payload
+    unique_key = file_key(payload["file_unique_id"])
+
+    result = await result_cache.aget(unique_key)
+    img_path = ""
+    cached = result is not None
+
+    if result is None:
+        with timed("download"):
+            file = await bot.get_file(payload["file_id"])
+            buffer = await bot.download_file(file.file_path)
+            img_bytes = buffer.getvalue()
+
+        img_path = schedule_persist(img_bytes, job.user_id, payload["file_id"]) or ""
+
+        hash_key = content_key(img_bytes)
+        result = await result_cache.aget(hash_key)
+        cached = result is not None
+
+        if result is None:
+            if not analysis_executor.ready:
+                with timed("warmup_wait"):
+                    await analysis_executor.wait_warm()
+
+            with timed("analysis"):
+                result = await analysis_batcher.submit(img_bytes)
+
+            if result is not None:
+                observe_pipeline_timings(result.get("timings"))
+                await result_cache.aput(with_origin(result, job.user_id), unique_key, hash_key)
+
+    if result is None:
+        PHOTOS_TOTAL.inc(outcome="no_face")
+        await send_no_face(bot, job.chat_id)
+        return None
+
+    PHOTOS_TOTAL.inc(outcome="cached" if cached else "ok")
+    # Повтор уже збереженого фото не дублює рядок у reports
+    if cached and already_saved(result, job.user_id):
+        await send_report(bot, job.chat_id, result, saved=False)
+        return None
+
+    report_id = await save_result(job.user_id, img_path, result)
+    await send_report(bot, job.chat_id, result)
+    return report_id
+
+
+HANDLERS = {
+    "photo": process_photo,
+}
+
+
+async def handle_job(job: Job):
+    global _in_progress
+    _in_progress += 1
+    heartbeat = asyncio.create_task(_heartbeat(job))
+    try:
+        result_id = await HANDLERS[job.kind](job)
+    except ExecutorBusy:
+        # Пул переповнений — задача повернеться в чергу трохи пізніше,
+        # спроба не рахується: фото тут ні до чого
+        await job_queue.arelease(job.id, WORKER_ID, WORKER_BUSY_DELAY)
+    except Exception as e:
+        status = await job_queue.anack(job.id, WORKER_ID, f"{type(e).__name__}: {e}")
+        print(f"[worker] Job {job.id} failed (attempt {job.attempts}/{job.max_attempts}, now {status}): {e}")
+        traceback.print_exc()
+        if status == "failed":
+            await _notify_failed(job)
+    else:
+        await job_queue.aack(job.id, WORKER_ID, result_id)
+    finally:
+        heartbeat.cancel()
+        _in_progress -= 1
+
+
+async def _notify_failed(job: Job):
+    """Остання спроба не вдалась — користувач має дізнатися, що звіту не буде."""
+    if job.kind == "photo":
+        PHOTOS_TOTAL.inc(outcome="error")
+    try:
+        await send_error(bot, job.chat_id)
+    except Exception as e:
+        print(f"[worker] Could not notify chat {job.chat_id} about job {job.id}: {e}")
+
+
+async def claim_loop(stop: asyncio.Event):
+    """Один слот конкурентності: claim → обробка → ack / nack."""
+    delay = 0.05
+    while not stop.is_set():
+        try:
+            job = await job_queue.aclaim(WORKER_ID, kinds=tuple(HANDLERS))
+        except Exception as e:
+            # Напр. "database is locked" — слот не повинен помирати
+            print(f"[worker] Claim failed: {type(e).__name__}: {e}")
+            job = None
+            delay = WORKER_POLL_INTERVAL
+
+        if job is None:
+            # Порожня черга — експоненційний backoff до WORKER_POLL_INTERVAL
+            try:
+                await asyncio.wait_for(stop.wait(), delay)
+            except asyncio.TimeoutError:
+                pass
+            delay = min(delay * 2, WORKER_POLL_INTERVAL)
+            continue
+
+        delay = 0.05
+        STAGE_SECONDS.observe(max(0.0, time.time() - job.created_at), stage="queue_wait")
+        await handle_job(job)
+
+
+async def failure_loop(stop: asyncio.Event):
+    """
+    Повідомлення про задачі, що стали failed без nack: воркер помер на
+    останній спробі, і claim перевів їх у failed за visibility timeout.
+    """
+    while not stop.is_set():
+        try:
+            for job in await job_queue.atake_failed():
+                print(f"[worker] Job {job.id} failed after {job.attempts} attempts (worker lost)")
+                await _notify_failed(job)
+        except Exception as e:
+            print(f"[worker] Failed-jobs sweep failed: {type(e).__name__}: {e}")
+        try:
+            await asyncio.wait_for(stop.wait(), WORKER_POLL_INTERVAL)
+        except asyncio.TimeoutError:
+            pass
+
+
+# ======================================================
+#                      RUN
+# ======================================================
+async def main():
+    setup()
+
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        try:
+            loop.add_signal_handler(sig, stop.set)
+        except NotImplementedError:
+            pass
+
+    purged = await job_queue.storage.run(job_queue.purge)
+    if purged:
+        print(f"[worker] Purged {purged} finished jobs")
+
+    analysis_executor.start_warm_up()
+    metrics_runner = await start_metrics_server(port=WORKER_METRICS_PORT)
+
+    print(f"[worker] {WORKER_ID} started, concurrency {WORKER_CONCURRENCY}")
+    try:
+        # SIGTERM: нові задачі не беруться, поточні дообробляються
+        await asyncio.gather(
+            failure_loop(stop),
+            *(claim_loop(stop) for _ in range(WORKER_CONCURRENCY)),
+        )
+    finally:
+        if metrics_runner is not None:
+            await metrics_runner.cleanup()
+        await flush_pending()
+        analysis_executor.shutdown(wait=False)
+        await bot.session.close()
+        get_storage().close()
+        print(f"[worker] {WORKER_ID} stopped")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())